@@ -33,6 +33,18 @@ def on_interest(name, param, app_param):
     packet_ = None
     if app_param is not None:
         app_param = json.loads(bytes(app_param).decode())
+        if 'advinfos' in app_param:
+            # Names of a batch PA registered at a time
+            data_rn = app_param['data_rn']
+            packet_ = base64.b64decode(app_param['packet_'])
+            for entry in app_param['advinfos']:
+                pubadvinfo = entry['advinfo']
+                print(f">>> {command} {pubadvinfo['dataname']} (Topic-RN {entry['topic_rn']})")
+                IR[pubadvinfo['dataname']] = data_rn, json.dumps(pubadvinfo, indent=2), packet_
+            print(f"<<< {command}ed {len(app_param['advinfos'])} names from {data_rn}")
+            print()
+            app.put_data(name, content=dataname.encode(), freshness_period=1)
+            return
         pubadvinfo = app_param['advinfo']
         # "topicscope is 0" means GLOBAL while 1 means LOCAL
         topic_rn = app_param['topic_rn']
@@ -4,22 +4,32 @@ from ndn.app import NDNApp
 from ndn.encoding import Name
 from ndn.encoding.ndn_format_0_3 import parse_data
 from ndn.types import InterestNack, InterestTimeout
-import asyncio, aiofiles, base64, random, redis, datetime
-import os, sys, pickle, json
+import asyncio, base64, random, redis, datetime
+import os, sys, pickle, json, collections, time
 
 from psdcnv3.psk import *
+from psdcnv3.psk.pskcmd import make_int_param
+from psdcnv3.psk.codec import encode, decode, codec_of
 from psdcnv3.utils import *
 from psdcnv3.broker.psodb import Pso
+from psdcnv3.broker.pit import Pit
+from psdcnv3.broker.context import CommandParser
+from psdcnv3.broker.cursor import Cursors
+from psdcnv3.broker.flights import Flights
+from psdcnv3.broker.routes import Routes
+from psdcnv3.broker.status import Reports
+from psdcnv3.broker.metrics import Metrics
+from psdcnv3.broker.journal import Journal
 from psdcnv3.broker.logger import init_logger
 # Must import all the possible choices for Names and Storage providers
-from psdcnv3.names import TrieNames, ProcNames, RegexpNames
-from psdcnv3.store import Store, TableStorage, RedisStorage, FileStorage, CacheWrapper
+from psdcnv3.names import TrieNames, ProcNames, RegexpNames, RadixNames
+from psdcnv3.store import Store, TableStorage, RedisStorage, FileStorage, LogStorage
+from psdcnv3.store import CacheWrapper
+from psdcnv3.store.Store import Metadata
 import psdcnv3.broker.handler
 
 # For HTTP-based status report
-from http.server import BaseHTTPRequestHandler, HTTPServer
 from urllib.parse import urlparse
-from threading import Thread
 import platform, psutil
 
 # Utilities
@@ -33,8 +43,8 @@ def scoped_command_info(command):
 
 def unparse_command(target, proto, dataname, seq=None):
     cmd_str = target + "/" + proto + dataname
-    if seq:
-        cmd_str += "/" + seq
+    if seq is not None:
+        cmd_str += "/" + str(seq)
     return cmd_str
 
 def uptime(start):
@@ -67,13 +77,27 @@ class Broker(object):
     :ivar psodb: a snapshot of PubSub operations.
     """
 
-    handlers = dict()
+    handlers = psdcnv3.broker.handler.handlers
 
     def __init__(self, id, app, names, store, psodb):
         self.id, self.app, self.names, self.store, self.psodb = id, app, names, store, psodb
         self.keeper = PSKCmd(app, node_name=id)
-        self.pending_interests = {}
+        self.parser = CommandParser((self.keeper.svc_name, self.keeper.node_name),
+            PSKCmd.cmd_list, sequenced=(PSKCmd.commands["CMD_PD"],),
+            numbered=(PSKCmd.commands["CMD_Status"], PSKCmd.commands["CMD_Profile"]))
+        self.pending_interests = Pit()
+        self.cursors = Cursors(config_default("cursor_ttl", 30),
+            config_default("cursor_sessions", 1024))
+        self.flights = Flights(config_default("match_cache_ttl", 60),
+            config_default("match_cache_entries", 4096))
+        self.routes = Routes(config_default("route_aggregation_depth", 0),
+            reserved=(self.keeper.svc_name, self.id))
+        self.registering = {}       # Prefix => Future of its registration in progress
+        self.journal = Journal(journal_name(id))
         self._start = datetime.datetime.now()        # For checking uptime
+        self.metrics = self.make_metrics()
+        self.status_endpoint = None
+        self.profiler = None
         # asyncio.get_event_loop().create_task(self.save_world())
         # asyncio.get_event_loop().create_task(self.delete_expired_interests())
 
@@ -90,38 +114,40 @@ class Broker(object):
             # loop.run_until_complete(self.store.flush(periodic=False))
             pass
 
-    def lookup_handler(command):
-        command = 'psdcnv3.broker.handler.handle_' + command    # Regularise command name
-        if command in Broker.handlers:
-            handler = Broker.handlers[command]
-        else:
-            handler = eval(command)
-            Broker.handlers[command] = handler
-        return handler
-
     def on_pubsub_request(self, int_name, int_param, app_param, raw_packet):
         """
         Callback function awakened by any incoming packet for PubSub operation commands.
         """
-        psk_parse = self.keeper.parse_command(int_name)
-        prefix = psk_parse['prefix']
-        command = psk_parse['command']
+        ctx = self.parser.parse(int_name, int_param, app_param, raw_packet)
+        if ctx is None:
+            reason = f"Not a PubSub command {Name.to_str(int_name)}"
+            response = {'status': 'ERR', 'reason': reason}
+            self.app.put_data(int_name, content=encode(response, codec_of(app_param)),
+                freshness_period=1)
+            self.logger.error(reason)
+            return
+        ctx.codec = codec_of(app_param)     # Replies are made in the same codec
+        self.metrics.inc('requests_total', (('command', ctx.command),))
         # self.logger.debug(f"Inside Pubsub handler of {self.id} for {command}")
-        asyncio.get_event_loop().create_task(self.dispatch(
-            int_name, int_param, app_param, raw_packet, psk_parse))
+        asyncio.get_event_loop().create_task(self.dispatch(ctx))
 
     def on_admin_request(self, int_name, int_param, app_param):
         """
         Callback function awakened by any incoming packet for administrative commands.
         """
-        psk_parse = self.keeper.parse_command(int_name)
-        command = psk_parse['command']
-        if command not in PSKCmd.commands.values():
+        ctx = self.parser.parse(int_name, int_param, app_param)
+        if ctx is None or ctx.command not in Broker.handlers:
+            return
+        command = ctx.command
+        ctx.codec = codec_of(app_param)
+        self.metrics.inc('requests_total', (('command', command),))
+        try:
+            ctx.app_param = decode(app_param)
+        except Exception as e:
+            self.logger.error(f"{command} with malformed parameters: {type(e).__name__} {e}")
             return
-        prefix = psk_parse['prefix']
-        # self.logger.debug(f"Inside Admin handler of {prefix} for {command}")
-        asyncio.get_event_loop().create_task(Broker.lookup_handler(psk_parse['command'])(
-            self, int_name, int_param, app_param, psk_parse))
+        # self.logger.debug(f"Inside Admin handler of {ctx.prefix} for {command}")
+        asyncio.get_event_loop().create_task(Broker.handlers[command](self, ctx))
 
     def on_data_request(self, int_name, int_param, app_param):
         """
@@ -138,39 +164,50 @@ class Broker(object):
             seq = 0
         if seq <= 0:
             self.app.put_data(int_name, None, freshness_period=freshness_period)
-            self.logger.debug(f"SD {built_name} discarded at {self.id}")
+            self.logger.debug("SD %s discarded at %s", built_name, self.id)
             return
         # self.logger.debug(f"Inside Data handler for {built_name}")
-        packet = self.store.get(dataname, seq)
+        if self.routes.depth and dataname not in self.psodb and dataname not in self.store:
+            # Came by a covering prefix for a name not served here
+            self.logger.debug("SD %s not served at %s", built_name, self.id)
+            return
+        if seq <= self.store.end(dataname):
+            # Read the data without blocking the event loop
+            asyncio.get_event_loop().create_task(
+                self.serve_data(int_param, dataname, seq, built_name))
+        else:
+            self.pend_interest(int_param, dataname, seq, built_name)
+
+    async def serve_data(self, int_param, dataname, seq, built_name):
+        """
+        Replies to a data request with the stored data,
+        or keeps the request pending if the data is not found.
+        """
+        started = time.perf_counter()
+        packet = await self.store.aview(dataname, seq)     # Not copied if possible
+        self.metrics.observe('storage_seconds', time.perf_counter() - started, (('op', 'view'),))
         if packet:
-            self.logger.debug(f"SD {built_name} processed at {self.id}")
+            self.logger.debug("SD %s processed at %s", built_name, self.id)
             # name, meta, _, _ = parse_data(packet)
             # assert Name.to_str(name) == built_name
             self.app.put_raw_packet(packet)
-        elif int(seq) > 0:
-            # Add to pending interest table with timestamp
-            lifetime = int(int_param.lifetime) if int_param.lifetime else 4000
-            timestamp = datetime.datetime.now()
-            utc_time = timestamp.replace(tzinfo=datetime.timezone.utc).timestamp()
-            duration = lifetime / 1000
-            expires = utc_time + duration
-            # Check if any previous pending interest for the same data will live longer
-            # than the new interest
-            if (dataname, seq) in self.pending_interests:
-                previous = self.pending_interests[(dataname, seq)]
-                if previous - utc_time > duration:
-                    # Merge by subsuming shorter expiry interest
-                    self.logger.debug(
-                        f"PI {built_name} is subsumed by an old one")
-                    return
-            self.pending_interests[(dataname, seq)] = expires
-            # self.app.put_data(int_name, None, freshness_period=freshness_period)
-            self.logger.debug(
-                f'PI {built_name} expires in {int(duration)}"')
         else:
-            # All other erroneous cases
-            self.app.put_data(int_name, None, freshness_period=freshness_period)
-            self.logger.debug(f"{built_name} not found at {self.id}")
+            self.pend_interest(int_param, dataname, seq, built_name)
+
+    def pend_interest(self, int_param, dataname, seq, built_name):
+        # Add to pending interest table with timestamp
+        lifetime = int(int_param.lifetime) if int_param.lifetime else 4000
+        timestamp = datetime.datetime.now()
+        utc_time = timestamp.replace(tzinfo=datetime.timezone.utc).timestamp()
+        duration = lifetime / 1000
+        expires = utc_time + duration
+        # Merge by subsuming shorter expiry interest if any previous pending interest
+        # for the same data will live longer than the new interest
+        if not self.pending_interests.add(dataname, seq, expires):
+            self.logger.debug("PI %s is subsumed by an old one", built_name)
+            return
+        # self.app.put_data(int_name, None, freshness_period=freshness_period)
+        self.logger.debug('PI %s expires in %d"', built_name, duration)
 
     async def listen(self):
         """
@@ -196,13 +233,97 @@ class Broker(object):
             self.delete_expired_interests(),
             self.save_world(),
             self.store.flush(),
+            self.store.write_back(),
+            self.serve_status(),
         )
         try:
             await tasks
         except asyncio.CancelledError:
             pass
 
-    async def dispatch(self, int_name, int_param, app_param, raw_packet, psk_parse):
+    async def serve_status(self):
+        """
+        Coroutine function for the HTTP status server on the event loop.
+
+        Serves the status report in JSON at `/` (or `/status`), and the metrics in
+            Prometheus text format at `/metrics`. Both are made on the event loop,
+            so they never race with the handlers.
+        """
+        if self.status_endpoint is None:
+            return
+        hostname, port = self.status_endpoint.hostname, self.status_endpoint.port
+        server = await asyncio.start_server(self.on_status_request, hostname, port)
+        self.logger.debug(f"Status server started at http://{hostname}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    async def on_status_request(self, reader, writer):
+        try:
+            request = (await reader.readline()).decode('latin-1').split()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass        # Headers are not used
+            path = urlparse(request[1]).path if len(request) > 1 else '/'
+            if path == '/metrics':
+                status, content_type = "200 OK", "text/plain; version=0.0.4; charset=utf-8"
+                body = self.metrics.render().encode()
+            elif path in ('/', '/status'):
+                status, content_type = "200 OK", "application/json; charset=cp949" # utf-8
+                _, text, _ = self.reports.get(0, self.report)
+                body = text.encode("cp949")
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"Not found\n"
+            writer.write((f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n").encode() + body)
+            await writer.drain()
+        except Exception as e:
+            self.logger.debug(f"Status request failed: {type(e).__name__} {str(e)}")
+        finally:
+            writer.close()
+
+    def make_metrics(self):
+        """
+        Makes the metrics of the broker, with gauges for the sizes of its tables.
+        """
+        metrics = Metrics()
+        metrics.describe('requests_total', "Requests received by command")
+        metrics.describe('request_errors_total', "Requests failed by command")
+        metrics.describe('request_seconds',
+            "Time to handle PubSub requests locally or to forward them")
+        metrics.describe('requests_in_flight', "PubSub requests being handled")
+        metrics.describe('forward_rtt_seconds', "Round trip time of requests forwarded to RNs")
+        metrics.describe('pd_fetch_seconds', "Time to fetch publications from publishers")
+        metrics.describe('storage_seconds', "Time of storage operations")
+        metrics.gauge('pending_interests', lambda: len(self.pending_interests))
+        metrics.gauge('cursor_sessions', lambda: len(self.cursors))
+        metrics.gauge('routes', lambda: len(self.routes))
+        metrics.gauge('routed_names', lambda: self.routes.names())
+        metrics.gauge('journal_churn', lambda: self.journal.churn())
+        def cache(key, type='gauge'):
+            def value():
+                if isinstance(self.store.get_storage(), CacheWrapper):
+                    return self.store.get_storage().stats()[key]
+            metrics.gauge(f"cache_{key}", value, type)
+        for key in ('items', 'used', 'dirty', 'pending'):
+            cache(key)
+        for key in ('hits', 'misses', 'evictions', 'writebacks'):
+            cache(key, 'counter')
+        def hit_ratio():
+            value = None
+            if isinstance(self.store.get_storage(), CacheWrapper):
+                stats = self.store.get_storage().stats()
+                lookups = stats['hits'] + stats['misses']
+                value = stats['hits'] / lookups if lookups else 0.0
+            return value
+        metrics.gauge('cache_hit_ratio', hit_ratio)
+        def match_cache(key, type='gauge'):
+            metrics.gauge(f"match_cache_{key}", lambda: self.flights.stats()[key], type)
+        for key in ('items', 'used', 'hit_ratio'):
+            match_cache(key)
+        for key in ('hits', 'shared', 'misses', 'invalidations', 'evictions'):
+            match_cache(key, 'counter')
+        return metrics
+
+    async def dispatch(self, ctx):
         """
         Examines a PubSub command, and perform necessary operations
         1) It was forwarded to me from another RN: do some administrative tasks and
@@ -214,48 +335,42 @@ class Broker(object):
              or the command is PD/SM/SL, or topicscope is LOCAL), calls an appropriate handler.
            - Otherwise, forward the command to the appropriate broker in the broker loop.
         """
-        # Parse command using the PSK parser
-        command = psk_parse['command']
-        dataname = psk_parse['dataname']
-        app_param = json.loads(bytes(app_param).decode() if app_param else "{}")
+        # The command was parsed on arrival
+        command, dataname, int_param = ctx.command, ctx.dataname, ctx.int_param
+        path = 'local'
+        in_flight = (('command', command),)
+        self.metrics.level('requests_in_flight', in_flight)
 
-        first_hop = 'fwded_from' not in app_param
-        app_param['fwded_from'] = self.id
-        if 'rninfo' not in app_param or not app_param['rninfo']:
-            app_param['rninfo'] = RNInfo(brokername=self.id)
         try:
+            # Parameters are decoded once, and handlers take them as they are
+            app_param = ctx.app_param = decode(ctx.app_param) or {}
+            first_hop = 'fwded_from' not in app_param
+            app_param['fwded_from'] = self.id
+            if 'rninfo' not in app_param or not app_param['rninfo']:
+                app_param['rninfo'] = RNInfo(brokername=self.id)
             # Reflect PA and PU command to psodb
             if command == PSKCmd.commands["CMD_PA"] and first_hop:
-                fresh = dataname not in self.psodb
+                if 'pubadvinfos' in app_param:
+                    path = 'batch'
+                    await self.pubadv_batch(ctx)
+                    return
                 pubadvinfo = app_param['pubadvinfo']
                 pubadvinfo['dataname'] = dataname
                 # Check if the receiver is the first-hop broker
-                if fresh:
-                    await self.app.register(dataname, self.on_data_request)
-                    self.logger.debug(f"PA registered route {dataname} at {self.id}")
-                # Check if client wanted private storage rather than the broker storage
-                where = pubadvinfo['storagetype'] \
-                    if pubadvinfo['storagetype'] else StorageType.BROKER
-                # if where == StorageType.BROKER:
-                #     self.logger.debug(f"Broker {self.id} manages {dataname}")
-                if where == StorageType.PUBLISHER or where == StorageType.DIFS:
-                    storageprefix = param_value(app_param, "pubadvinfo", "storageprefix")
-                    pubadvinfo['storageprefix'] = storageprefix
-                    app_param['pubadvinfo'] = pubadvinfo
-                    manager = "Publisher" if where == StorageType.PUBLISHER else "DIFS"
-                    self.logger.debug(f"{manager} {storageprefix} manages {dataname}")
-                # Add advertisement info to pubsub operations database 
-                self.psodb.pubadv(dataname, pubadvinfo)
+                if self.pubadv(pubadvinfo) or dataname not in self.routes:
+                    if await self.register_routes([dataname]):
+                        self.pubunadv(dataname)
+                        raise RuntimeError(f"Route {dataname} not registered")
             elif command == PSKCmd.commands["CMD_PU"] and first_hop:
                 if dataname in self.psodb:
-                    await self.app.unregister(dataname)
-                    self.logger.debug(f"PU unregistered route {dataname}")
-                    self.psodb.pubunadv(dataname)
+                    await self.unregister_route(dataname)
+                    self.pubunadv(dataname)
                 else:
                     # Open Problem:
                     # Can it unregister route which is not one for the current broker?
-                    self.logger.debug(f"PU {dataname} not found in psodb")
-                self.store.delete(dataname)     # !!!
+                    self.logger.debug("PU %s not found in psodb", dataname)
+                await self.store.adelete(dataname)     # !!!
+                self.journal.record('delete', dataname)
                 # self.logger.debug(f"{self.id} won't manage {dataname} any more")
     
             # Check topicscope of operation for commands PA, PU, and ST
@@ -266,9 +381,6 @@ class Broker(object):
                 if user_scope:
                     topicscope = int(user_scope)
     
-            # Encode app_param
-            enc_param = json.dumps(app_param).encode()
-
             # Check if the request can be processed immediately
             forward = int_param.forwarding_hint
             target = Name.to_str(forward[0][1]) if forward else arbit(dataname, self.network)
@@ -282,24 +394,32 @@ class Broker(object):
                 # Process the command immediately
                 if topicscope == TopicScope.LOCAL:
                     target = self.id
-                    self.logger.debug(f"{command} {dataname} processed by Data-RN {self.id}")
-                await Broker.lookup_handler(command)(
-                    self, int_name, int_param, enc_param, psk_parse)
+                    self.logger.debug("%s %s processed by Data-RN %s", command, dataname, self.id)
+                handler = Broker.handlers.get(command)
+                if handler is None:
+                    raise ValueError(f"No handler for {command}")
+                await handler(self, ctx)
             else:
                 # Or else forward the request to target RN
-                self.logger.debug(f"{command} {dataname} {self.id} => {target}")
-                cmd_str = unparse_command(self.keeper.svc_name, command, dataname, psk_parse['seq'])
+                self.logger.debug("%s %s %s => %s", command, dataname, self.id, target)
+                path = 'forwarded'
+                cmd_str = unparse_command(self.keeper.svc_name, command, dataname, ctx.seq)
                 int_param.forwarding_hint = [(1, target)]   # Adds FH to int_param
                 int_param.lifetime = INT_LT_10
+                # Encoded only to be forwarded, in the codec of the request
+                enc_param = encode(app_param, ctx.codec)
+                sent = time.perf_counter()
                 _, _, content = await self.app.express_interest(
                     Name.from_str(cmd_str), interest_param=int_param, app_param=enc_param)
-                self.app.put_data(int_name, content=content, freshness_period=1)
+                self.metrics.observe('forward_rtt_seconds', time.perf_counter() - sent,
+                    (('target', target),))
+                self.app.put_data(ctx.int_name, content=content, freshness_period=1)
             if first_hop:
                 if command == PSKCmd.commands["CMD_PA"]:
                     # Look for errors...
-                    await self.ir_register(dataname, pubadvinfo, target, raw_packet)
+                    await self.ir_register(dataname, pubadvinfo, target, ctx.raw_packet)
                 elif command == PSKCmd.commands["CMD_PU"]:
-                    await self.ir_unregister(dataname, raw_packet)
+                    await self.ir_unregister(dataname, ctx.raw_packet)
             return
         except InterestTimeout as e:
             reason = f"InterestTimeout for {command} {dataname}"
@@ -308,61 +428,246 @@ class Broker(object):
         except Exception as e:
             reason = f"{type(e).__name__} {str(e)}"
             # reason = f"Command dispatch error"
+        finally:
+            self.metrics.observe('request_seconds', time.perf_counter() - ctx.received,
+                (('command', command), ('path', path)))
+            self.metrics.level('requests_in_flight', in_flight, -1)
+        self.metrics.inc('request_errors_total', (('command', command), ('path', path)))
         response = {'status': 'ERR', 'reason': reason}
-        self.app.put_data(int_name, content=json.dumps(response).encode(), freshness_period=1)
+        self.app.put_data(ctx.int_name, content=encode(response, ctx.codec), freshness_period=1)
         self.logger.error(reason)
 
     async def delete_expired_interests(self):
         await asyncio.sleep(30.0)           # Should it be configurable?
         timestamp = datetime.datetime.now()
         utc_time = timestamp.replace(tzinfo=datetime.timezone.utc).timestamp()
-        for pending in list(self.pending_interests):
-            dataname, seq = pending
-            if utc_time > self.pending_interests[pending]:
-                del self.pending_interests[pending]
-                self.logger.debug(f'PI {dataname}/{seq} expired')
+        for dataname, seq in self.pending_interests.expire(utc_time):
+            self.logger.debug('PI %s/%s expired', dataname, seq)
         asyncio.get_event_loop().create_task(self.delete_expired_interests())
 
     async def save_world(self, periodic=True):
+        """
+        Writes out the journal of world mutations, and checkpoints the whole world
+            if enough mutations were journaled or `periodic` is False.
+        """
         if periodic:
-            await asyncio.sleep(60.0)       # Should it be configurable?
-        path = world_name(self.id)
-        # if os.path.isfile(path): os.rename(path, path + ".0")
-        world = {
-            'names': self.names.pickle(),   # Global topic tree
-            'local': self.local.pickle(),   # Local topic tree
-            'store': self.store.pickle(),   # Last written data indices information
-            'psodb': self.psodb.pickle(),   # Advertised names for which data are kept here
-        }
-        async with aiofiles.open(path, "wb") as f:
-            await f.write(pickle.dumps(world))
-            await f.flush()
+            await asyncio.sleep(config_default("journal_sync_interval", 1.0))
+        try:
+            if not periodic or \
+                    self.journal.churn() >= config_default("journal_checkpoint_records", 10000):
+                await self.journal.checkpoint(self.snapshot)
+            else:
+                await self.journal.commit()
+        except Exception as e:
+            self.logger.error(f"Saving world failed: {type(e).__name__} {str(e)}")
         if periodic:
             asyncio.get_event_loop().create_task(self.save_world(periodic=True))
 
+    def snapshot(self):
+        prefixes = {slot.dataname: slot.storageprefix for slot in self.names.advertisements()
+                    if getattr(slot, 'storageprefix', None)}
+        return {
+            'names': self.names.records(),  # Global topic tree
+            'local': self.local.records(),  # Local topic tree
+            'store': self.store.records(),  # Last written data indices information
+            'psodb': self.psodb.records(),  # Advertised names for which data are kept here
+            'prefixes': prefixes,           # Storage prefixes of global names
+        }
+
     async def restore_routes(self, datanames):
-        for dataname in datanames:
-            try:
-                await self.app.register(dataname, self.on_data_request)
-                self.logger.debug(f"Restored route {dataname} at {self.id}")
-            except:
-                pass
+        failed = await self.register_routes(datanames)
+        self.logger.debug(f"Restored {len(datanames) - len(failed)} route(s) at {self.id}")
 
     def restore_world(self):
-        path = world_name(self.id)
-        if not os.path.isfile(path):
+        world, records = self.journal.load()
+        if world is None and not records:
             return
-        with open(path, "rb") as f:
-            world = pickle.loads(f.read())
-            self.names.restore(world['names'])
-            self.local.restore(world['local'])
-            self.store.restore(world['store'])
-            self.psodb.restore(world['psodb'])
+        if world is not None:
+            if isinstance(world['names'], bytes):
+                # World saved by a broker without journal
+                self.names.restore(world['names'])
+                self.local.restore(world['local'])
+                self.store.restore(world['store'])
+                self.psodb.restore(world['psodb'])
+            else:
+                self.names.load(world['names'])
+                self.local.load(world['local'])
+                self.store.load(world['store'])
+                self.psodb.load(world['psodb'])
+                for dataname, storageprefix in world['prefixes'].items():
+                    self.names[dataname].storageprefix = storageprefix
+        for lsn, op, args in records:
+            self.replay(op, *args)
         self.logger.info(f"Restored broker {self.id}'s world")
+        self.logger.debug(f"Replayed {len(records)} journal records up to {self.journal.lsn}")
         names_count = self.names.count() + self.local.count()
         self.logger.debug(
             f"{self.id} has {names_count} data names and {self.store.count()} store items")
 
+    def pubadv(self, pubadvinfo):
+        """
+        Adds advertisement info of a PA at the first-hop broker to the pubsub operations
+            database.
+
+        :return: True if the data name is new to this broker.
+        """
+        dataname = pubadvinfo['dataname']
+        fresh = dataname not in self.psodb
+        # Check if client wanted private storage rather than the broker storage
+        where = pubadvinfo['storagetype'] \
+            if pubadvinfo.get('storagetype') else StorageType.BROKER
+        # if where == StorageType.BROKER:
+        #     self.logger.debug(f"Broker {self.id} manages {dataname}")
+        if where == StorageType.PUBLISHER or where == StorageType.DIFS:
+            storageprefix = pubadvinfo.get('storageprefix')
+            pubadvinfo['storageprefix'] = storageprefix
+            manager = "Publisher" if where == StorageType.PUBLISHER else "DIFS"
+            self.logger.debug("%s %s manages %s", manager, storageprefix, dataname)
+        self.psodb.pubadv(dataname, pubadvinfo)
+        self.journal.record('pubadv', dataname, pubadvinfo)
+        return fresh
+
+    def pubunadv(self, dataname):
+        """
+        Removes advertisement info of `dataname` from the pubsub operations database.
+        """
+        self.psodb.pubunadv(dataname)
+        self.journal.record('pubunadv', dataname)
+
+    async def register_routes(self, datanames):
+        """
+        Registers routes of `datanames` to this broker, or their covering prefixes if
+            routes are aggregated. At most "route_concurrency" registrations are
+            made at a time. Names routed by a prefix still being registered for
+            another request wait for its registration. Names whose routes failed to
+            be registered are not routed, and are registered again when they are
+            advertised again.
+
+        :return: list of the names whose routes are not registered.
+        """
+        prefixes, waiting = {}, {}
+        loop = asyncio.get_running_loop()
+        for dataname in datanames:
+            prefix = self.routes.add(dataname)
+            if prefix:
+                prefixes[prefix] = True
+                self.registering[prefix] = loop.create_future()
+            else:
+                # The name is routed by a prefix which may still be being registered
+                prefix = self.routes.prefix(dataname)
+                if prefix in self.registering and prefix not in prefixes:
+                    waiting[prefix] = self.registering[prefix]
+        if not prefixes and not waiting:
+            return []
+        limit = asyncio.Semaphore(config_default("route_concurrency", 16))
+        async def register(prefix):
+            failed = []
+            try:
+                async with limit:
+                    await self.app.register(prefix, self.on_data_request)
+            except Exception as e:
+                self.logger.error(f"Route {prefix} not registered: {type(e).__name__} {e}")
+                failed = self.routes.forget(prefix)
+            finally:
+                # Those waiting for the prefix learn the names it failed to route
+                self.registering.pop(prefix).set_result(failed)
+            return failed
+        results = await asyncio.gather(*[register(prefix) for prefix in prefixes],
+            *[asyncio.shield(future) for future in waiting.values()])
+        self.logger.debug("Registered %d route(s) at %s",
+            sum(1 for failed in results[:len(prefixes)] if not failed), self.id)
+        datanames = set(datanames)
+        return [dataname for failed in results for dataname in failed if dataname in datanames]
+
+    async def unregister_route(self, dataname):
+        """
+        Unregisters the route of `dataname`, unless its covering prefix still routes
+            other names.
+        """
+        prefix = self.routes.remove(dataname)
+        if prefix:
+            await self.app.unregister(prefix)
+            self.logger.debug("PU unregistered route %s", prefix)
+
+    async def pubadv_batch(self, ctx):
+        """
+        Handles a batch PA carrying `pubadvinfos` at the first-hop broker.
+
+        Routes of the new names are registered at a time, and the names are grouped by
+            their Topic-RNs, so that one request is forwarded to each of them.
+            Names whose routes are not registered fail, and are not advertised.
+            The names advertised are registered to the IR in one request.
+            The reply has the responses of the names in the order of `pubadvinfos`.
+        """
+        app_param = ctx.app_param
+        pubadvinfos = app_param['pubadvinfos']
+        unrouted, groups, responses = {}, {}, {}
+        forward = ctx.int_param.forwarding_hint
+        for pubadvinfo in pubadvinfos:
+            dataname = pubadvinfo['dataname']
+            if self.pubadv(pubadvinfo) or dataname not in self.routes:
+                unrouted[dataname] = True
+        failed = set(await self.register_routes(list(unrouted)))
+        for pubadvinfo in pubadvinfos:
+            dataname = pubadvinfo['dataname']
+            if dataname in failed:
+                responses[id(pubadvinfo)] = {'status': "ERR",
+                    'reason': f"Route {dataname} not registered", 'dataname': dataname}
+                continue
+            if int(pubadvinfo.get('topicscope') or 0) == TopicScope.LOCAL:
+                target = self.id
+            else:
+                target = Name.to_str(forward[0][1]) if forward \
+                    else arbit(dataname, self.network)
+            groups.setdefault(target, []).append(pubadvinfo)
+        for dataname in failed:
+            self.pubunadv(dataname)
+
+        async def advertise(target, group):
+            if target == self.id:
+                rn_name = param_value(app_param, 'rninfo', 'brokername')
+                return psdcnv3.broker.handler.pubadvs(self, group, rn_name)
+            self.logger.debug("PA %d names %s => %s", len(group), self.id, target)
+            batch = dict(app_param, pubadvinfos=group)
+            int_param = make_int_param()
+            int_param.forwarding_hint = [(1, target)]
+            cmd_str = unparse_command(self.keeper.svc_name, ctx.command, ctx.dataname)
+            try:
+                sent = time.perf_counter()
+                _, _, content = await self.app.express_interest(Name.from_str(cmd_str),
+                    interest_param=int_param, app_param=encode(batch, ctx.codec))
+                self.metrics.observe('forward_rtt_seconds', time.perf_counter() - sent,
+                    (('target', target),))
+                content = decode(content)
+                if content['status'] == 'OK':
+                    return content['value']
+                reason = content.get('reason', "Unknown pubadv error")
+            except InterestTimeout:
+                reason = f"InterestTimeout for {ctx.command} at {target}"
+            except InterestNack as e:
+                reason = f"InterestNack {e.reason} for {ctx.command} at {target}"
+            return [{'status': "ERR", 'reason': reason, 'dataname': pubadvinfo['dataname']}
+                for pubadvinfo in group]
+
+        targets = list(groups)
+        answers = await asyncio.gather(*[advertise(target, groups[target])
+            for target in targets])
+        advertised = []
+        for target, answer in zip(targets, answers):
+            for pubadvinfo, response in zip(groups[target], answer):
+                responses[id(pubadvinfo)] = response
+                if response['status'] == "OK":
+                    advertised.append((pubadvinfo, target))
+        value = [responses.get(id(pubadvinfo)) or
+            {'status': "ERR", 'reason': "No response", 'dataname': pubadvinfo['dataname']}
+            for pubadvinfo in pubadvinfos]
+        self.app.put_data(ctx.int_name,
+            content=encode({'status': 'OK', 'value': value}, ctx.codec), freshness_period=1)
+        self.logger.info("PA %d of %d names advertised via %d RNs",
+            len(advertised), len(pubadvinfos), len(targets))
+        if advertised:
+            await self.ir_register_batch(advertised, ctx.raw_packet)
+
     async def ir_register(self, dataname, pubadvinfo, target, raw_packet):
         ir_cmd, int_param, _ = self.keeper.make_irreg_cmd(self.ir_prefix, dataname)
         ir_app = {}
@@ -378,6 +683,24 @@ class Broker(object):
             # self.logger.error(f"PA couldn't register {dataname} to IR")
             pass
 
+    async def ir_register_batch(self, advertised, raw_packet):
+        """
+        Registers (pubadvinfo, Topic-RN) pairs of a batch PA to the IR in one request.
+        """
+        ir_cmd, int_param, _ = self.keeper.make_irreg_cmd(self.ir_prefix, "/_")
+        ir_app = {}
+        ir_app['advinfos'] = [{'advinfo': pubadvinfo, 'topic_rn': target}
+            for pubadvinfo, target in advertised]
+        ir_app['data_rn'] = self.id
+        ir_app['packet_'] = base64.b64encode(raw_packet).decode("cp949")
+        ir_app = json.dumps(ir_app).encode()
+        try:
+            await self.app.express_interest(Name.from_str(ir_cmd), interest_param = int_param,
+                app_param=ir_app)
+        except Exception as e:
+            # self.logger.error(f"PA couldn't register {len(advertised)} names to IR")
+            pass
+
     async def ir_unregister(self, dataname, raw_packet):
         ir_cmd, int_param, _ = self.keeper.make_irdel_cmd(self.ir_prefix, dataname)
         try:
@@ -397,6 +720,8 @@ class Broker(object):
         managers = {}
         managers['name_manager'] = type(self.names).__name__
         managers['storage_manager'] = self.storage_manager
+        if isinstance(self.store.get_storage(), CacheWrapper):
+            managers['cache'] = self.store.get_storage().stats()
         configs['managers'] = managers
         hardware = {}
         hardware['cpu'] = {
@@ -417,69 +742,77 @@ class Broker(object):
             'current': datetime.datetime.now().strftime(date_format_str),
             'uptime': uptime(self._start)
         }
+        # Totals are counted by the names and the store, and only windows are collected
         advertised = {}
-        globals_ = list(self.names.names())
-        locals_ = list(self.local.names())
-        names_count = len(globals_) + len(locals_)
+        names_count = self.names.count() + self.local.count()
         window_size = names_count if not window else int(window)
         window_size = min(names_count, config_default('status_report_window_size', window_size))
-        advertised['total'] = len(globals_) + len(locals_)
+        advertised['total'] = names_count
         advertised['window_size'] = window_size
-        advertised['names'] = globals_[-window_size:]
-        advertised['local_names'] = locals_[-window_size:]
+        advertised['names'] = last(self.names.names(), window_size)
+        advertised['local_names'] = last(self.local.names(), window_size)
         status['advertised'] = advertised
         published = {}
-        pubs = list(self.store.names())
-        pubs_len = len(pubs)
+        pubs_len = self.store.count()
         pubs_win = pubs_len if not window else int(window)
         pubs_win = min(pubs_len, pubs_win, config_default('status_report_window_size', pubs_len))
         published['total'] = pubs_len
         published['window_size'] = pubs_win
         manifests = []
-        for dataname in list(self.store.names())[-pubs_win:]:
+        for dataname in last(self.store.names(), pubs_win):
             md = self.store.metadata[dataname]
             mi = {'name': dataname, 'fst': md.fst, 'lst': md.lst}
             manifests.append(mi)
         published['manifest'] = manifests
         status['published'] = published
+        # Results of ST/SL kept in front of the names
+        status['match_cache'] = self.flights.stats()
+        # Latencies by command and path, e.g. PD/local
+        status['latency'] = {'/'.join(value for _, value in labels):
+                {key: round(value, 6) for key, value in summary.items()}
+            for labels, summary in self.metrics.summary('request_seconds').items()}
         # Report made
         return {'config': configs, 'status': status}
 
+    def replay(self, op, *args):
+        """
+        Applies a world mutation recorded in the journal.
+        """
+        if op == 'advertise':
+            scope, rn_name, dataname, pub_moved = args
+            getattr(self, scope).advertise(rn_name, dataname, pub_moved)
+        elif op == 'unadvertise':
+            scope, dataname = args
+            getattr(self, scope).unadvertise(dataname)
+        elif op == 'storageprefix':
+            dataname, storageprefix = args
+            if dataname in self.names:
+                self.names[dataname].storageprefix = storageprefix
+        elif op == 'pubadv':
+            self.psodb.pubadv(*args)
+        elif op == 'pubunadv':
+            self.psodb.pubunadv(*args)
+        elif op == 'metadata':
+            dataname, fst, lst = args
+            self.store.metadata[dataname] = Metadata(dataname, fst, lst)
+        elif op == 'delete':
+            self.store.delete(*args)
+
+def last(names, n):
+    """
+    Returns the last `n` of `names` without making a list of all of them.
+    """
+    return list(collections.deque(names, maxlen=n)) if n > 0 else []
+
+def journal_name(name):
+    return "node" + build_path(name)
+
 def world_name(name):
-    return "node" + build_path(name) + '.world'
+    return journal_name(name) + '.world'
 
 def check_id(argv):
     return argv[1] if len(argv) > 1 else config_default("broker_prefix", "/rn-1")
 
-### An HTTP-based Status Monitor
-class StatusHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header("Content-type", "application/json; charset=cp949") # utf-8
-        self.end_headers()
-        self.wfile.write(bytes(json.dumps(broker.report(), indent=2), "cp949"))   # utf-8
-
-    def log_message(self, *rest):
-        pass
-
-class StatusMonitor(Thread):
-    def __init__(self, broker, hostname, port):
-        super().__init__()
-        self.broker = broker
-        self.hostname = hostname
-        self.port = port
-        self.daemon = True
-
-    def run(self):
-        server = HTTPServer((self.hostname, self.port), StatusHandler)
-        # broker.logger.debug(f"Status Server started at http://{self.hostname}:{self.port}")
-        try:
-            server.serve_forever()
-        except KeyboardInterrupt:
-            pass
-        server.server_close()
-        broker.logger.info(f"Status server stopped")
-
 # The GRAND Main
 def main():
     """
@@ -505,13 +838,15 @@ def main():
     broker.local = eval(config_default("names_provider", "TrieNames()"))
     # Initialize psdcnv3 logger
     broker.logger = init_logger()
-    # Add cache to storage if cache_size was specified
+    # Add cache to storage if cache_size or cache_budget was specified
     cache_size = config_default("cache_size", 0)
-    if cache_size > 0:
-        storage_manager = f"{broker.store.media()} with a cache of {cache_size} cells"
-        broker.store.set_storage(CacheWrapper(broker.store.get_storage(), cache_size))
-    else:
-        storage_manager = f"{broker.store.media()}"
+    cache_budget = config_default("cache_budget", 0)
+    if cache_size > 0 or cache_budget > 0:
+        cache = CacheWrapper(broker.store.get_storage(), cache_size, cache_budget,
+            policy=config_default("cache_policy", "lru"),
+            batch_size=config_default("cache_batch_size", 256))
+        broker.store.set_storage(cache)
+    storage_manager = f"{broker.store.media()}"
     broker.storage_manager = storage_manager
     broker.logger.debug(f"{storage_manager}")
     # Add broker context info to submodules
@@ -527,12 +862,11 @@ def main():
     broker.ir_prefix = config_default("IR_prefix", "/marketplace")
     # Add status monitor endpoint
     status_endpoint = config_default("status_monitor", None)
-    broker.status = None
-    broker.status_chunk_size = int(config_default("status_chunk_size", "8192"))
+    broker.reports = Reports(int(config_default("status_chunk_size", "8192")),
+        config_default("status_cache_ttl", 1.0))
+    broker.profiles = Reports(broker.reports.chunk_size, ttl=0, capacity=2)
     if status_endpoint is not None:
-        status_endpoint = urlparse(status_endpoint)
-        status_monitor = StatusMonitor(broker, status_endpoint.hostname, status_endpoint.port)
-        status_monitor.start()
+        broker.status_endpoint = urlparse(status_endpoint)
     # Start the main event loop
     broker.start()
 
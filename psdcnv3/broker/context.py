@@ -0,0 +1,85 @@
+# Command contexts of incoming Interests
+
+from ndn.encoding import Name, Component
+import time, urllib.parse
+
+class CommandContext(object):
+    """
+    Everything a broker knows about a command Interest, parsed once on arrival and
+        passed along from the request callbacks to the handlers.
+
+    :ivar int_name: name of the Interest.
+    :ivar int_param: Interest parameters.
+    :ivar app_param: application parameters, decoded once they are dispatched.
+    :ivar raw_packet: the Interest packet, or None for admin commands.
+    :ivar prefix: network or broker prefix the Interest was sent to.
+    :ivar command: command string, one of `PSKCmd.cmd_list`.
+    :ivar dataname: data (or topic) name of the command.
+    :ivar seq: sequence number, or None if the command carries none.
+    :ivar codec: codec of the request, which replies are made in.
+    :ivar received: `time.perf_counter()` when the Interest arrived.
+    """
+
+    __slots__ = ('int_name', 'int_param', 'app_param', 'raw_packet', 'prefix', 'command',
+        'dataname', 'seq', 'codec', 'received')
+
+    def __init__(self, int_name, int_param, app_param, raw_packet=None, prefix=None,
+                 command=None, dataname="/", seq=None, codec=None):
+        self.int_name, self.int_param = int_name, int_param
+        self.app_param, self.raw_packet = app_param, raw_packet
+        self.prefix, self.command, self.dataname, self.seq = prefix, command, dataname, seq
+        self.codec = codec
+        self.received = time.perf_counter()
+
+    def __repr__(self):
+        return f"CommandContext({self.command} {self.dataname} seq={self.seq})"
+
+
+class CommandParser(object):
+    """
+    Parses command Interest names into `CommandContext`s.
+
+    Names are matched component by component against the prefixes and the commands,
+        which are encoded once here, so that parsing a name takes neither URI
+        conversions nor string splits. Generic components are decoded from their
+        UTF-8 values directly, as `PSKCmd.parse_command` unquotes their URIs.
+
+    :param prefixes: prefixes to which commands are sent, in the order to be matched.
+    :param commands: command strings.
+    :param sequenced: commands whose last component is always a sequence number.
+    :param numbered: commands whose last component is a sequence number if decimal.
+    """
+
+    def __init__(self, prefixes, commands, sequenced=(), numbered=()):
+        self.prefixes = [(prefix, [bytes(c) for c in Name.from_str(prefix)])
+            for prefix in prefixes]
+        self.commands = {bytes(Name.from_str(command)[0]): command for command in commands}
+        self.sequenced, self.numbered = frozenset(sequenced), frozenset(numbered)
+
+    def parse(self, int_name, int_param, app_param, raw_packet=None):
+        """
+        :return: a CommandContext, or None if `int_name` is not a command.
+        """
+        for prefix, components in self.prefixes:
+            n = len(components)
+            if len(int_name) > n and int_name[:n] == components:
+                break
+        else:
+            return None
+        command = self.commands.get(bytes(int_name[n]))
+        if command is None:
+            return None
+        parts = [component_str(c) for c in int_name[n+1:]
+            if Component.get_type(c) != Component.TYPE_PARAMETERS_SHA256]
+        seq = None
+        if parts and (command in self.sequenced or
+                      command in self.numbered and parts[-1].isdecimal()):
+            last = parts.pop()
+            seq = int(last) if last.isdecimal() else None
+        return CommandContext(int_name, int_param, app_param, raw_packet, prefix, command,
+            "/" + "/".join(parts), seq)
+
+def component_str(component):
+    if Component.get_type(component) == Component.TYPE_GENERIC:
+        return bytes(Component.get_value(component)).decode('utf-8', 'replace')
+    return urllib.parse.unquote(Component.to_str(component))
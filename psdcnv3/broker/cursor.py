@@ -0,0 +1,79 @@
+# Cursor sessions for paginated subscriptions
+
+import itertools, secrets, time
+
+class Cursors(object):
+    """
+    Resumable match iterators of paginated ST and SL requests.
+
+    A request with `page_size` in its subinfo gets the first page of matches,
+        and a continuation token if more matches remain. The iterator which produced
+        the page is kept under the token, and resumed by the request with the token
+        as `cursor` in its subinfo.
+    Sessions are kept in the order of their expiry, so that sweeping touches only
+        the expired ones. At most `capacity` sessions are kept, and the oldest ones
+        are dropped first.
+
+    :ivar ttl: seconds a session is kept alive after its last page.
+    :ivar capacity: maximum number of sessions.
+    """
+
+    def __init__(self, ttl=30, capacity=1024):
+        self.ttl = ttl
+        self.capacity = capacity
+        self._sessions = {}         # token -> (expires, iterator, items read ahead)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, token):
+        return token in self._sessions
+
+    def first(self, iterator, page_size):
+        """
+        Takes the first page of at most `page_size` items from `iterator`, and keeps
+            the rest as a session if there are any.
+
+        :return: (items, token of the session or None if `iterator` was exhausted)
+        """
+        return self._take(iterator, [], page_size, None)
+
+    def next(self, token, page_size):
+        """
+        Takes the next page of at most `page_size` items from the session of `token`.
+
+        :return: (items, `token` or None if the session was exhausted)
+        :raise KeyError: if the session is unknown or expired.
+        """
+        now = time.monotonic()
+        session = self._sessions.pop(token, None)
+        if session is None or session[0] < now:
+            raise KeyError(token)
+        _, iterator, head = session
+        return self._take(iterator, head, page_size, token)
+
+    def sweep(self, now=None):
+        """
+        Drops the expired sessions.
+        """
+        now = time.monotonic() if now is None else now
+        sessions = self._sessions
+        while sessions:
+            token = next(iter(sessions))
+            if sessions[token][0] >= now:
+                break
+            del sessions[token]
+
+    def _take(self, iterator, head, page_size, token):
+        # One more item than a page is read ahead to know if the session should be kept
+        items = head + list(itertools.islice(iterator, page_size + 1 - len(head)))
+        if len(items) <= page_size:
+            return items, None
+        now = time.monotonic()
+        self.sweep(now)
+        if token is None:
+            token = secrets.token_hex(8)
+        self._sessions[token] = (now + self.ttl, iterator, items[page_size:])
+        while len(self._sessions) > self.capacity:
+            del self._sessions[next(iter(self._sessions))]
+        return items[:page_size], token
@@ -0,0 +1,141 @@
+# Single-flight and result cache of subscriptions
+
+import asyncio, sys, time
+
+from psdcnv3.names import Subscriptions
+from psdcnv3.names.Filter import compile
+
+class Flights(object):
+    """
+    Coalesces identical ST and SL requests into one computation of their matches,
+        and keeps the results in front of the names.
+
+    Requests are identified by keys of (scope, topic, servicetoken). A request arriving
+        while the matches of its key are being computed awaits the same computation
+        rather than walking the names again. The result is then kept for `ttl` seconds,
+        unless a data name matching the topic is advertised or unadvertised in the
+        scope, which drops it at once.
+    Topics of kept results are indexed by scope in `Subscriptions`, so that
+        invalidation visits only the topics matching the changed data name.
+        At most `capacity` results are kept, and the least recently used ones are
+        dropped first.
+
+    :ivar ttl: seconds a result is kept. 0 to share only computations in progress.
+    :ivar capacity: maximum number of results kept.
+    :ivar used: approximate bytes taken by the results kept.
+    :ivar hits: requests answered by kept results.
+    :ivar shared: requests which awaited a computation in progress.
+    :ivar misses: requests which started a computation.
+    """
+
+    def __init__(self, ttl=60, capacity=4096):
+        self.ttl = ttl
+        self.capacity = capacity
+        self.used = 0
+        self.hits = self.shared = self.misses = 0
+        self.invalidations = self.evictions = 0
+        self._flights = {}          # key -> Future of a computation in progress
+        self._results = {}          # key -> (expires, result, size), least recent first
+        self._index = {}            # scope -> Subscriptions of topics kept
+        self._keys = {}             # (scope, topic) -> keys kept
+        self._stale = set()         # Keys invalidated while in progress
+
+    def __len__(self):
+        return len(self._results)
+
+    def stats(self):
+        """
+        Returns counters of the results kept.
+        """
+        lookups = self.hits + self.shared + self.misses
+        return {
+            'items': len(self._results), 'capacity': self.capacity, 'used': self.used,
+            'hits': self.hits, 'shared': self.shared, 'misses': self.misses,
+            'hit_ratio': (self.hits + self.shared) / lookups if lookups else 0.0,
+            'invalidations': self.invalidations, 'evictions': self.evictions
+        }
+
+    async def run(self, key, make):
+        """
+        Returns the result for `key`, either kept, in progress, or computed by
+            awaiting `make()`.
+        """
+        result = self._results.get(key)
+        if result is not None:
+            if result[0] > time.monotonic():
+                self._results[key] = self._results.pop(key)     # Most recently used
+                self.hits += 1
+                return result[1]
+            self._drop(key)
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.shared += 1
+            # Shielded not to cancel the computation with a cancelled waiter
+            return await asyncio.shield(flight)
+        self.misses += 1
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await make()
+        except BaseException as e:
+            flight.set_exception(e)
+            flight.exception()          # Retrieved, even if nobody awaits it
+            raise
+        else:
+            flight.set_result(result)
+            if self.ttl and self.capacity and key not in self._stale:
+                self._keep(key, result)
+            return result
+        finally:
+            del self._flights[key]
+            self._stale.discard(key)
+
+    def invalidate(self, scope, dataname):
+        """
+        Drops results of topics in `scope` which `dataname` matches, and keeps
+            results in progress for them from being kept.
+        """
+        index = self._index.get(scope)
+        if index is not None:
+            for topic in list(index.matches(dataname)):
+                for key in list(self._keys[(scope, topic)]):
+                    self._drop(key)
+                    self.invalidations += 1
+        for key in self._flights:
+            if key[0] == scope and compile(key[1]).match(dataname):
+                self._stale.add(key)
+
+    def _keep(self, key, result):
+        size = footprint(result)
+        self._results[key] = (time.monotonic() + self.ttl, result, size)
+        self.used += size
+        scope, topic = key[0], key[1]
+        keys = self._keys.get((scope, topic))
+        if keys is None:
+            keys = self._keys[(scope, topic)] = set()
+            index = self._index.get(scope)
+            if index is None:
+                index = self._index[scope] = Subscriptions(capacity=0)
+            index.subscribe(topic)
+        keys.add(key)
+        while len(self._results) > self.capacity:
+            self._drop(next(iter(self._results)))
+            self.evictions += 1
+
+    def _drop(self, key):
+        _, _, size = self._results.pop(key)
+        self.used -= size
+        scope, topic = key[0], key[1]
+        keys = self._keys[(scope, topic)]
+        keys.discard(key)
+        if not keys:
+            del self._keys[(scope, topic)]
+            self._index[scope].unsubscribe(topic)
+
+def footprint(obj):
+    """
+    Returns approximate bytes taken by `obj` made of lists, tuples, and strings.
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple)):
+        size += sum(footprint(item) for item in obj)
+    return size
@@ -2,12 +2,16 @@ from ndn.encoding import Name
 from ndn.encoding.ndn_format_0_3 import parse_data
 from ndn.utils import gen_nonce
 from ratelimit import limits
-import asyncio, pickle, base64, random, logging, json, math
-import sys
+import asyncio, pickle, base64, random, logging
+import sys, time
 
 from psdcnv3.psk import *
 from psdcnv3.utils import *
+from psdcnv3.psk.codec import encode, decode
 from psdcnv3.store.Store import Metadata
+from psdcnv3.broker.profiler import Sampler
+
+MATCH_BATCH = 1024      # Matches walked between yields to the event loop
 
 ### UTILITIES ###
 def check_rate(def_rate):
@@ -29,33 +33,59 @@ def validate(broker, dataname, servicetoken):
         return servicetoken == "hasta la vista"
     return True
 
-def answer(broker, int_name, status='OK', value=None, reason=None):
+def answer(broker, ctx, status='OK', value=None, reason=None):
     response = {}
     response['status'] = status
     if value is not None:
         response['value'] = value
     if reason is not None:
         response['reason'] = reason
-    broker.app.put_data(int_name,
-        content=json.dumps(response).encode(), freshness_period=1)
+    respond(broker, ctx, response)
+
+def respond(broker, ctx, response):
+    """
+    Replies `response` to the request of `ctx` in the codec of the request.
+    """
+    broker.app.put_data(ctx.int_name, content=encode(response, ctx.codec), freshness_period=1)
+
+
+def advertise(broker, names, rn_name, dataname, pub_moved=False):
+    """
+    Advertises `dataname` to `names` (either `broker.names` or `broker.local`),
+        and records it to the journal.
+    """
+    names.advertise(rn_name, dataname, pub_moved)
+    scope = 'names' if names is broker.names else 'local'
+    broker.flights.invalidate(scope, dataname)
+    broker.journal.record('advertise', scope, rn_name, dataname, pub_moved)
+
+def unadvertise(broker, names, dataname):
+    names.unadvertise(dataname)
+    scope = 'names' if names is broker.names else 'local'
+    broker.flights.invalidate(scope, dataname)
+    broker.journal.record('unadvertise', scope, dataname)
+
+def record_metadata(broker, dataname):
+    md = broker.store.metadata[dataname]
+    broker.journal.record('metadata', dataname, md.fst, md.lst)
 
 
 ### PUB/SUB HANDLERS ###
 
 ### PUBADV (PA) Handler ###
-async def handle_PA(broker, int_name, int_param, app_param, psk_parse):
-    app_param = json.loads(bytes(app_param).decode())
-    pubadvinfo = app_param['pubadvinfo']
+def pubadv(broker, pubadvinfo, rn_name):
+    """
+    Shared by both the single and the batch forms of handle_PA.
+    Advertises `pubadvinfo['dataname']` published at `rn_name`, and returns the response.
+    """
     topicscope = int(pubadvinfo['topicscope'])
-    rn_name = param_value(app_param, 'rninfo', 'brokername')
-    dataname = psk_parse['dataname']
-    pubadvinfo['dataname'] = dataname
+    dataname = pubadvinfo['dataname']
     response = {'new_rn': rn_name}
 
     # Chek if dataname was already advertised before
     def redefine_or_decline(condition, names, rn_name, dataname, extra_flag, response):
         if condition:
-            names.advertise(rn_name, dataname, extra_flag)
+            advertise(broker, names, rn_name, dataname, extra_flag)
             response['status'] = "OK"
             action = "redefined"
         else:
@@ -64,10 +94,10 @@ async def handle_PA(broker, int_name, int_param, app_param, psk_parse):
             action = "declined"
         return action
 
-    redefine = param_value(app_param, 'pubadvinfo', 'redefine')
+    redefine = pubadvinfo.get('redefine')
     if dataname in broker.names:
         response['old_rn'] = broker.names[dataname].rn_names[-1]
-        pub_moved = param_value(app_param, 'pubadvinfo', 'pub_moved')
+        pub_moved = pubadvinfo.get('pub_moved')
         action = redefine_or_decline(bool(redefine) or pub_moved,
             broker.names, rn_name, dataname, pub_moved, response)
     elif dataname in broker.local:
@@ -77,9 +107,9 @@ async def handle_PA(broker, int_name, int_param, app_param, psk_parse):
         # Really advertise dataname
         action = "advertised"
         if topicscope == TopicScope.GLOBAL:
-            broker.names.advertise(rn_name, dataname)
+            advertise(broker, broker.names, rn_name, dataname)
         else:
-            broker.local.advertise(broker.id, dataname)
+            advertise(broker, broker.local, broker.id, dataname)
             action += " locally"
         response['status'] = "OK"
 
@@ -88,22 +118,49 @@ async def handle_PA(broker, int_name, int_param, app_param, psk_parse):
         storageprefix = pubadvinfo['storageprefix']
         if storageprefix:
             broker.names[dataname].storageprefix = storageprefix
+            broker.flights.invalidate('names', dataname)
+            broker.journal.record('storageprefix', dataname, storageprefix)
             response['storageprefix'] = storageprefix
             rn_name = storageprefix
 
     # All done
-    broker.logger.info(f"PA {action} {dataname}@{rn_name}")
+    broker.logger.info("PA %s %s@%s", action, dataname, rn_name)
     response['broker'] = broker.id
-    response = json.dumps(response).encode()
-    broker.app.put_data(int_name, content=response, freshness_period=1)
+    return response
+
+def pubadvs(broker, pubadvinfos, rn_name):
+    """
+    Advertises the names of a batch PA, and returns their responses in order.
+        A name failed doesn't fail the others.
+    """
+    responses = []
+    for pubadvinfo in pubadvinfos:
+        try:
+            response = pubadv(broker, pubadvinfo, rn_name)
+        except Exception as e:
+            response = {'status': "ERR", 'reason': f"{type(e).__name__} {e}"}
+        response['dataname'] = pubadvinfo.get('dataname')
+        responses.append(response)
+    return responses
+
+async def handle_PA(broker, ctx):
+    app_param = ctx.app_param
+    rn_name = param_value(app_param, 'rninfo', 'brokername')
+    if 'pubadvinfos' in app_param:
+        # Batch form, answered with the responses of the names in order
+        answer(broker, ctx, value=pubadvs(broker, app_param['pubadvinfos'], rn_name))
+        return
+    pubadvinfo = app_param['pubadvinfo']
+    pubadvinfo['dataname'] = ctx.dataname
+    respond(broker, ctx, pubadv(broker, pubadvinfo, rn_name))
 # End handle_PA
 
 ### PUBUNADV (PU) Handler ###
-async def handle_PU(broker, int_name, int_param, app_param, psk_parse):
-    app_param = json.loads(bytes(app_param).decode())
+async def handle_PU(broker, ctx):
+    app_param = ctx.app_param
     pubadvinfo = app_param['pubadvinfo']
     topicscope = int(pubadvinfo['topicscope'])
-    dataname = psk_parse['dataname']
+    dataname = ctx.dataname
     response = {}
     response['broker'] = broker.id
 
@@ -111,21 +168,21 @@ async def handle_PU(broker, int_name, int_param, app_param, psk_parse):
     if dataname not in names_tree:
         response['status'] = "ERR"
         response['reason'] = "Undefined"
-        broker.logger.debug(f"PU {dataname} undefined")
+        broker.logger.debug("PU %s undefined", dataname)
     else:
-        names_tree.unadvertise(dataname)
-        broker.logger.info(f"PU {dataname} 2")
+        unadvertise(broker, names_tree, dataname)
+        broker.logger.info("PU %s 2", dataname)
         response['status'] = "OK"
 
     # Return response
-    response = json.dumps(response).encode()
-    broker.app.put_data(int_name, content=response, freshness_period=1)
+    respond(broker, ctx, response)
 # End handle_PU
 
 ### PUBDATA (PD) Handler ###
-async def handle_PD(broker, int_name, int_param, app_param, psk_parse):
-    dataname = psk_parse['dataname']
-    seq1 = int(psk_parse['seq'])
+async def handle_PD(broker, ctx):
+    app_param = ctx.app_param
+    dataname = ctx.dataname
+    seq1 = ctx.seq
 
     ### MOBILITY stuff
     if dataname not in broker.psodb:
@@ -143,7 +200,7 @@ async def handle_PD(broker, int_name, int_param, app_param, psk_parse):
                     pubadvinfo=pubmovinfo, rninfo=RNInfo(brokername=broker.id))
             _, _, content = await broker.app.express_interest(
                 Name.from_str(command), interest_param=int_param, app_param=apq_param)
-            content = json.loads(bytes(content).decode())
+            content = decode(content)
             if 'old_rn' in content:
                 old_rn = content['old_rn']
                 new_rn = content['new_rn']
@@ -154,7 +211,7 @@ async def handle_PD(broker, int_name, int_param, app_param, psk_parse):
                     await broker.app.express_interest(Name.from_str(command), 
                         interest_param=int_param, must_be_fresh=True)
                 broker.logger.debug(f"PD copied metadata {dataname} from {old_rn}")
-                content = json.loads(bytes(content).decode())
+                content = decode(content)
                 store_md = pickle.loads(base64.b64decode(content['store_md'].encode()))
                 if 'pso_info' in content:
                     pubmovinfo = content['pso_info']
@@ -162,21 +219,28 @@ async def handle_PD(broker, int_name, int_param, app_param, psk_parse):
                     pubmovinfo = PubAdvInfo(dataname=dataname)
                 store_md.fst = store_md.lst + 1
                 broker.store.metadata[dataname] = store_md
+                record_metadata(broker, dataname)
                 broker.logger.debug(f"PD re-advertised {dataname} from {old_rn} to {new_rn}")
             else:
                 broker.logger.debug(f"PD re-advertise failed. Old RN not found")
                 advertised = False
         else:
             # Append current node to the list of rn_names
-            broker.names.advertise(broker.id, dataname, pub_moved=True)
+            advertise(broker, broker.names, broker.id, dataname, pub_moved=True)
             broker.logger.debug(f"PD adversised {dataname}@{broker.id}")
         if advertised:
             broker.psodb.pubadv(dataname, pubmovinfo)
-            await broker.app.register(dataname, broker.on_data_request)
-            broker.logger.debug(f"PD registered route {dataname}@{broker.id}")
+            broker.journal.record('pubadv', dataname, pubmovinfo)
+            if await broker.register_routes([dataname]):
+                broker.pubunadv(dataname)
+                reason = f"Route {dataname} not registered"
+                answer(broker, ctx, status='ERR', reason=reason)
+                broker.logger.debug(f"PD failed. {reason}")
+                return
+            broker.logger.debug(f"PD routed {dataname}@{broker.id}")
         else:
             reason = f"{dataname} not advertised yet."
-            answer(broker, int_name, status='ERR', reason=reason)
+            answer(broker, ctx, status='ERR', reason=reason)
             broker.logger.debug(f"PD failed. {reason}")
             return
     ### End MOBILITY
@@ -189,81 +253,143 @@ async def handle_PD(broker, int_name, int_param, app_param, psk_parse):
             # Publisher or DIFS storage requested
             reason = f"Publish to {storageprefix} instead"
             broker.logger.debug(f"PD publication to {broker.id} failed. {reason}")
-            answer(broker, int_name, status='storage type', reason=reason)
+            answer(broker, ctx, status='storage type', reason=reason)
             return
 
     # Gather data items for publication using a fetcher
-    app_param = json.loads(app_param.decode())
     prefix = param_value(app_param, 'pubdatainfo', 'data_prefix')
     seq2 = int(param_value(app_param, 'pubdatainfo', 'data_eseq'))
     pub_prefix = param_value(app_param, 'pubdatainfo', 'pub_prefix')
     seq_, plural = (f"-{seq2}", "s") if seq1 != seq2 else ("", "")
     forwarding_hint = [(0, pub_prefix)] if pub_prefix else []
-    broker.logger.debug(f"PD {prefix}/{seq1}{seq_} pub_prefix={pub_prefix}")
+    broker.logger.debug("PD %s/%s%s pub_prefix=%s", prefix, seq1, seq_, pub_prefix)
     seqs = list(range(seq1, seq2+1))
     vals = []
+    started = time.perf_counter()
     async for _, _, _, packet in \
-            segment_fetcher(broker.app, prefix, seq1, seq2,
+            pipelined_fetcher(broker.app, prefix, seq1, seq2,
+                window=config_default("fetch_window_size", 8),
+                max_window=config_default("fetch_max_window_size", 64),
                 forwarding_hint=forwarding_hint, lifetime=INT_LT_10):
         vals.append(packet)     # Collects only raw packets
+    broker.metrics.observe('pd_fetch_seconds', time.perf_counter() - started)
     
     # Check if data all the data items were collected
     if len(seqs) != len(vals):
         lost = len(seqs) - len(vals)
-        answer(broker, int_name, status="ERR", reason=f"PD lost {lost} item{plural}")
+        answer(broker, ctx, status="ERR", reason=f"PD lost {lost} item{plural}")
         return
 
-    # All the expected data items ready. Put them in the Store.
-    broker.logger.debug(f"PD {prefix}/{seq1}{seq_} ({len(vals)} item{plural})")
-    actual = 0
-    for seq, val in zip(seqs, vals):
-        pos = broker.store.set(dataname, val, seq)
-        loc = f"{dataname}/{pos}"
-        if pos <= 0:
-            broker.logger.error(f"PD ignoring invalid location {loc}")
-            continue
-        actual += 1
-        broker.logger.info(f"PD published to {loc}")
-        # See if there are pending interests and process them
-        for data_name, seq_no in list(broker.pending_interests):
-            if dataname == data_name and pos == seq_no:
-                broker.app.put_raw_packet(val)  # val is a raw packet
-                del broker.pending_interests[(data_name, seq_no)]
-                broker.logger.debug(f"PI {loc} processed")
+    # All the expected data items ready. Put them in the Store at once.
+    broker.logger.debug("PD %s/%s%s (%d item%s)", prefix, seq1, seq_, len(vals), plural)
+    started = time.perf_counter()
+    positions = await broker.store.aset_many(dataname, seqs, vals)
+    broker.metrics.observe('storage_seconds', time.perf_counter() - started, (('op', 'set'),))
+    if len(positions) != len(seqs):
+        broker.logger.error(f"PD ignoring {len(seqs) - len(positions)} invalid locations")
+    if positions:
+        record_metadata(broker, dataname)
+    actual = len(positions)
+    published = dict(zip(seqs, vals))
+    for pos in positions:
+        val = published[pos]
+        broker.logger.info("PD published to %s/%s", dataname, pos)
+        # See if there is a pending interest and process it
+        if broker.pending_interests.pop(dataname, pos):
+            broker.app.put_raw_packet(val)  # val is a raw packet
+            broker.logger.debug("PI %s/%s processed", dataname, pos)
 
     # Report number of data items published
-    answer(broker, int_name, value=actual)
+    answer(broker, ctx, value=actual)
 # End handle_PD
 
 ### SUBTOPIC (ST) Handler ###
-async def handle_STx(broker, app_param, topicname, external):
+def iter_matches(broker, app_param, topicname, external):
     """
-    Shared by both handle_ST and handle_SL
+    Shared by both handle_ST and handle_SL.
+    Yields (dataname, rn_names) matching `topicname` lazily, validating them
+        against the service token.
     """
     names_tree = broker.names if external else broker.local
-    matches = [(slot.dataname, slot.rn_names 
-                 if not hasattr(slot, 'storageprefix') else [slot.storageprefix])
-        for slot in names_tree.matches(topicname)]
-    if not broker.validate:
-        return matches
-    # Validate matches against the service token
-    app_param = json.loads(bytes(app_param).decode())
-    servicetoken = param_value(app_param, 'subinfo', 'servicetoken')
-    collect = []
-    for match in matches:
-        name, _ = match
-        if validate(broker, name, servicetoken):
-            collect.append(match)
-        elif external:
-            broker.logger.debug(f"ST {name} service token validation error")
-    return collect
+    servicetoken = param_value(app_param, 'subinfo', 'servicetoken') \
+        if broker.validate else None
+    for slot in names_tree.matches(topicname):
+        name = slot.dataname
+        if not name:
+            continue        # Unadvertised while paginated
+        if broker.validate and not validate(broker, name, servicetoken):
+            if external:
+                broker.logger.debug("ST %s service token validation error", name)
+            continue
+        yield (name, slot.rn_names
+            if not hasattr(slot, 'storageprefix') else [slot.storageprefix])
+
+async def collect_matches(broker, app_param, topicname, external):
+    """
+    Shared by both handle_ST and handle_SL.
+    Collects the matches of `topicname` once for identical requests made at a time,
+        and keeps them until names matching it change.
+        A long walk lets other requests in between batches.
+    """
+    servicetoken = param_value(app_param, 'subinfo', 'servicetoken') \
+        if broker.validate else None
+    key = ('names' if external else 'local', topicname, servicetoken)
+    async def walk():
+        matches = []
+        try:
+            for match in iter_matches(broker, app_param, topicname, external):
+                matches.append(match)
+                if len(matches) % MATCH_BATCH == 0:
+                    await asyncio.sleep(0)
+            return matches
+        except RuntimeError:
+            # Names changed under the walk, which is redone without a break
+            return list(iter_matches(broker, app_param, topicname, external))
+    return await broker.flights.run(key, walk)
+
+def paginate(broker, app_param, topicname, external):
+    """
+    Takes a page of matches for a paginated ST or SL request, which has `page_size`
+        in its subinfo. The following pages are resumed from the cursor sessions by
+        `cursor` of subinfo. Matches are not counted ahead, which would take another
+        walk of the names.
+
+    :return: (value, items, token), where `value` is a dict for the reply
+        without the items.
+    :raise KeyError: if the cursor is unknown or expired.
+    """
+    page_size = max(1, int(param_value(app_param, 'subinfo', 'page_size')))
+    cursor = param_value(app_param, 'subinfo', 'cursor')
+    value = {}
+    if cursor:
+        items, token = broker.cursors.next(cursor, page_size)
+    else:
+        iterator = iter_matches(broker, app_param, topicname, external)
+        items, token = broker.cursors.first(iterator, page_size)
+    value['cursor'] = token
+    return value, items, token
 
 @limits(calls=int(check_rate(100)*100), period=100)
-async def handle_ST(broker, int_name, int_param, app_param, psk_parse):
-    topicname = psk_parse['dataname']
-    response = await handle_STx(broker, app_param, topicname, external=True)
-    broker.logger.info(f"ST {topicname} has {len(response)} matches at {broker.id}")
-    answer(broker, int_name, value=response)
+async def handle_ST(broker, ctx):
+    app_param, topicname = ctx.app_param, ctx.dataname
+    if not param_value(app_param, 'subinfo', 'page_size'):
+        response = await collect_matches(broker, app_param, topicname, external=True)
+        broker.logger.info("ST %s has %d matches at %s", topicname, len(response), broker.id)
+        answer(broker, ctx, value=response)
+        return
+    try:
+        value, matches, token = paginate(broker, app_param, topicname, external=True)
+    except KeyError:
+        answer(broker, ctx, status="ERR", reason="Cursor expired")
+        return
+    except RuntimeError:
+        # Names changed under a cursor which can't survive it
+        answer(broker, ctx, status="ERR", reason="Cursor invalidated")
+        return
+    value['matches'] = matches
+    broker.logger.info("ST %s sent %d matches at %s%s",
+        topicname, len(matches), broker.id, " (more)" if token else "")
+    answer(broker, ctx, value=value)
 # End handle_ST
 
 ### SUBMANI (SM) Handler ###
@@ -280,79 +406,99 @@ async def handle_SMx(broker, dataname, external):
         response['lst'] = md.lst
         if external:
             response['status'] = "OK"
-            broker.logger.info(f"SM {dataname} served at {broker.id}")
+            broker.logger.info("SM %s served at %s", dataname, broker.id)
     elif external:
         response['status'] = "ERR"
         response['reason'] = f"{dataname} not found at {broker.id}"
-        broker.logger.info(f"SM {dataname} not found at {broker.id}")
+        broker.logger.info("SM %s not found at %s", dataname, broker.id)
     return response
 
-async def handle_SM(broker, int_name, int_param, app_param, psk_parse):
-    response = await handle_SMx(broker, psk_parse['dataname'], external=True)
-    response = json.dumps(response).encode()
-    broker.app.put_data(int_name, content=response, freshness_period=1)
+async def handle_SM(broker, ctx):
+    response = await handle_SMx(broker, ctx.dataname, external=True)
+    respond(broker, ctx, response)
 # End handle_SM
 
 ### SUBLOCAL (SL) Handler ###
-@limits(calls=int(check_rate(100)*100), period=100)
-async def handle_SL(broker, int_name, int_param, app_param, psk_parse):
-    topicname = psk_parse['dataname']
-    matches = await handle_STx(broker, app_param, topicname, external=False)
+async def manifests(broker, matches):
     collect = []
     for dataname, _ in matches:
         manifest = await handle_SMx(broker, dataname, external=False)
         if manifest:
             collect.append((dataname, manifest['fst'], manifest['lst']))
-    response = {
-        'broker': broker.id,
-        'manifests': collect
-    }
-    broker.logger.info(f"SL {topicname} has {len(collect)} matches at {broker.id}")
-    answer(broker, int_name, value=response)
+    return collect
+
+@limits(calls=int(check_rate(100)*100), period=100)
+async def handle_SL(broker, ctx):
+    app_param, topicname = ctx.app_param, ctx.dataname
+    if not param_value(app_param, 'subinfo', 'page_size'):
+        matches = await collect_matches(broker, app_param, topicname, external=False)
+        collect = await manifests(broker, matches)
+        response = {
+            'broker': broker.id,
+            'manifests': collect
+        }
+        broker.logger.info("SL %s has %d matches at %s", topicname, len(collect), broker.id)
+        answer(broker, ctx, value=response)
+        return
+    try:
+        response, matches, token = paginate(broker, app_param, topicname, external=False)
+    except KeyError:
+        answer(broker, ctx, status="ERR", reason="Cursor expired")
+        return
+    except RuntimeError:
+        answer(broker, ctx, status="ERR", reason="Cursor invalidated")
+        return
+    # A page may have fewer manifests than matches if some data are not stored yet
+    collect = await manifests(broker, matches)
+    response['broker'] = broker.id
+    response['manifests'] = collect
+    broker.logger.info("SL %s sent %d matches at %s%s",
+        topicname, len(collect), broker.id, " (more)" if token else "")
+    answer(broker, ctx, value=response)
 # End of handle_SL
 
 
 ### ADMIN COMMAND HANDLERS ###
 
 ### Status Handler ###
-async def handle_Status(broker, int_name, int_param, app_param, psk_parse):
-    c_size = broker.status_chunk_size
-    seq = psk_parse['seq']
-    seq = int(seq) if seq is not None else 1
-    def make_chunk(n):
-        return broker.status[(n-1)*c_size:n*c_size]
-    if seq <= 1:
-        app_param = json.loads(bytes(app_param).decode()) if app_param else {}
+async def handle_Status(broker, ctx):
+    if (ctx.seq or 1) <= 1:
+        app_param = ctx.app_param or {}
         window = app_param['window_size'] if 'window_size' in app_param else None
         window = int(window) if window is not None \
                              else config_default('status_report_window_size', 0)
-        broker.status = json.dumps(broker.report(window))
-        broker.status_chunks = math.ceil(len(broker.status) / c_size)
-        response = json.dumps({'count': broker.status_chunks, 'chunk': make_chunk(1)}).encode()
-        broker.app.put_data(int_name, content=response, freshness_period=1)
+        version, _, chunks = broker.reports.get(window, broker.report)
+        respond(broker, ctx, {'count': len(chunks), 'version': version,
+            'chunk': chunks[0] if chunks else ""})
     else:
-        broker.app.put_data(int_name, content=make_chunk(seq).encode(), freshness_period=1)
-    if seq == broker.status_chunks:
-        broker.status = None
-        # broker.logger.debug(f"Status/report {broker.id} sent {broker.status_chunks} chunks")
+        put_chunk(broker, ctx, broker.reports)
+
+def put_chunk(broker, ctx, reports):
+    """
+    Answers the `seq`-th chunk of a report in `reports`.
+    Chunks of a version are kept for a while, so concurrent fetches don't clobber
+        each other. Chunks requested without a version are from the latest report.
+    """
+    version = ctx.dataname.split('/')[-1]
+    version = int(version) if version.isdecimal() else None
+    chunk = reports.chunk(ctx.seq, version)
+    broker.app.put_data(ctx.int_name, content=(chunk or "").encode(), freshness_period=1)
 
 ### Network Handler ###
-async def handle_Network(broker, int_name, int_param, app_param, psk_parse):
-    action = psk_parse['dataname']
+async def handle_Network(broker, ctx):
+    action = ctx.dataname
     if action == '/set':
-        app_param = json.loads(bytes(app_param).decode())
-        rn_names = list(param_value(app_param, 'rninfo', 'brokername'))
+        rn_names = list(param_value(ctx.app_param, 'rninfo', 'brokername'))
         broker.network = rn_names
-        answer(broker, int_name)
+        answer(broker, ctx)
         broker.logger.info(f"Network/set {broker.id}'s network")
     elif action == '/discover':
         response = {'brokers': broker.network}
-        response = json.dumps(response).encode()
         broker.logger.info(f"Network/discover at {broker.id}")
-        broker.app.put_data(int_name, content=response, freshness_period=1)
+        respond(broker, ctx, response)
     else:
         reason = f"Unknown action {action} for command 'Network'"
-        answer(broker, int_name, status='ERR', reason=reason)
+        answer(broker, ctx, status='ERR', reason=reason)
         broker.logger.error(reason)
 
 ### Save Handler ###
@@ -360,14 +506,14 @@ async def safe_save(broker):
     await broker.save_world(periodic=False)
     await broker.store.flush(periodic=False)
 
-async def handle_Save(broker, int_name, int_param, app_param, psk_parse):
+async def handle_Save(broker, ctx):
     await safe_save(broker)
-    answer(broker, int_name)
+    answer(broker, ctx)
     broker.logger.info(f"Save broker {broker.id}'s world and store")
 
 ### Shutdown Handler ###
-async def handle_Shutdown(broker, int_name, int_param, app_param, psk_parse):
-    answer(broker, int_name)
+async def handle_Shutdown(broker, ctx):
+    answer(broker, ctx)
     await safe_save(broker)
     broker.logger.info(f"Shut down broker {broker.id}")
     broker.app.shutdown()
@@ -377,9 +523,41 @@ async def handle_Shutdown(broker, int_name, int_param, app_param, psk_parse):
     await asyncio.gather(*tasks)
     asyncio.get_event_loop().stop()
 
+### Profile Handler ###
+async def handle_Profile(broker, ctx):
+    """
+    Starts (Profile/start) or stops (Profile/stop) sampling the stacks of the event loop.
+    Stopping answers the collapsed stacks in chunks as the Status handler does.
+    """
+    if (ctx.seq or 1) > 1:
+        put_chunk(broker, ctx, broker.profiles)
+        return
+    action = ctx.dataname
+    if action == '/start':
+        if broker.profiler is not None:
+            answer(broker, ctx, status="ERR", reason="Already profiling")
+            return
+        broker.profiler = Sampler(config_default("profile_interval", 0.005))
+        broker.profiler.start()         # Handlers run on the event loop thread
+        answer(broker, ctx)
+        broker.logger.info(f"Profile started at {broker.id}")
+    elif action == '/stop':
+        if broker.profiler is None:
+            answer(broker, ctx, status="ERR", reason="Not profiling")
+            return
+        profiler, broker.profiler = broker.profiler, None
+        stacks = profiler.stop()
+        profile = {'interval': profiler.interval, 'samples': profiler.samples, 'stacks': stacks}
+        version, _, chunks = broker.profiles.get('profile', lambda _: profile)
+        respond(broker, ctx, {'count': len(chunks), 'version': version,
+            'chunk': chunks[0] if chunks else ""})
+        broker.logger.info(f"Profile stopped at {broker.id} ({profiler.samples} samples)")
+    else:
+        answer(broker, ctx, status="ERR", reason=f"Unknown action {action}")
+
 ### Deliver Metadata ###
-async def handle_Metadata(broker, int_name, int_param, app_param, psk_parse):
-    dataname = psk_parse['dataname']
+async def handle_Metadata(broker, ctx):
+    dataname = ctx.dataname
     response = {}
     # Store metadata
     store_md = broker.store.metadata[dataname] \
@@ -389,6 +567,10 @@ async def handle_Metadata(broker, int_name, int_param, app_param, psk_parse):
     if dataname in broker.psodb:
         response['pso_info'] = broker.psodb[dataname] 
     # await broker.app.unregister(dataname)   # Disconnets route for old node
-    response = json.dumps(response).encode()
-    broker.app.put_data(int_name, content=response, freshness_period=1)
+    respond(broker, ctx, response)
     broker.logger.debug(f"Metadata for {dataname} delivered")
+
+### Command Table ###
+# Coroutines of the commands, looked up once rather than per request
+handlers = {command: globals()['handle_' + command]
+    for command in PSKCmd.cmd_list if 'handle_' + command in globals()}
@@ -0,0 +1,163 @@
+# Write-ahead journal of the broker's world
+
+import asyncio, glob, os, pickle, struct, zlib
+
+_FRAME = struct.Struct('>II')       # Length and CRC32 of a record
+
+class Journal(object):
+    """
+    Write-ahead journal of the mutations made to a broker's world, i.e. the names,
+        store metadata, and psodb.
+
+    Mutations are recorded as (lsn, op, args) tuples, and appended to the log segments
+        `<prefix>.wal.<n>` in groups. The whole world is checkpointed to `<prefix>.world`
+        from time to time, and the segments covered by the checkpoint are removed.
+        Checkpoints are written to a temporary file, synced, and then renamed,
+        so that a crash leaves either the previous or the new checkpoint.
+    A world is restored by loading the checkpoint, and then replaying the records
+        whose LSNs are larger than that of the checkpoint.
+    File I/O is done in the executor not to block the event loop.
+
+    :ivar lsn: log sequence number of the last record.
+    :ivar checkpointed: LSN of the last checkpoint.
+    """
+
+    def __init__(self, prefix):
+        """
+        :param prefix: path prefix of the checkpoint and log segment files.
+        """
+        self.prefix = prefix
+        self.world = prefix + '.world'
+        self.lsn = 0
+        self.checkpointed = 0
+        self.segment = 0
+        self._buffer = []
+        self._lock = None
+
+    def __str__(self):
+        return f"journal: lsn {self.lsn} checkpointed at {self.checkpointed}"
+
+    def churn(self):
+        """
+        Number of records made since the last checkpoint.
+        """
+        return self.lsn - self.checkpointed
+
+    def record(self, op, *args):
+        """
+        Records a mutation `op` with `args`. The record is written out by the next `commit`.
+
+        :return: LSN of the record.
+        """
+        self.lsn += 1
+        payload = pickle.dumps((self.lsn, op, args))
+        self._buffer.append(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+        return self.lsn
+
+    def segments(self):
+        """
+        Returns paths of the log segments in the order of their creation.
+        """
+        paths = glob.glob(glob.escape(self.prefix) + '.wal.*')
+        return sorted(paths, key=lambda path: int(path.rsplit('.', 1)[1]))
+
+    async def commit(self):
+        """
+        Writes the records made so far to the current log segment.
+        """
+        async with self.lock():
+            records, self._buffer = self._buffer, []
+            if records:
+                await _offload(self.append, self.segment, records)
+
+    async def checkpoint(self, snapshot):
+        """
+        Checkpoints the world, and removes the log segments covered by the checkpoint.
+
+        :param snapshot: function returning a picklable copy of the world
+            reflecting all the records made so far.
+        """
+        async with self.lock():
+            # Snapshot and LSN are taken together without yielding to the event loop
+            lsn, world = self.lsn, snapshot()
+            records, self._buffer = self._buffer, []
+            segment, self.segment = self.segment, self.segment + 1
+            if records:
+                await _offload(self.append, segment, records)
+            await _offload(self.save, world, lsn, segment)
+            self.checkpointed = lsn
+
+    def append(self, segment, records):
+        with open(f"{self.prefix}.wal.{segment}", "ab") as f:
+            f.write(b''.join(records))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def save(self, world, lsn, segment):
+        world['lsn'] = lsn
+        temp = self.world + '.tmp'
+        with open(temp, "wb") as f:
+            f.write(pickle.dumps(world))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.world)
+        _sync_dir(self.world)
+        # Records up to lsn are in the checkpoint now
+        for path in self.segments():
+            if int(path.rsplit('.', 1)[1]) <= segment:
+                os.remove(path)
+
+    def load(self):
+        """
+        Reads the last checkpoint and the records made after it.
+
+        :return: (world, records) where world is None if no checkpoint was made.
+        """
+        world, lsn = None, 0
+        if os.path.isfile(self.world):
+            with open(self.world, "rb") as f:
+                world = pickle.loads(f.read())
+            lsn = world.get('lsn', 0)
+        records = []
+        segments = self.segments()
+        for path in segments:
+            records.extend(record for record in _read(path) if record[0] > lsn)
+        # Continue after the last record on a new segment
+        last = records[-1][0] if records else lsn
+        self.lsn, self.checkpointed = max(last, lsn), lsn
+        if segments:
+            self.segment = int(segments[-1].rsplit('.', 1)[1]) + 1
+        return world, records
+
+    def lock(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+def _read(path):
+    # Yields records in a log segment up to the first torn or corrupt record
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + _FRAME.size <= len(data):
+        length, crc = _FRAME.unpack_from(data, offset)
+        payload = data[offset + _FRAME.size:offset + _FRAME.size + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        yield pickle.loads(payload)
+        offset += _FRAME.size + length
+
+def _sync_dir(path):
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+async def _offload(func, *args):
+    return await asyncio.get_event_loop().run_in_executor(None, func, *args)
@@ -8,19 +8,39 @@ Logger configuration is also described in PSDCNv3 configuration file.
 
 from psdcnv3.utils.config import config_value
 import sys
+import atexit
+import queue
 import logging
 import logging.handlers
 
 __Logger_inited = None
 logger = None
+listener = None
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler which leaves records unformatted.
+
+    `QueueHandler.prepare` merges the arguments into the message in the logging thread.
+        As the records never leave the process, they are queued as they are, and
+        formatted by the handlers of the listener thread instead.
+    """
+    def prepare(self, record):
+        return record
 
 def init_logger(name="psdcnv3"):
     """
     Initialize a logger as specified in the configuration file.
     Currently, logging level, external file name for fileHandler, and
     stream for StreamHandler can be specified.
+
+    The logger only enqueues records, and a background listener thread formats and
+    writes them through the handlers, so that the event loop never waits for files.
+    Callers on hot paths should pass arguments rather than formatted messages
+    (e.g. `logger.debug("SD %s processed", name)`), so that nothing is formatted
+    when the level is disabled.
     """
-    global __Logger_inited, logger
+    global __Logger_inited, logger, listener
 
     if __Logger_inited:
         return logger
@@ -49,7 +69,21 @@ def init_logger(name="psdcnv3"):
 
     for handler in handlers:
         handler.setFormatter(formatter)
-        logger.addHandler(handler)
+
+    records = queue.SimpleQueue()
+    logger.addHandler(DeferredQueueHandler(records))
+    listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_logger)
 
     __Logger_inited = True
     return logger
+
+def stop_logger():
+    """
+    Writes out the records queued so far, and stops the listener thread.
+    """
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
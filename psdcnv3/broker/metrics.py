@@ -0,0 +1,166 @@
+# Broker metrics in Prometheus text format
+
+from bisect import bisect_left
+
+def log_buckets(lowest, highest, precision):
+    """
+    Returns upper bounds of HDR-style buckets from `lowest` to `highest`, with `precision`
+        buckets per doubling, so that any value in range is kept within a relative
+        error of 2**(1/precision) - 1 regardless of its magnitude.
+    """
+    bounds, i = [], 0
+    while not bounds or bounds[-1] < highest:
+        bounds.append(float(f"{lowest * 2 ** (i / precision):.3g}"))
+        i += 1
+    return tuple(sorted(set(bounds)))
+
+# Upper bounds of latency buckets in seconds, from 50us to about a minute within 19%
+LATENCY_BUCKETS = log_buckets(0.00005, 60.0, 4)
+
+class Histogram(object):
+    """
+    Counts of observed values in buckets of upper `bounds`, plus their sum.
+        Counts are kept per bucket, and accumulated only when rendered.
+    """
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)     # The last one for +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Returns the upper bound of the bucket where the `q`-quantile falls.
+            None if nothing was observed, and inf if it falls beyond the last bound.
+        """
+        if not self.count:
+            return None
+        rank, cumulative = q * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics(object):
+    """
+    Registry of counters, histograms, and gauges of a broker.
+
+    Recording a metric is a dict lookup and an addition, so that the data path pays
+        next to nothing for it. Gauges are functions called only when the metrics are
+        rendered, so that sizes of the broker tables are read on demand.
+    Metrics are identified by names and labels. Labels are tuples of (name, value)
+        pairs, which callers may build once and reuse.
+
+    :ivar prefix: prefix of the metric names when rendered.
+    """
+
+    def __init__(self, prefix="psdcn"):
+        self.prefix = prefix
+        self.counters = {}          # name -> {labels: value}
+        self.histograms = {}        # name -> {labels: Histogram}
+        self.levels = {}            # name -> {labels: value}
+        self.gauges = {}            # name -> (type, function)
+        self.helps = {}
+
+    def describe(self, name, help):
+        self.helps[name] = help
+
+    def inc(self, name, labels=(), n=1):
+        counter = self.counters.get(name)
+        if counter is None:
+            counter = self.counters[name] = {}
+        counter[labels] = counter.get(labels, 0) + n
+
+    def observe(self, name, value, labels=()):
+        histograms = self.histograms.get(name)
+        if histograms is None:
+            histograms = self.histograms[name] = {}
+        histogram = histograms.get(labels)
+        if histogram is None:
+            histogram = histograms[labels] = Histogram()
+        histogram.observe(value)
+
+    def level(self, name, labels=(), n=1):
+        """
+        Raises (or lowers with negative `n`) a gauge such as the number of requests
+            in flight.
+        """
+        levels = self.levels.get(name)
+        if levels is None:
+            levels = self.levels[name] = {}
+        levels[labels] = levels.get(labels, 0) + n
+
+    def summary(self, name, quantiles=(0.5, 0.9, 0.99)):
+        """
+        Returns {labels: {'count', 'mean', 'p50', ...}} of histograms of `name`.
+        """
+        summary = {}
+        for labels, histogram in self.histograms.get(name, {}).items():
+            if not histogram.count:
+                continue
+            values = {'count': histogram.count, 'mean': histogram.sum / histogram.count}
+            for q in quantiles:
+                values[f"p{int(q * 100)}"] = histogram.quantile(q)
+            summary[labels] = values
+        return summary
+
+    def gauge(self, name, function, type='gauge'):
+        """
+        Registers `function` which returns the value of `name` when rendered.
+            The function may return a dict of {labels: value} for labeled values,
+            or None if there is nothing to report.
+        """
+        self.gauges[name] = (type, function)
+
+    def render(self):
+        """
+        Returns the metrics in Prometheus text exposition format.
+        """
+        lines = []
+        def head(name, type):
+            if name in self.helps:
+                lines.append(f"# HELP {self.prefix}_{name} {self.helps[name]}")
+            lines.append(f"# TYPE {self.prefix}_{name} {type}")
+        for name, counter in self.counters.items():
+            head(name, 'counter')
+            for labels, value in counter.items():
+                lines.append(f"{self.prefix}_{name}{render_labels(labels)} {value}")
+        for name, histograms in self.histograms.items():
+            head(name, 'histogram')
+            for labels, histogram in histograms.items():
+                cumulative = 0
+                bounds = histogram.bounds + ('+Inf',)
+                for bound, count in zip(bounds, histogram.counts):
+                    cumulative += count
+                    le = labels + (('le', bound),)
+                    lines.append(f"{self.prefix}_{name}_bucket{render_labels(le)} {cumulative}")
+                lines.append(f"{self.prefix}_{name}_sum{render_labels(labels)} {histogram.sum}")
+                lines.append(f"{self.prefix}_{name}_count{render_labels(labels)} {histogram.count}")
+        for name, levels in self.levels.items():
+            head(name, 'gauge')
+            for labels, value in levels.items():
+                lines.append(f"{self.prefix}_{name}{render_labels(labels)} {value}")
+        for name, (type, function) in self.gauges.items():
+            value = function()
+            if value is None:
+                continue
+            head(name, type)
+            values = value if isinstance(value, dict) else {(): value}
+            for labels, value in values.items():
+                lines.append(f"{self.prefix}_{name}{render_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+def render_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
@@ -0,0 +1,103 @@
+# Pending interest table
+
+import heapq
+
+class Pit(object):
+    """
+    Pending interest table of a broker.
+
+    Keeps data requests (SD) which arrived before the requested data were published.
+    Entries are indexed by dataname, and then by sequence number, so that a publication
+    only looks at the interests for its own dataname.
+    Expiry times are kept in a min-heap, so that sweeping expired interests only touches
+    the entries which actually expired.
+
+    Heap records are never removed eagerly. A record whose entry was satisfied or
+    superseded by a longer-living interest is simply skipped when it comes to the top.
+
+    :ivar entries: table for dataname to {seq: expiry time} information
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self._timers = []       # Heap of (expires, dataname, seq)
+        self._count = 0
+
+    def __str__(self):
+        return f"pit: {self._count} pending interests for {len(self.entries)} names"
+
+    def __contains__(self, key):
+        dataname, seq = key
+        return dataname in self.entries and seq in self.entries[dataname]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, key):
+        dataname, seq = key
+        return self.entries[dataname][seq]
+
+    def add(self, dataname, seq, expires):
+        """
+        Adds a pending interest for `dataname`/`seq` which expires at `expires`.
+        If a previous interest for the same data lives longer, the new one is subsumed.
+
+        :param dataname: data name of the requested data.
+        :param seq: sequence number of the requested data.
+        :param expires: expiry time of the interest as a UTC timestamp.
+        :return: False if the interest was subsumed by a previous one. True otherwise.
+        """
+        seqs = self.entries.setdefault(dataname, {})
+        if seq in seqs:
+            if seqs[seq] >= expires:
+                return False
+        else:
+            self._count += 1
+        seqs[seq] = expires
+        heapq.heappush(self._timers, (expires, dataname, seq))
+        return True
+
+    def pop(self, dataname, seq, now=None):
+        """
+        Removes the pending interest for `dataname`/`seq` if there is any.
+
+        :param now: current UTC timestamp. If given, an already expired interest
+            is removed but not reported.
+        :return: True if a live pending interest was found. False otherwise.
+        """
+        seqs = self.entries.get(dataname)
+        if not seqs or seq not in seqs:
+            return False
+        expires = self._remove(dataname, seqs, seq)
+        return now is None or expires >= now
+
+    def expire(self, now):
+        """
+        Removes all the pending interests which expired before `now`.
+
+        :param now: current UTC timestamp.
+        :return: list of (dataname, seq) of the expired interests.
+        """
+        expired = []
+        timers = self._timers
+        while timers and timers[0][0] < now:
+            expires, dataname, seq = heapq.heappop(timers)
+            seqs = self.entries.get(dataname)
+            # Skip records of satisfied or renewed interests
+            if not seqs or seqs.get(seq) != expires:
+                continue
+            self._remove(dataname, seqs, seq)
+            expired.append((dataname, seq))
+        return expired
+
+    def clear(self):
+        self.entries.clear()
+        self._timers.clear()
+        self._count = 0
+
+    def _remove(self, dataname, seqs, seq):
+        expires = seqs.pop(seq)
+        if not seqs:
+            del self.entries[dataname]
+        self._count -= 1
+        return expires
@@ -0,0 +1,73 @@
+# Sampling profiler of the event loop thread
+
+import os, sys, threading, time
+
+class Sampler(object):
+    """
+    Statistical profiler which samples the stack of a thread at intervals.
+
+    A daemon thread wakes up every `interval` seconds, and counts the stack of
+        the profiled thread (usually the one running the event loop) as a chain of
+        `file:function` frames. The profiled thread runs untouched, so the cost is
+        a stack walk per sample regardless of the load of the broker.
+    Samples are reported in the collapsed stack format (`frame;frame;... count`),
+        which flame graph tools take as they are.
+
+    :ivar interval: seconds between samples.
+    :ivar samples: number of samples taken.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        self.stacks = {}
+        self._thread = None
+        self._running = threading.Event()
+
+    def running(self):
+        return self._running.is_set()
+
+    def start(self, thread_id=None):
+        """
+        Starts sampling the thread of `thread_id`, or the current thread if not given.
+        """
+        if self.running():
+            return
+        target = threading.get_ident() if thread_id is None else thread_id
+        self._running.set()
+        self._thread = threading.Thread(target=self.run, args=(target,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops sampling and returns the collapsed stacks.
+        """
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.collapsed()
+
+    def run(self, target):
+        stacks = self.stacks
+        while self._running.is_set():
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stack = ";".join(reversed(stack))
+            stacks[stack] = stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def collapsed(self):
+        """
+        Returns the stacks sampled so far in the collapsed stack format,
+            the most frequent first.
+        """
+        stacks = sorted(self.stacks.items(), key=lambda item: -item[1])
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
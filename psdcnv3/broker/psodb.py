@@ -37,7 +37,12 @@ class Pso(object):
     def pickle(self):
         return pickle.dumps(list(self.advertisements()))
 
+    def records(self):
+        return [(dataname, dict(pubadvinfo)) for dataname, pubadvinfo in self.advertisements()]
+
     def restore(self, pickled):
-        records = pickle.loads(pickled)
+        self.load(pickle.loads(pickled))
+
+    def load(self, records):
         for dataname, pubadvinfo in records:
             self.pubadv(dataname, pubadvinfo)
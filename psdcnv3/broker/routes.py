@@ -0,0 +1,87 @@
+# Routes of data names registered to NFD
+
+class Routes(object):
+    """
+    Reference counted routes of data names served by a broker.
+
+    With `depth` of 0, each data name gets a route of its own. Otherwise data names are
+        routed by their covering prefixes of `depth` components, so that a prefix is
+        registered when the first name under it is routed, and unregistered when the
+        last one is gone. Data names not longer than `depth`, and those whose prefixes
+        would overlap the `reserved` prefixes of the broker, get routes of their own.
+
+    :ivar depth: number of components of covering prefixes. 0 for no aggregation.
+    """
+
+    def __init__(self, depth=0, reserved=()):
+        self.depth = depth
+        self.reserved = tuple(reserved)
+        self._prefixes = {}         # dataname -> prefix routing it
+        self._counts = {}           # prefix -> number of names routed by it
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, dataname):
+        return dataname in self._prefixes
+
+    def names(self):
+        return len(self._prefixes)
+
+    def prefix(self, dataname):
+        """
+        Returns the prefix which routes `dataname`.
+        """
+        if not self.depth:
+            return dataname
+        parts = dataname.split('/')
+        if len(parts) <= self.depth + 1:
+            return dataname
+        prefix = '/'.join(parts[:self.depth + 1])
+        for reserved in self.reserved:
+            if reserved.startswith(prefix + '/') or prefix == reserved or \
+                    prefix.startswith(reserved + '/'):
+                return dataname
+        return prefix
+
+    def add(self, dataname):
+        """
+        Routes `dataname`.
+
+        :return: the prefix to register, or None if it is registered already.
+        """
+        if dataname in self._prefixes:
+            return None
+        prefix = self._prefixes[dataname] = self.prefix(dataname)
+        count = self._counts.get(prefix, 0)
+        self._counts[prefix] = count + 1
+        return prefix if count == 0 else None
+
+    def remove(self, dataname):
+        """
+        Stops routing `dataname`.
+
+        :return: the prefix to unregister, or None if it still routes other names.
+        """
+        prefix = self._prefixes.pop(dataname, None)
+        if prefix is None:
+            return None
+        count = self._counts[prefix] - 1
+        if count:
+            self._counts[prefix] = count
+            return None
+        del self._counts[prefix]
+        return prefix
+
+    def forget(self, prefix):
+        """
+        Forgets `prefix` which failed to be registered, and the names routed by it.
+
+        :return: list of the names forgotten.
+        """
+        if self._counts.pop(prefix, None) is None:
+            return []
+        datanames = [name for name, routed in self._prefixes.items() if routed == prefix]
+        for dataname in datanames:
+            del self._prefixes[dataname]
+        return datanames
@@ -0,0 +1,58 @@
+# Cached status reports
+
+import math, json, time
+
+class Reports(object):
+    """
+    Status reports serialized once and shared by the status requests for a short time.
+
+    A report is made for a window size, serialized into JSON, and split into chunks
+        of `chunk_size` characters. The chunks are kept under a version number, so that
+        a client fetching chunks of a version is not affected by newer reports made
+        for the other clients. Reports younger than `ttl` seconds are reused for
+        the requests with the same window size.
+    The `capacity` most recent versions are kept for the chunk requests.
+    """
+
+    def __init__(self, chunk_size=8192, ttl=1.0, capacity=8):
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self.capacity = capacity
+        self.version = 0
+        self._recent = {}           # window -> (expires, version)
+        self._versions = {}         # version -> (text, chunks)
+
+    def get(self, window, make):
+        """
+        Returns the report for `window`, making it by `make(window)` if it's not cached.
+
+        :return: (version, text, chunks)
+        """
+        now = time.monotonic()
+        recent = self._recent.get(window)
+        if recent is not None and recent[0] > now and recent[1] in self._versions:
+            version = recent[1]
+            return (version,) + self._versions[version]
+        text = json.dumps(make(window))
+        size = self.chunk_size
+        chunks = [text[i*size:(i+1)*size] for i in range(math.ceil(len(text) / size))]
+        self.version += 1
+        version = self.version
+        self._versions[version] = (text, chunks)
+        while len(self._versions) > self.capacity:
+            del self._versions[next(iter(self._versions))]
+        self._recent = {w: r for w, r in self._recent.items() if r[1] in self._versions}
+        self._recent[window] = (now + self.ttl, version)
+        return version, text, chunks
+
+    def chunk(self, seq, version=None):
+        """
+        Returns the `seq`-th chunk (from 1) of `version`, or of the latest report if
+            `version` is not given. None if there is no such chunk.
+        """
+        if version is None:
+            version = self.version
+        if version not in self._versions:
+            return None
+        chunks = self._versions[version][1]
+        return chunks[seq-1] if 0 < seq <= len(chunks) else None
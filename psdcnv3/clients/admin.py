@@ -5,7 +5,8 @@ import sys, json, uuid
 import asyncio as aio
 
 from ..psk import *
-from ..utils import segment_fetcher
+from ..psk.codec import decode
+from ..utils import pipelined_fetcher
 
 arg_map = {
     'network/set': ('rninfo', lambda a: RNInfo(brokername=a)),
@@ -31,27 +32,47 @@ async def _handle(app, keeper, cmd, prefix, args=None):
     patched_args = patch_arg(cmd, args)
     if cadmin == "Status":
         return await handle_status(app, keeper, prefix, action, patched_args)
+    if cadmin == "Profile" and action == "stop":
+        return await handle_profile(app, keeper, prefix, action, patched_args)
     command, int_param, app_param = \
         keeper.make_generic_cmd(cadmin, prefix, dataname=action, **patched_args)
     data_name, meta_info, content = await app.express_interest(Name.from_str(command),
         interest_param=int_param, app_param=app_param, must_be_fresh=True)
     return bytes(content).decode()
 
-async def handle_status(app, keeper, prefix, action, args):
-    command, int_param, app_param = keeper.make_generic_cmd(command="Status",
+async def fetch_chunks(app, keeper, prefix, cadmin, action, args):
+    """
+    Fetches a report which is answered in chunks, e.g. by Status/report.
+    """
+    command, int_param, app_param = keeper.make_generic_cmd(command=cadmin,
         dataname=action, prefix=prefix, **args)
     _, _, content = await app.express_interest(Name.from_str(command),
         interest_param=int_param, app_param=app_param)
-    reply = json.loads(bytes(content).decode())
+    reply = decode(content)
+    if 'count' not in reply:
+        raise RuntimeError(reply['reason'] if 'reason' in reply else f"{cadmin} failed")
     count = int(reply['count'])          # Number of chunks to fetch
-    status = bytearray(reply['chunk'].encode())
+    report = bytearray(reply['chunk'].encode())
+    # Fetch the rest of the chunks of the same version of the report
+    name = f"{prefix}/{cadmin}/{action}" + (f"/{reply['version']}" if 'version' in reply else "")
     if count > 1:
-        async for _, _, content, _ in segment_fetcher(app, prefix + "/Status/report", 2, count):
-            status.extend(content)
+        async for _, _, content, _ in pipelined_fetcher(app, name, 2, count):
+            report.extend(content)
+    return report.decode()
+
+async def handle_status(app, keeper, prefix, action, args):
+    status = await fetch_chunks(app, keeper, prefix, "Status", action, args)
     if len(status) > 0:
-        return json.dumps(eval(status.decode()), indent=2)
+        return json.dumps(eval(status), indent=2)
     return "{}"
 
+async def handle_profile(app, keeper, prefix, action, args):
+    """
+    Stops profiling, and returns the sampled stacks in the collapsed stack format.
+    """
+    profile = json.loads(await fetch_chunks(app, keeper, prefix, "Profile", action, args))
+    return profile['stacks'].rstrip("\n")
+
 async def handle(app, keeper, cmd, prefix, args=None):
     print(await _handle(app, keeper, cmd, prefix, args))
     app.shutdown()
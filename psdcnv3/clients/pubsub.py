@@ -3,14 +3,19 @@ from ndn.types import InterestNack, InterestTimeout
 from ndn.encoding import Name, InterestParam
 from ndn.utils import gen_nonce
 import asyncio
-import json
 
 from psdcnv3.psk import *
+from psdcnv3.psk.codec import decode
 from psdcnv3.utils import *
 
 def normalize(name):
     return name if name.startswith("/") else ("/" + name)
 
+def exclusions(exclude):
+    if not exclude:
+        return []
+    return exclude if type(exclude) == list else [str(exclude)]
+
 class Pubsub(object):
     """
     PSDCNv3 Pubsub client.
@@ -63,7 +68,7 @@ class Pubsub(object):
         try:
             _, _, content = await self.app.express_interest(
                 Name.from_str(command), interest_param=int_param, app_param=app_param)
-            content = json.loads(bytes(content).decode())
+            content = decode(content)
         except Exception as e:
             self.reason = f"{type(e).__name__} {str(e)}"
             return False
@@ -72,6 +77,58 @@ class Pubsub(object):
         self.reason = content['reason'] if 'reason' in content else "Unknown pubadv error"
         return False
 
+    async def pubadvs(self, datanames,
+            topicscope=TopicScope.GLOBAL,
+            redefine=False,
+            batch_size=32,
+            window=8):
+        """
+        Coroutine function for advertising many data names with batch PA requests.
+
+        :param datanames: data names which publications will be made to.
+        :type datanames: list of str
+        :param topicscope: scope of the topics (TopicScope.GLOBAL=0, TopicScope.LOCAL=1)
+        :type topicscope: int
+        :param redefine: flag to inform if redefinition is allowed. (False)
+        :type redefine: bool
+        :param batch_size: data names per request, small enough to fit in a packet.
+        :type batch_size: int
+        :param window: requests issued at a time.
+        :type window: int
+        :return: dict of {dataname: True if advertised, False otherwise}.
+            (`self.reasons` keeps descriptive explanations of the errors by names.)
+        """
+        pubadvinfos = []
+        for dataname in datanames:
+            pubadvinfo = PubAdvInfo(normalize(dataname), redefine=redefine)
+            pubadvinfo["topicscope"] = topicscope
+            pubadvinfos.append(pubadvinfo)
+        self.reasons = {}
+        results = {}
+        window = asyncio.Semaphore(window)
+        async def pubadv_batch(batch):
+            command, int_param, app_param = \
+                self.keeper.make_pubadv_batch_cmd(self.keeper.svc_name, batch)
+            try:
+                async with window:
+                    _, _, content = await self.app.express_interest(
+                        Name.from_str(command), interest_param=int_param, app_param=app_param)
+                content = decode(content)
+                if content['status'] != 'OK':
+                    raise ValueError(content.get('reason', "Unknown pubadv error"))
+            except Exception as e:
+                reason = f"{type(e).__name__} {str(e)}"
+                content = {'value': [{'dataname': pubadvinfo['dataname'], 'status': 'ERR',
+                    'reason': reason} for pubadvinfo in batch]}
+            for response in content['value']:
+                results[response['dataname']] = response['status'] == 'OK'
+                if response['status'] != 'OK':
+                    self.reasons[response['dataname']] = \
+                        response.get('reason', "Unknown pubadv error")
+        await asyncio.gather(*[pubadv_batch(pubadvinfos[i:i+batch_size])
+            for i in range(0, len(pubadvinfos), batch_size)])
+        return results
+
     async def pubunadv(self, dataname,
             topicscope=TopicScope.GLOBAL,
             allow_undefined=True):
@@ -95,7 +152,7 @@ class Pubsub(object):
         try:
             _, _, content = await self.app.express_interest(
                 Name.from_str(command), interest_param=int_param, app_param=app_param)
-            content = json.loads(bytes(content).decode())
+            content = decode(content)
         except Exception as e:
             self.reason = f"{type(e).__name__} {str(e)}"
             return False
@@ -160,7 +217,7 @@ class Pubsub(object):
                 _, _, content = await self.app.express_interest(Name.from_str(command),
                     interest_param=int_param, app_param=app_param)
                 # Transmission completed or error occurred
-                content = json.loads(bytes(content).decode())
+                content = decode(content)
                 if content['status'] != 'OK' or int(content['value']) != n_items:
                     success = False
                     self.reason = \
@@ -186,7 +243,7 @@ class Pubsub(object):
             pass
         return success
 
-    async def subtopic(self, topicname, servicetoken=None, exclude=None):
+    async def subtopic(self, topicname, servicetoken=None, exclude=None, page_size=None):
         """
         Coroutine function for issuing topic-subscription requests.
 
@@ -197,11 +254,18 @@ class Pubsub(object):
         :type servicetoken: str
         :param exclude: prefixes of data names to exclude from the result
         :type exclude: str or [str] (defaults to None)
+        :param page_size: if given, the matches are received in pages of this size
+            rather than in a single reply. (See `subtopics`.)
+        :type page_size: int
         :return: dict of {dataname: [rn_name]} that matches the given topic name.
             (If error occurs, returns {} and `self.reason` keeps a descriptive explanation
              of the error.)
         :rtype: dict of {str: [str]}
         """
+        if page_size:
+            matches = {dataname: rn_names async for dataname, rn_names in
+                self.subtopics(topicname, servicetoken, exclude, page_size)}
+            return {} if self.reason else matches
         topicname = normalize(topicname)
         subinfo = SubInfo(topicscope=TopicScope.GLOBAL)
         if servicetoken is not None:
@@ -212,7 +276,7 @@ class Pubsub(object):
         try:
             _, _, content = await self.app.express_interest(
                 Name.from_str(command), interest_param=int_param, app_param=app_param)
-            content = json.loads(bytes(content).decode())
+            content = decode(content)
         except Exception as e:
             self.reason = f"{type(e).__name__} {str(e)}"
             return {}
@@ -223,10 +287,73 @@ class Pubsub(object):
         # Process exclusion list
         if not exclude:
             return {v[0]: v[1] for v in values}
-        if type(exclude) != list:
-            exclude = [str(exclude)]
+        exclude = exclusions(exclude)
         return {v[0]: v[1] for v in values if not any(v[0].startswith(e) for e in exclude)}
 
+    async def subtopics(self, topicname, servicetoken=None, exclude=None, page_size=100):
+        """
+        Asynchronous generator for paginated topic-subscription requests.
+        Pages of matches are requested one by one as the matches are consumed,
+            so that a topic with many matches needs neither a large reply nor
+            a large collection of matches at once.
+
+        :param topicname: topic name which subscriptions is made to.
+            Can also include MQTT-style wildcard characters such as + and #.
+        :type topicname: str
+        :param servicetoken: magic token for service validation
+        :type servicetoken: str
+        :param exclude: prefixes of data names to exclude from the result
+        :type exclude: str or [str] (defaults to None)
+        :param page_size: number of matches in a page
+        :type page_size: int
+        :return: yields (dataname, [rn_name]) that matches the given topic name.
+            `self.count` keeps the number of matches after the last page.
+            (If error occurs, stops and `self.reason` keeps a descriptive explanation
+             of the error.)
+        :rtype: (str, [str])
+        """
+        exclude = exclusions(exclude)
+        async for value in self.pages(topicname, TopicScope.GLOBAL, servicetoken, page_size):
+            for v in value['matches']:
+                if not any(v[0].startswith(e) for e in exclude):
+                    yield v[0], v[1]
+
+    async def pages(self, topicname, topicscope, servicetoken, page_size):
+        """
+        Asynchronous generator for the pages of a paginated ST or SL request.
+        Each page carries the cursor to request the next page with.
+        `self.count` keeps the number of matches after the last page.
+        """
+        topicname = normalize(topicname)
+        self.reason, self.count = None, None
+        cursor, count = None, 0
+        while True:
+            subinfo = SubInfo(topicscope=topicscope, page_size=page_size)
+            if servicetoken is not None:
+                subinfo["servicetoken"] = str(servicetoken)
+            if cursor:
+                subinfo["cursor"] = cursor
+            command, int_param, app_param = \
+                self.keeper.make_subtopic_cmd(self.keeper.svc_name, topicname,
+                    local=(topicscope == TopicScope.LOCAL), subinfo=subinfo)
+            try:
+                _, _, content = await self.app.express_interest(
+                    Name.from_str(command), interest_param=int_param, app_param=app_param)
+                content = decode(content)
+            except Exception as e:
+                self.reason = f"{type(e).__name__} {str(e)}"
+                return
+            if content['status'] != 'OK':
+                self.reason = content['reason'] if 'reason' in content else "Unknown page error"
+                return
+            value = content['value']
+            count += len(value['matches'])
+            yield value
+            cursor = value['cursor']
+            if not cursor:
+                self.count = count
+                return
+
     async def submani(self, dataname, rn_name):
         """
         Coroutine function for issuing data-manifest requests.
@@ -251,7 +378,7 @@ class Pubsub(object):
         try:
             _, _, content = await self.app.express_interest(
                 Name.from_str(command), interest_param=int_param, app_param=app_param)
-            content = json.loads(bytes(content).decode())
+            content = decode(content)
             if content['status'] == 'OK':
                 return (rn_name, content['fst'], content['lst'])
             self.reason = content['reason'] \
@@ -260,7 +387,7 @@ class Pubsub(object):
             self.reason = f"{type(e).__name__} {str(e)}"
         return None
 
-    async def sublocal(self, topicname, servicetoken=None, exclude=None):
+    async def sublocal(self, topicname, servicetoken=None, exclude=None, page_size=None):
         """
         Coroutine function for issuing topic-subscription to local broker requests.
 
@@ -271,11 +398,20 @@ class Pubsub(object):
         :type servicetoken: str
         :param exclude: prefixes of data names to exclude from the result
         :type exclude: str or [str] (defaults to None)
+        :param page_size: if given, the manifests are received in pages of this size
+            rather than in a single reply. (See `sublocals`.)
+        :type page_size: int
         :return: node_name, [(dataname, fst, lst)]
             (If error occurs, returns None, [] and
              `self.reason` keeps a descriptive explanation of the error.)
         :rtype: str, [(str, int, int)]
         """
+        if page_size:
+            node_name, values = None, []
+            async for node_name, manifest in \
+                    self.sublocals(topicname, servicetoken, exclude, page_size):
+                values.append(manifest)
+            return (None, []) if self.reason else (node_name, values)
         topicname = normalize(topicname)
         subinfo = SubInfo(topicscope=TopicScope.LOCAL)
         if servicetoken is not None:
@@ -286,7 +422,7 @@ class Pubsub(object):
         try:
             _, _, content = await self.app.express_interest(
                 Name.from_str(command), interest_param=interest_param, app_param=app_param)
-            content = json.loads(bytes(content).decode())
+            content = decode(content)
             if content['status'] != 'OK':
                 self.reason = content['reason'] \
                     if 'reason' in content else "Unknown sublocal error"
@@ -297,12 +433,35 @@ class Pubsub(object):
         # Process exclusion list
         values = content['value']['manifests']
         if exclude:
-            if type(exclude) != list:
-                exclude = [str(exclude)]
+            exclude = exclusions(exclude)
             values = [v for v in values if not any(v[0].startswith(e) for e in exclude)]
         # All done
         return content['value']['broker'], values
 
+    async def sublocals(self, topicname, servicetoken=None, exclude=None, page_size=100):
+        """
+        Asynchronous generator for paginated topic-subscription to local broker requests.
+
+        :param topicname: topic name which subscriptions is made to.
+            Can also include MQTT-style wildcard characters such as + and #.
+        :type topicname: str
+        :param servicetoken: magic token for service validation.
+        :type servicetoken: str
+        :param exclude: prefixes of data names to exclude from the result
+        :type exclude: str or [str] (defaults to None)
+        :param page_size: number of matches in a page
+        :type page_size: int
+        :return: yields node_name, (dataname, fst, lst)
+            (If error occurs, stops and `self.reason` keeps a descriptive explanation
+             of the error.)
+        :rtype: str, (str, int, int)
+        """
+        exclude = exclusions(exclude)
+        async for value in self.pages(topicname, TopicScope.LOCAL, servicetoken, page_size):
+            for v in value['manifests']:
+                if not any(v[0].startswith(e) for e in exclude):
+                    yield value['broker'], v
+
     async def subdata(self, dataname, seq, forward_to, lifetime=None):
         """
         Coroutine function for issuing data requests.
@@ -0,0 +1,137 @@
+import re as regexp
+from functools import lru_cache
+
+FILTER_CACHE_SIZE = 1024
+
+class Filter(object):
+    """
+    A topic filter with MQTT-style wildcards compiled into a matcher.
+
+    A filter is parsed once into its components, and matches data names component
+        by component. `+` matches a single component, and `#` matches zero or more
+        components (e.g. /hello/# matches /hello, and /a/#/b matches /a/b).
+    Filters are compiled by `compile` and memoized, so that they are shared by
+        all the `Table`-based Names implementations.
+
+    :ivar topic: the filter string.
+    :ivar prefix: literal prefix which all the matching data names start with.
+    :ivar literal: True if the filter has no wildcards.
+    :ivar subtree: True if the filter has no wildcards but the trailing `#`.
+    """
+
+    __slots__ = ('topic', 'prefix', 'literal', 'subtree', 'parts', 'multi', 'wild')
+
+    def __init__(self, topic):
+        self.topic = topic
+        parts = topic.split('/')
+        self.multi = parts[-1] == '#'
+        self.parts = parts[:-1] if self.multi else parts
+        self.literal = '+' not in parts and '#' not in parts
+        self.subtree = self.multi and '+' not in self.parts and '#' not in self.parts
+        self.wild = '#' in self.parts         # `#` in the middle
+        self.prefix = literal_prefix(parts)
+
+    def __repr__(self):
+        return f"Filter({self.topic!r})"
+
+    def match(self, dataname):
+        """
+        Checks if `dataname` matches the filter.
+        """
+        if self.literal:
+            return dataname == self.topic
+        if self.subtree:
+            # The prefix itself or any name under it
+            return not self.parts or dataname == self.prefix or \
+                dataname.startswith(self.prefix + '/')
+        names = dataname.split('/')
+        if self.wild:
+            return match_components(self.topic.split('/'), names)
+        parts = self.parts
+        if len(names) != len(parts) and not (self.multi and len(names) > len(parts)):
+            return False
+        for part, name in zip(parts, names):
+            if part != name and part != '+':
+                return False
+        return True
+
+    def select(self, datanames):
+        """
+        Yields data names in `datanames` matching the filter.
+        Names without the literal prefix are rejected without running the matcher.
+        """
+        prefix, match = self.prefix, self.match
+        if self.subtree and self.parts:
+            below = prefix + '/'
+            for dataname in datanames:
+                if dataname.startswith(below) or dataname == prefix:
+                    yield dataname
+            return
+        for dataname in datanames:
+            if dataname.startswith(prefix) and match(dataname):
+                yield dataname
+
+
+class RegexpFilter(Filter):
+    """
+    A topic filter compiled into a regular expression.
+    """
+
+    __slots__ = ('regexp',)
+
+    def __init__(self, topic):
+        super().__init__(topic)
+        # Replace wildcards with regular expressions
+        pattern = topic.replace('#/', '(.*?/|^)').\
+                  replace('/#', '(/.*?|$)').\
+                  replace('+', '[^/#]+?')
+        self.regexp = regexp.compile(pattern + '$')
+
+    def match(self, dataname):
+        if self.literal:
+            return dataname == self.topic
+        return self.regexp.match(dataname) is not None
+
+
+def match_components(parts, names):
+    """
+    Checks if `names` components match filter `parts`, each `#` of which matches zero
+        or more components.
+    """
+    positions = [0]             # Numbers of components matched so far, ascending
+    last = len(names)
+    for part in parts:
+        if part == '#':
+            positions = list(range(positions[0], last + 1))
+        else:
+            positions = [j + 1 for j in positions
+                         if j < last and (part == '+' or part == names[j])]
+        if not positions:
+            return False
+    return positions[-1] == last
+
+def literal_prefix(parts):
+    """
+    Returns the common prefix of the data names matching a filter of `parts`.
+    """
+    literals = []
+    for part in parts:
+        if part == '+' or part == '#':
+            # /hello/# matches /hello, so the separator is not a part of the prefix
+            return '/'.join(literals) + ('/' if part == '+' and literals else '')
+        literals.append(part)
+    return '/'.join(literals)
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def compile(topic):
+    """
+    Compiles `topic` into a `Filter`. Compiled filters are memoized.
+    """
+    return Filter(topic)
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def compile_regexp(topic):
+    """
+    Compiles `topic` into a `RegexpFilter`. Compiled filters are memoized.
+    """
+    return RegexpFilter(topic)
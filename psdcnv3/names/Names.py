@@ -80,7 +80,13 @@ class Names(object):
         :return: a byte array representation of all the advertisements
         :rtype: byte[]
         """
-        return pickle.dumps([(slot.rn_names, slot.dataname) for slot in self.advertisements()])
+        return pickle.dumps(self.records())
+
+    def records(self):
+        """
+        Copies advertisements made so far into a list of (rn_names, dataname).
+        """
+        return [(list(slot.rn_names), slot.dataname) for slot in self.advertisements()]
 
     def restore(self, pickled):
         """
@@ -89,7 +95,12 @@ class Names(object):
         :param: a byte array representation of advertisements
         :type: byte[]
         """
-        records = pickle.loads(pickled)
+        self.load(pickle.loads(pickled))
+
+    def load(self, records):
+        """
+        Restores advertisements from the `records` made earlier.
+        """
         for rn_names, dataname in records:
             for rn_name in rn_names:
                 self.advertise(rn_name, dataname)
@@ -0,0 +1,219 @@
+import sys
+from .Names import Names
+from .Slot import Slot
+
+class Radix(Names):
+    """
+    A Names implementation which uses radix (Patricia) tree of name components.
+
+    Chains of nodes with a single child and no advertisement are collapsed into
+        an edge of multiple components. A node is kept in its parent's children
+        under the first component of its edge, and keeps the rest of the edge in `tail`.
+    Edges are split on advertising a name which branches in the middle of an edge,
+        and merged back on unadvertising it.
+    """
+
+    # Radix tree nodes
+    class Node(Slot):
+        __slots__ = ('tail', 'children')
+
+        def __init__(self, tail=()):
+            super().__init__(None, None)
+            self.tail = tail
+            self.children = None
+
+    # Radix tree methods
+    def __init__(self):
+        super().__init__()
+        self._root = self.Node()
+        self._count = 0
+
+    def __contains__(self, dataname):
+        node = self.find(dataname)
+        return node is not None and bool(node.dataname and node.rn_names)
+
+    def count(self, topic="/#"):
+        if topic == "/#":
+            return self._count
+        return super().count(topic)
+
+    def find(self, dataname):
+        return self.path(dataname.split('/'))[-1][2]
+
+    def path(self, parts):
+        """
+        Returns list of (parent, component, node) from the root to the node for `parts`.
+            The last node is None if there is no node for `parts`.
+        """
+        parts = tuple(parts)
+        path = [(None, None, self._root)]
+        node, i, last = self._root, 0, len(parts)
+        while i < last:
+            child = node.children.get(parts[i]) if node.children else None
+            tail = child.tail if child is not None else ()
+            if child is None or tail and parts[i + 1:i + 1 + len(tail)] != tail:
+                path.append((node, parts[i], None))
+                break
+            path.append((node, parts[i], child))
+            node, i = child, i + 1 + len(tail)
+        return path
+
+    def locate(self, dataname):
+        parts = tuple(sys.intern(part) for part in dataname.split('/'))
+        node, i, last = self._root, 0, len(parts)
+        while i < last:
+            child = node.children.get(parts[i]) if node.children else None
+            if child is None:
+                # The rest of the name becomes a new edge
+                if node.children is None:
+                    node.children = {}
+                child = node.children[parts[i]] = self.Node(parts[i + 1:])
+                return child
+            tail = child.tail
+            common = 0
+            while common < len(tail) and i + 1 + common < last and \
+                    tail[common] == parts[i + 1 + common]:
+                common += 1
+            if common < len(tail):
+                # Split the edge where the name branches off
+                split = self.Node(tail[:common])
+                split.children = {tail[common]: child}
+                child.tail = tail[common + 1:]
+                node.children[parts[i]] = split
+                child = split
+            node, i = child, i + 1 + common
+        return node
+
+    def advertise(self, rn_name, dataname, pub_moved=False):
+        node = self.locate(dataname)
+        if not (node.dataname and node.rn_names):
+            self._count += 1
+        if not pub_moved:
+            rn_names = [rn_name]
+        else:
+            rn_names = (node.rn_names or []) + [rn_name]
+        node.rn_names = rn_names
+        node.dataname = dataname
+
+    def unadvertise(self, dataname):
+        path = self.path(dataname.split('/'))
+        parent, part, node = path[-1]
+        if node is None or node is self._root:
+            return
+        if node.dataname and node.rn_names:
+            self._count -= 1
+        node.rn_names = None
+        node.dataname = None
+        # Prune the node, and merge the edges which don't branch any more
+        if not node.children:
+            del parent.children[part]
+            if not parent.children:
+                parent.children = None
+            if len(path) > 2:
+                grandparent, parent_part, _ = path[-2]
+                self.merge(grandparent, parent_part, parent)
+        else:
+            self.merge(parent, part, node)
+
+    def merge(self, parent, part, node):
+        # Merges the edge to a node without advertisement into its only child
+        if node.dataname or not node.children or len(node.children) != 1:
+            return
+        (child_part, child), = node.children.items()
+        child.tail = node.tail + (child_part,) + child.tail
+        parent.children[part] = child
+
+    def matches(self, topic):
+        """
+        Yields nodes matching `topic` in preorder.
+
+        Edges are matched component by component using an explicit stack of
+            (node, components of its edge matched, index of topic component).
+            A `#` matches zero or more components, which may end in the middle of
+            an edge, and a trailing `#` enumerates the subtree below it once.
+            With more than one `#`, states visited and nodes yielded are remembered
+            so that each node is yielded once.
+        """
+        parts = topic.split('/')
+        last = len(parts)
+        seen = yielded = None
+        if parts.count('#') > 1:
+            seen, yielded = set(), set()
+        stack = [(self._root, 0, 0)]
+        while stack:
+            state = stack.pop()
+            if seen is not None:
+                if state in seen:
+                    continue
+                seen.add(state)
+            node, k, i = state
+            if i == last:
+                if node.dataname and node.rn_names and \
+                        (yielded is None or node not in yielded):
+                    if yielded is not None:
+                        yielded.add(node)
+                    yield node
+                continue
+            part = parts[i]
+            if part == '#':
+                if i == last - 1:
+                    for node in self.subtree(node):
+                        if yielded is None:
+                            yield node
+                        elif node not in yielded:
+                            yielded.add(node)
+                            yield node
+                    continue
+                # Zero or more components in the middle of topic
+                if k < len(node.tail):
+                    stack.append((node, k + 1, i))
+                elif node.children:
+                    stack.extend((child, 0, i) for child in reversed(node.children.values()))
+                state = follow(node, k, parts, i + 1)
+                if state is not None:
+                    stack.append(state)
+                continue
+            children = node.children
+            if not children:
+                continue
+            if part == '+':
+                candidates = reversed(children.values())
+            else:
+                child = children.get(part)
+                candidates = (child,) if child is not None else ()
+            for child in candidates:
+                state = follow(child, 0, parts, i + 1)
+                if state is not None:
+                    stack.append(state)
+
+    def subtree(self, node):
+        """
+        Yields advertised nodes of the subtree rooted at `node` in preorder.
+        """
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            if node.dataname and node.rn_names:
+                yield node
+            if node.children:
+                nodes.extend(reversed(node.children.values()))
+
+def follow(node, k, parts, i):
+    """
+    Matches the components of the edge to `node` from `k` with `parts` of topic from `i`.
+
+    :return: state (node, components of the edge matched, index of `parts`) at the end
+        of the edge, or where a `#` was met on the edge. None if the edge doesn't match.
+    """
+    tail, last = node.tail, len(parts)
+    while k < len(tail):
+        if i == last:
+            return None
+        part = parts[i]
+        if part == '#':
+            return node, k, i
+        if part != '+' and part != tail[k]:
+            return None
+        i += 1
+        k += 1
+    return node, k, i
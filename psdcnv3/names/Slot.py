@@ -1,4 +1,6 @@
 class Slot(object):
+    __slots__ = ('dataname', 'rn_names', 'storageprefix')
+
     def __init__(self, rn_names, dataname):
         self.dataname = dataname
         self.rn_names = rn_names
@@ -0,0 +1,112 @@
+class Subscriptions(object):
+    """
+    Index of subscription topic filters with MQTT-style wildcards.
+
+    Answers the inverse of `Names.matches`: which filters match a given data name.
+    Filters are kept in a trie whose edges are filter components including `+` and `#`,
+        so that matching a data name visits at most the literal, `+`, and `#` children
+        at each level, and the components a `#` in the middle of a filter may skip.
+    The index keeps at most `capacity` filters, and forgets the least recently
+        subscribed ones first.
+    """
+
+    class Node(object):
+        __slots__ = ('topic', 'count', 'children')
+
+        def __init__(self):
+            self.topic = None
+            self.count = 0
+            self.children = {}
+
+    def __init__(self, capacity=10000):
+        """
+        :param capacity: maximum number of filters kept. 0 for no limit.
+        """
+        self.capacity = capacity
+        self._root = self.Node()
+        self._topics = {}                   # In the order of subscriptions
+
+    def __contains__(self, topic):
+        return topic in self._topics
+
+    def __len__(self):
+        return len(self._topics)
+
+    def filters(self):
+        yield from self._topics
+
+    def subscribe(self, topic):
+        """
+        Adds a filter `topic`, or refreshes it if it is already in the index.
+
+        :return: number of subscriptions made to `topic`.
+        """
+        node = self._topics.pop(topic, None)
+        if node is None:
+            node = self._root
+            for part in topic.split('/'):
+                child = node.children.get(part)
+                if child is None:
+                    child = node.children[part] = self.Node()
+                node = child
+            node.topic = topic
+        node.count += 1
+        self._topics[topic] = node
+        while self.capacity and len(self._topics) > self.capacity:
+            self.unsubscribe(next(iter(self._topics)))
+        return node.count
+
+    def unsubscribe(self, topic):
+        """
+        Removes a filter `topic` and prunes the trie.
+        """
+        if self._topics.pop(topic, None) is None:
+            return
+        path = []
+        node = self._root
+        for part in topic.split('/'):
+            path.append((node, part))
+            node = node.children[part]
+        node.topic = None
+        node.count = 0
+        for parent, part in reversed(path):
+            child = parent.children[part]
+            if child.children or child.topic is not None:
+                break
+            del parent.children[part]
+
+    def matches(self, dataname):
+        """
+        Yields filters matching `dataname`.
+        A `#` in the middle of a filter matches zero or more components, as it does
+            in `Names.matches`.
+        """
+        parts = dataname.split('/')
+        last = len(parts)
+        stack = [(self._root, 0)]
+        seen, found = set(), set()
+        while stack:
+            node, i = stack.pop()
+            if (node, i) in seen:
+                continue
+            seen.add((node, i))
+            children = node.children
+            # Trailing # matches the rest including nothing, e.g. /hello/# matches /hello
+            multi = children.get('#')
+            if multi is not None:
+                if multi.topic is not None and multi.topic not in found:
+                    found.add(multi.topic)
+                    yield multi.topic
+                if multi.children:
+                    stack.extend((multi, j) for j in range(last, i - 1, -1))
+            if i == last:
+                if node.topic is not None and node.topic not in found:
+                    found.add(node.topic)
+                    yield node.topic
+                continue
+            child = children.get(parts[i])
+            if child is not None:
+                stack.append((child, i + 1))
+            child = children.get('+')
+            if child is not None:
+                stack.append((child, i + 1))
@@ -1,10 +1,16 @@
 from .Names import Names
 from .Slot import Slot
+from .Filter import compile
 
 class Table(Names):
     """
     A Names implementation which uses Dict Table as the main data structure.
+
+    Topics are compiled into `Filter`s by `compile`, which subclasses may redefine.
     """
+
+    compile = staticmethod(compile)
+
     def __init__(self):
         super().__init__()
         self._datanames = {}
@@ -12,8 +18,10 @@ class Table(Names):
     def __contains__(self, dataname):
         return dataname in self._datanames
 
-    def count(self):
-        return len(self._datanames)
+    def count(self, topic="/#"):
+        if topic == "/#":
+            return len(self._datanames)
+        return super().count(topic)
 
     def advertise(self, rn_name, dataname, pub_moved=False):
         if not pub_moved:
@@ -27,9 +35,13 @@ class Table(Names):
             del self._datanames[dataname]
 
     def matches(self, topic):
-        for dataname in self._datanames:
-            if self.match(topic, dataname):
-                yield self._datanames[dataname]
+        matcher = self.compile(topic)
+        if matcher.literal:
+            if topic in self._datanames:
+                yield self._datanames[topic]
+            return
+        for dataname in matcher.select(self._datanames):
+            yield self._datanames[dataname]
 
-    def match(self, topic, dataname):               # Define it at subclasses!
-        pass
+    def match(self, topic, dataname):
+        return self.compile(topic).match(dataname)
@@ -1,83 +1,180 @@
+import sys
 from .Names import Names
 from .Slot import Slot
 
 class Trie(Names):
     """
     A Names implementation which uses Trie as the main data structure.
+
+    Nodes have `__slots__`, and name components are interned, so that the components
+        shared by many names are kept once.
+    Children of a node are kept as None if there are none, as a (component, node)
+        tuple if there is only one, and as a dict otherwise.
     """
 
     # Trie nodes
     class Node(Slot):
+        __slots__ = ('children',)
+
         def __init__(self, rn_name, dataname):
             super().__init__(rn_name, dataname)
-            self.children = {}
+            self.children = None
+
+        def child(self, part):
+            children = self.children
+            if children is None:
+                return None
+            if type(children) is tuple:
+                return children[1] if children[0] == part else None
+            return children.get(part)
+
+        def nodes(self):
+            children = self.children
+            if children is None:
+                return ()
+            if type(children) is tuple:
+                return (children[1],)
+            return children.values()
+
+        def add(self, part, node):
+            children = self.children
+            if children is None:
+                self.children = (part, node)
+            elif type(children) is tuple:
+                self.children = {children[0]: children[1], part: node}
+            else:
+                children[part] = node
+            return node
+
+        def remove(self, part):
+            children = self.children
+            if type(children) is tuple:
+                if children[0] == part:
+                    self.children = None
+            elif children is not None:
+                children.pop(part, None)
+                if len(children) == 1:
+                    self.children = next(iter(children.items()))
 
     # Trie methods
     def __init__(self):
         super().__init__()
         self._root = self.Node(None, None)
-        self._cache = {}
+        self._count = 0
 
     def __contains__(self, dataname):
-        return dataname in self._cache
+        node = self.find(dataname)
+        return node is not None and bool(node.dataname and node.rn_names)
+
+    def count(self, topic="/#"):
+        if topic == "/#":
+            return self._count
+        return super().count(topic)
 
-    def count(self):
-        return len(self._cache)
+    def find(self, dataname):
+        node = self._root
+        for part in dataname.split('/'):
+            node = node.child(part)
+            if node is None:
+                break
+        return node
 
     def locate(self, dataname):
         node = self._root
         for part in dataname.split('/'):
-            node = node.children.setdefault(part, self.Node(None, None))
-        return node;
+            child = node.child(part)
+            if child is None:
+                # Create a node only when the path is new
+                child = node.add(sys.intern(part), self.Node(None, None))
+            node = child
+        return node
 
     def advertise(self, rn_name, dataname, pub_moved=False):
         node = self.locate(dataname)
+        if not (node.dataname and node.rn_names):
+            self._count += 1
         if not pub_moved:
             rn_names = [rn_name]
         else:
-            rn_names = node.rn_names + [rn_name]
+            rn_names = (node.rn_names or []) + [rn_name]
         node.rn_names = rn_names
         node.dataname = dataname
-        self._cache[dataname] = dataname
 
     def unadvertise(self, dataname):
         parts = []
-        try:
-            parent, node = None, self._root
-            for part in dataname.split('/'):
-                parent, node = node, node.children[part]
-                parts.append((parent, part, node))
-            if node.rn_names:
-                node.rn_names = None
-            if node.dataname:
-                node.dataname = None
-        except KeyError:
-            # raise KeyError(dataname)
-            pass
-        else:   # cleanup
-            for parent, part, node in reversed(parts):
-                if node.children or node.rn_names:
-                    break
-                del parent.children[part]
-        finally:
-            if dataname in self._cache:
-                del self._cache[dataname]
+        parent, node = None, self._root
+        for part in dataname.split('/'):
+            parent, node = node, node.child(part)
+            if node is None:
+                return
+            parts.append((parent, part, node))
+        if node.dataname and node.rn_names:
+            self._count -= 1
+        node.rn_names = None
+        node.dataname = None
+        # Cleanup
+        for parent, part, node in reversed(parts):
+            if node.children or node.rn_names:
+                break
+            parent.remove(part)
 
     def matches(self, topic):
+        """
+        Yields nodes matching `topic` in preorder.
+
+        The literal prefix of `topic` is descended directly, and then the rest is
+            matched using an explicit stack of (node, index of topic component).
+            A trailing `#` enumerates the subtree once. With more than one `#`, a node
+            can be reached by many paths, so states visited are remembered and each
+            node is visited once for each topic component.
+        """
         parts = topic.split('/')
-        def match(node, i=0):
-            if i == len(parts):
+        last = len(parts)
+        node, i = self._root, 0
+        while i < last and parts[i] != '+' and parts[i] != '#':
+            node = node.child(parts[i])
+            if node is None:
+                return
+            i += 1
+        seen = set() if parts.count('#') > 1 else None
+        stack = [(node, i)]
+        while stack:
+            node, i = stack.pop()
+            if seen is not None:
+                if (node, i) in seen:
+                    continue
+                seen.add((node, i))
+            if i == last:
                 if node.dataname and node.rn_names:
                     yield node
+                continue
+            part = parts[i]
+            if part == '#' and i == last - 1:
+                subtree = [node]
+                while subtree:
+                    node = subtree.pop()
+                    if node.dataname and node.rn_names:
+                        yield node
+                    if seen is not None:
+                        # Subtrees of nodes seen already are enumerated from them
+                        children = [child for child in reversed(node.nodes())
+                                    if (child, i) not in seen]
+                        seen.update((child, i) for child in children)
+                        subtree.extend(children)
+                        continue
+                    children = node.children
+                    if children is not None:
+                        if type(children) is tuple:
+                            subtree.append(children[1])
+                        else:
+                            subtree.extend(reversed(children.values()))
+            elif part == '+':
+                stack.extend((child, i + 1) for child in reversed(node.nodes()))
+            elif part == '#':
+                # Zero or more components in the middle of topic
+                stack.extend((child, i) for child in reversed(node.nodes()))
+                stack.append((node, i + 1))
             else:
-                part = parts[i]
-                if part in node.children:
-                    yield from match(node.children[part], i + 1)
-                if part == '+':
-                    for child in node.children:
-                        yield from match(node.children[child], i + 1)
-                if part == '#':
-                    yield from match(node, i + 1)
-                    for child in node.children:
-                        yield from match(node.children[child], i)
-        yield from match(self._root)
+                child = node.child(part)
+                if child is not None:
+                    stack.append((child, i + 1))
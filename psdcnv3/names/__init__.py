@@ -2,3 +2,5 @@ from .Names import Names as Datanames
 from .Trie import Trie as TrieNames
 from .Proc import Proc as ProcNames
 from .Regexp import Regexp as RegexpNames
+from .Radix import Radix as RadixNames
+from .Subscriptions import Subscriptions
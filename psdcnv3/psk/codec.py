@@ -0,0 +1,179 @@
+"""
+Codecs of PSK application parameters and replies for PSDCNv3.
+
+Parameters and replies are encoded either in JSON or in a compact TLV encoding.
+TLV-encoded bytes start with a marker byte which never starts a JSON text
+(nor any UTF-8 text), followed by the version of the encoding, so that `decode`
+tells the codec from the bytes themselves. JSON clients thus keep working, and
+brokers answer a request in the codec the request came in.
+
+TLV values are a type octet followed by the value. Numbers and lengths are
+NDN TLV variable-length numbers. Dict keys of the PSK information classes are
+encoded as one octet indexes into the key table of the version.
+"""
+
+import json, struct
+
+from psdcnv3.psk.pskinfo import serialize
+
+JSON = 'json'
+TLV = 'tlv'
+
+MARKER = 0xC1           # Never a valid UTF-8 octet
+VERSION = 1
+
+# Keys of the PSK information classes and replies, in the order of version 1
+KEYS = (
+    'pubadvinfo', 'pubdatainfo', 'subinfo', 'rninfo', 'irinfo', 'rawpacket',
+    'dataname', 'storagetype', 'storageprefix', 'topicscope', 'startseq', 'redefine',
+    'maxdatapktcnt', 'pub_moved', 'data_prefix', 'data_sseq', 'data_eseq', 'pub_prefix',
+    'servicetoken', 'page_size', 'cursor', 'brokername', 'fwded_from',
+    'status', 'value', 'reason', 'broker', 'new_rn', 'old_rn', 'manifests', 'matches',
+    'count', 'version', 'chunk', 'window_size', 'actionexceeddatapktcnt', 'data',
+)
+KEY_INDEX = {key: i for i, key in enumerate(KEYS)}
+
+# Value types
+T_NONE, T_FALSE, T_TRUE, T_INT, T_NEG, T_FLOAT, T_STR, T_BYTES, T_LIST, T_DICT, T_KEY = \
+    range(11)
+
+def encode(obj, codec=JSON):
+    """
+    Encodes `obj` (usually a dict of PSK parameters or a reply) in `codec`.
+
+    :param codec: JSON or TLV. None is taken as JSON.
+    :return: encoded bytes.
+    """
+    if codec == TLV:
+        buf = bytearray((MARKER, VERSION))
+        write_value(buf, obj)
+        return bytes(buf)
+    return json.dumps(obj, default=serialize).encode()
+
+def decode(data):
+    """
+    Decodes `data` encoded by either codec.
+
+    :return: the decoded object. None if `data` is empty.
+    """
+    if not data:
+        return None
+    data = bytes(data)
+    if data[0] == MARKER:
+        if data[1] != VERSION:
+            raise ValueError(f"Unknown PSK codec version {data[1]}")
+        obj, _ = read_value(data, 2)
+        return obj
+    return json.loads(data.decode())
+
+def codec_of(data):
+    """
+    Returns the codec of `data`. Empty data are taken as JSON.
+    """
+    return TLV if data and data[0] == MARKER else JSON
+
+def write_num(buf, n):
+    # NDN TLV variable-length number
+    if n < 253:
+        buf.append(n)
+    elif n <= 0xFFFF:
+        buf.append(253)
+        buf += struct.pack('>H', n)
+    elif n <= 0xFFFFFFFF:
+        buf.append(254)
+        buf += struct.pack('>I', n)
+    else:
+        buf.append(255)
+        buf += struct.pack('>Q', n)
+
+def read_num(data, i):
+    n = data[i]
+    if n < 253:
+        return n, i + 1
+    if n == 253:
+        return struct.unpack_from('>H', data, i + 1)[0], i + 3
+    if n == 254:
+        return struct.unpack_from('>I', data, i + 1)[0], i + 5
+    return struct.unpack_from('>Q', data, i + 1)[0], i + 9
+
+def write_value(buf, value):
+    if value is None:
+        buf.append(T_NONE)
+    elif value is True:
+        buf.append(T_TRUE)
+    elif value is False:
+        buf.append(T_FALSE)
+    elif isinstance(value, int):
+        buf.append(T_INT if value >= 0 else T_NEG)
+        write_num(buf, value if value >= 0 else -value)
+    elif isinstance(value, float):
+        buf.append(T_FLOAT)
+        buf += struct.pack('>d', value)
+    elif isinstance(value, str):
+        encoded = value.encode()
+        buf.append(T_STR)
+        write_num(buf, len(encoded))
+        buf += encoded
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        buf.append(T_BYTES)
+        write_num(buf, len(value))
+        buf += value
+    elif isinstance(value, dict):
+        buf.append(T_DICT)
+        write_num(buf, len(value))
+        for key, item in value.items():
+            index = KEY_INDEX.get(key)
+            if index is not None:
+                buf.append(T_KEY)
+                buf.append(index)
+            else:
+                write_value(buf, str(key))
+            write_value(buf, item)
+    elif isinstance(value, (list, tuple)):
+        buf.append(T_LIST)
+        write_num(buf, len(value))
+        for item in value:
+            write_value(buf, item)
+    else:
+        write_value(buf, serialize(value))
+
+def read_value(data, i):
+    tag = data[i]
+    i += 1
+    if tag == T_STR:
+        n, i = read_num(data, i)
+        return data[i:i+n].decode(), i + n
+    if tag == T_DICT:
+        n, i = read_num(data, i)
+        value = {}
+        for _ in range(n):
+            if data[i] == T_KEY:
+                key, i = KEYS[data[i+1]], i + 2
+            else:
+                key, i = read_value(data, i)
+            value[key], i = read_value(data, i)
+        return value, i
+    if tag == T_INT:
+        return read_num(data, i)
+    if tag == T_NEG:
+        n, i = read_num(data, i)
+        return -n, i
+    if tag == T_NONE:
+        return None, i
+    if tag == T_TRUE:
+        return True, i
+    if tag == T_FALSE:
+        return False, i
+    if tag == T_LIST:
+        n, i = read_num(data, i)
+        value = []
+        for _ in range(n):
+            item, i = read_value(data, i)
+            value.append(item)
+        return value, i
+    if tag == T_FLOAT:
+        return struct.unpack_from('>d', data, i)[0], i + 8
+    if tag == T_BYTES:
+        n, i = read_num(data, i)
+        return bytes(data[i:i+n]), i + n
+    raise ValueError(f"Unknown PSK codec type {tag}")
@@ -9,6 +9,7 @@ from ndn.encoding import Name, InterestParam
 from ndn.utils import gen_nonce
 
 from psdcnv3.psk.pskinfo import *
+from psdcnv3.psk.codec import encode
 from psdcnv3.utils import config_value
 
 """
@@ -26,8 +27,12 @@ def make_int_param():
     int_param.lifetime = INT_LT_10
     return int_param
 
-def make_app_param(app_param):
-    return bytes(json.dumps(app_param), 'utf-8')
+def make_app_param(app_param, codec=None):
+    """
+    Encodes `app_param` in `codec`, or in the codec configured as "psk_codec" (JSON
+    by default) if not given.
+    """
+    return encode(app_param, codec or config_value("psk_codec"))
 
 class PSKCmd(object): 
     commands = {
@@ -42,6 +47,7 @@ class PSKCmd(object):
         "CMD_Shutdown": "Shutdown",
         "CMD_Save": "Save",
         "CMD_Metadata": "Metadata",
+        "CMD_Profile": "Profile",
     }
     cmd_list = list(commands.values())
 
@@ -108,7 +114,8 @@ class PSKCmd(object):
         # last index is sequence no.
         lastpart = parts[len(parts)-1]
         if command == PSKCmd.commands["CMD_PD"] or \
-                command == PSKCmd.commands["CMD_Status"] and lastpart.isdecimal():
+                command in (PSKCmd.commands["CMD_Status"], PSKCmd.commands["CMD_Profile"]) \
+                and lastpart.isdecimal():
             seq = lastpart
             wseq = 1
 
@@ -162,6 +169,24 @@ class PSKCmd(object):
                     pubadvinfo=pubadvinfo, irinfo=irinfo, rninfo=rninfo))
         return command, int_param, app_param
 
+    def make_pubadv_batch_cmd(self, prefix:str, pubadvinfos:List[PubAdvInfo],
+                        rninfo:RNInfo=None) -> (str, Any):
+        """
+        make batch pubadv command
+        :param prefix: network_prefix or broker_prefix
+        :type prefix: str
+        :param pubadvinfos: pubadvinfos with datanames to advertise
+        :type pubadvinfos: List[PubAdvInfo]
+        :param rninfo: rninfo
+        :type rninfo: RNInfo
+        :return: command, interest_param, app_param
+        """
+        # make a pubadv command name without dataname, which are in pubadvinfos
+        command = prefix + "/PA/_"
+        int_param = make_int_param()
+        app_param = make_app_param(PSKParameters(rninfo=rninfo, pubadvinfos=pubadvinfos))
+        return command, int_param, app_param
+
     def make_pubunadv_cmd(self, prefix, dataname, pubadvinfo:PubAdvInfo=None) -> (str, Any):
         """
         make pubunadv command
@@ -0,0 +1,221 @@
+from collections import OrderedDict
+
+class CachePolicy(object):
+    """
+    Common protocol for the eviction policies of `CacheWrapper`.
+
+    A policy only keeps track of keys and their sizes (in bytes), and decides
+        which key should be evicted next. The cache keeps the values.
+    """
+
+    def __init__(self, budget):
+        """
+        :param budget: number of bytes the cache can hold.
+        """
+        self.budget = budget
+
+    def record(self, key):
+        """
+        Records a read or a write of `key` whether it is cached or not.
+        """
+        pass
+
+    def touch(self, key):
+        """
+        Marks the cached `key` as recently used.
+        """
+        pass
+
+    def insert(self, key, size):
+        """
+        Adds a newly cached `key` of `size` bytes.
+        """
+        pass
+
+    def resize(self, key, size):
+        """
+        Changes the size of the cached `key` to `size` bytes.
+        """
+        pass
+
+    def victim(self):
+        """
+        Returns the key which should be evicted next.
+        """
+        return None
+
+    def evict(self, key):
+        """
+        Removes `key` evicted by the cache.
+        """
+        self.remove(key)
+
+    def remove(self, key):
+        """
+        Removes `key` deleted from the cache.
+        """
+        pass
+
+    def admit(self, key, victim):
+        """
+        Checks if `key` deserves to be cached in place of the `victim`.
+        """
+        return True
+
+    def clear(self):
+        pass
+
+
+class LRUPolicy(CachePolicy):
+    """
+    Least recently used policy based-on Python's ordered dict.
+    """
+
+    def __init__(self, budget):
+        super().__init__(budget)
+        self._lru = OrderedDict()
+
+    def touch(self, key):
+        self._lru.move_to_end(key)
+
+    def insert(self, key, size):
+        self._lru[key] = size
+
+    def resize(self, key, size):
+        self._lru[key] = size
+
+    def victim(self):
+        return next(iter(self._lru)) if self._lru else None
+
+    def remove(self, key):
+        self._lru.pop(key, None)
+
+    def clear(self):
+        self._lru.clear()
+
+
+class ARCPolicy(CachePolicy):
+    """
+    Adaptive replacement cache policy measured in bytes.
+
+    Keys seen once are kept in T1, and keys seen more than once in T2.
+    B1 and B2 remember keys recently evicted from T1 and T2 respectively.
+    A miss found in B1 (B2) grows (shrinks) the byte target `p` for T1.
+    """
+
+    def __init__(self, budget):
+        super().__init__(budget)
+        self.t1, self.t2 = OrderedDict(), OrderedDict()
+        self.b1, self.b2 = OrderedDict(), OrderedDict()
+        self.t1_size = self.b1_size = self.b2_size = 0
+        self.p = 0
+
+    def touch(self, key):
+        if key in self.t1:
+            size = self.t1.pop(key)
+            self.t1_size -= size
+            self.t2[key] = size
+        else:
+            self.t2.move_to_end(key)
+
+    def insert(self, key, size):
+        if key in self.b1:
+            delta = max(self.b2_size / max(self.b1_size, 1), 1) * size
+            self.p = min(self.budget, self.p + delta)
+            self.b1_size -= self.b1.pop(key)
+            self.t2[key] = size
+        elif key in self.b2:
+            delta = max(self.b1_size / max(self.b2_size, 1), 1) * size
+            self.p = max(0, self.p - delta)
+            self.b2_size -= self.b2.pop(key)
+            self.t2[key] = size
+        else:
+            self.t1[key] = size
+            self.t1_size += size
+
+    def resize(self, key, size):
+        if key in self.t1:
+            self.t1_size += size - self.t1[key]
+            self.t1[key] = size
+        else:
+            self.t2[key] = size
+
+    def victim(self):
+        if self.t1 and (self.t1_size > self.p or not self.t2):
+            return next(iter(self.t1))
+        return next(iter(self.t2)) if self.t2 else None
+
+    def evict(self, key):
+        if key in self.t1:
+            size = self.t1.pop(key)
+            self.t1_size -= size
+            self.b1[key] = size
+            self.b1_size += size
+        elif key in self.t2:
+            size = self.t2.pop(key)
+            self.b2[key] = size
+            self.b2_size += size
+        # Ghosts remember no more than the budget
+        while self.b1 and self.b1_size > self.budget:
+            self.b1_size -= self.b1.popitem(last=False)[1]
+        while self.b2 and self.b2_size > self.budget:
+            self.b2_size -= self.b2.popitem(last=False)[1]
+
+    def remove(self, key):
+        if key in self.t1:
+            self.t1_size -= self.t1.pop(key)
+        else:
+            self.t2.pop(key, None)
+
+    def clear(self):
+        for table in [self.t1, self.t2, self.b1, self.b2]:
+            table.clear()
+        self.t1_size = self.b1_size = self.b2_size = 0
+        self.p = 0
+
+
+class TinyLFUPolicy(LRUPolicy):
+    """
+    LRU eviction with TinyLFU admission.
+
+    Frequencies of reads and writes are estimated by a count-min sketch which is
+        halved periodically, so that a new key is cached only if it was accessed at
+        least as frequently as the key it would evict. A key just written is
+        admitted in place of another key accessed once, but not of a hot one.
+    """
+
+    def __init__(self, budget, width=4096, depth=4):
+        super().__init__(budget)
+        self.width, self.depth = width, depth
+        self.sketch = [[0] * width for _ in range(depth)]
+        self.samples = 0
+        self.period = width * 10
+
+    def slots(self, key):
+        h = hash(key)
+        for row in range(self.depth):
+            yield row, (h ^ (h >> (row * 8 + 8)) ^ row * 0x9E3779B9) % self.width
+
+    def record(self, key):
+        for row, slot in self.slots(key):
+            if self.sketch[row][slot] < 15:
+                self.sketch[row][slot] += 1
+        self.samples += 1
+        if self.samples >= self.period:
+            # Age the frequencies
+            self.sketch = [[count >> 1 for count in row] for row in self.sketch]
+            self.samples //= 2
+
+    def frequency(self, key):
+        return min(self.sketch[row][slot] for row, slot in self.slots(key))
+
+    def admit(self, key, victim):
+        return victim is None or self.frequency(key) >= self.frequency(victim)
+
+    def clear(self):
+        super().clear()
+        self.sketch = [[0] * self.width for _ in range(self.depth)]
+        self.samples = 0
+
+
+policies = {'lru': LRUPolicy, 'arc': ARCPolicy, 'tinylfu': TinyLFUPolicy}
@@ -1,83 +1,388 @@
 from .Storage import Storage
-import logging
+from .CachePolicy import policies
+from concurrent.futures import ThreadPoolExecutor
+import asyncio, threading, sys
 
 class CacheWrapper(Storage):
     """
-    A `Storage` wrapper for LRU cache based-on Python dict.
+    A `Storage` wrapper for write-back cache bounded by a byte budget.
     Can wrap any PSDCNv3 `Storage` and convert it to a cached one.
 
-    Python 3.6 completely revamped dictionary implementation to use linked hashmap,
-        Dicts are now ordered by insertion-order.
-        We can exploit this to use the dict as a LRU cache in O(1) time qute easily.
+    Which value to evict is decided by a `CachePolicy`: LRU, ARC, or LRU with
+        TinyLFU admission.
+    Values written to the cache are dirty until they are written to the inner storage.
+        Evicted dirty values are collected into batches, which are written back with
+        `inner.mset` by a single writer thread, so that `set` does not wait for the
+        storage media. Deletes go through the same writer thread to keep the order of
+        writes. The `write_back` task running in the event loop hands over partial
+        batches periodically.
+    Cache misses are read from the inner storage by the writer thread as well, so that
+        reads never race with the writes, deletes and compactions of the inner storage.
+    The cache is guarded by a lock to be shared by the event loop and the writer thread.
     """
 
-    def __init__(self, inner, capacity):
+    def __init__(self, inner, capacity=0, budget=0, policy='lru', batch_size=256, interval=0.1):
         """
         :param inner: a `Storage` to which the cache functionality will be added.
         :type inner: `Storage`-conformant provider
-        :param capacity: size (number of data items) of the cache
+        :param capacity: maximum number of data items in the cache. 0 for no limit.
+        :param budget: maximum number of bytes of the cached values. 0 for no limit.
+        :param policy: eviction policy of the cache. One of 'lru', 'arc', and 'tinylfu'.
+        :param batch_size: number of evicted dirty values to be written back at once.
+        :param interval: period (in seconds) of writing back partial batches.
         """
-        assert capacity > 0
+        assert capacity > 0 or budget > 0
+        assert policy in policies
         self.inner = inner
         self.capacity = capacity
-        self._lru = {}
+        self.budget = budget
+        # Values are measured in bytes if budget was given. In number of values otherwise.
+        self.limit = budget if budget else capacity
+        self.sizeof = _sizeof if budget else (lambda value: 1)
+        self.policy_name = policy
+        self.policy = policies[policy](self.limit)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.used = 0
+        self._cache = {}
+        self._sizes = {}
+        self._dirty = set()
+        self._pending = {}              # Evicted dirty values yet to be written back
+        self._writing = []              # Batches being written back
+        self._deleted = set()           # Keys being deleted
+        self._lock = threading.RLock()
+        self._writer = None
+        self.hits = self.misses = self.evictions = self.rejections = 0
+        self.writebacks = self.batches = 0
 
     def __str__(self):
-        return "#{Cache with %d elts over %s}"%(len(self._lru), str(self.inner))
+        return "#{Cache with %d elts over %s}"%(len(self._cache), str(self.inner))
 
     def __contains__(self, key):
-        return key in self._lru or key in self.inner
+        with self._lock:
+            if key in self._cache or key in self._pending:
+                return True
+            if key in self._deleted:
+                return False
+            if any(key in batch for batch in self._writing):
+                return True
+        return key in self.inner
 
     def media(self):
-        return f"Cache of {self.capacity} items over {self.inner.media()}"
+        size = f"{self.budget} bytes" if self.budget else f"{self.capacity} items"
+        return f"{self.policy_name.upper()} cache of {size} over {self.inner.media()}"
 
     def set_context(self, context):
+        self.context = context
+        self.logger = context.logger
         self.inner.set_context(context)
 
+    def stats(self):
+        """
+        Returns counters of the cache.
+        """
+        with self._lock:
+            return {
+                'policy': self.policy_name, 'items': len(self._cache), 'used': self.used,
+                'limit': self.limit, 'dirty': len(self._dirty), 'pending': len(self._pending),
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'rejections': self.rejections, 'writebacks': self.writebacks, 'batches': self.batches
+            }
+
     def get(self, key):
-        if key in self._lru:
-            value = self._lru[key]
-            del self._lru[key]
-        else:
+        found, value = self.lookup(key)
+        if found:
+            return value
+        try:
+            value = self.fetch(self.inner.get, key).result()
+        except:
+            return None
+        if value is not None:
+            self.load(key, value)
+        return value
+
+    def view(self, key):
+        # Views are not cached, so that they don't pin the storage media
+        found, value = self.lookup(key)
+        if found:
+            return value
+        try:
+            return self.fetch(self.inner.view, key).result()
+        except:
+            return None
+
+    def mget(self, keys):
+        values, misses = self.mlookup(keys)
+        if misses:
             try:
-                value = self.inner.get(key)
-                if value is None:
-                    return value
+                fetched = self.fetch(self.inner.mget, misses).result()
             except:
-                return None
-        # Reset ordering by re-inserting the key in the dict
-        self._lru[key] = value
-        return value
+                fetched = [None] * len(misses)
+            self.mload(values, misses, fetched)
+        return [values.get(key) for key in keys]
 
     def set(self, key, value):
-        # If key already exists, update the value
-        if key in self._lru:
-            del self._lru[key]
-        # Else, remove the oldest key exploiting Python's dict ordering
-        elif len(self._lru) == self.capacity:
-            for out in self._lru:
-                write = self._lru[out]
-                self.inner.set(out, write)
-                del self._lru[out]
-                break
-        self._lru[key] = value
+        self.mset({key: value})
+
+    def mset(self, kvs):
+        with self._lock:
+            for key, value in kvs.items():
+                self.policy.record(key)
+                self.put(key, value, dirty=True)
+            self.spill(self.batch_size)
 
     def delete(self, key):
-        if key in self._lru:
-            del self._lru[key]
-        if key in self.inner:
-            self.inner.delete(key)
+        self.mdelete([key])
+
+    def mdelete(self, keys):
+        self.submit(self.inner.mdelete, self.forget(keys)).result()
+
+    # Coroutine versions of data access methods
+
+    async def aget(self, key):
+        found, value = self.lookup(key)
+        if found:
+            return value
+        try:
+            value = await asyncio.wrap_future(self.fetch(self.inner.get, key))
+        except:
+            return None
+        if value is not None:
+            self.load(key, value)
+        return value
+
+    async def aview(self, key):
+        found, value = self.lookup(key)
+        if found:
+            return value
+        try:
+            return await asyncio.wrap_future(self.fetch(self.inner.view, key))
+        except:
+            return None
+
+    async def amget(self, keys):
+        values, misses = self.mlookup(keys)
+        if misses:
+            try:
+                fetched = await asyncio.wrap_future(self.fetch(self.inner.mget, misses))
+            except:
+                fetched = [None] * len(misses)
+            self.mload(values, misses, fetched)
+        return [values.get(key) for key in keys]
+
+    async def aset(self, key, value):
+        self.mset({key: value})
+
+    async def amset(self, kvs):
+        self.mset(kvs)
+
+    async def amdelete(self, keys):
+        await asyncio.wrap_future(self.submit(self.inner.mdelete, self.forget(keys)))
+
+    async def write_back(self):
+        """
+        Periodically hands over evicted dirty values to the writer thread.
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+            with self._lock:
+                self.spill(1)
+
+    # Cache management, called with the lock held except for `lookup`s and `load`s.
+
+    def lookup(self, key):
+        """
+        Looks up the value of `key` in the cache and the batches being written back.
+
+        :return: (True, value) if found. (False, None) if the inner storage should be read.
+        """
+        with self._lock:
+            self.policy.record(key)
+            if key in self._cache:
+                self.policy.touch(key)
+                self.hits += 1
+                return True, self._cache[key]
+            if key in self._pending:
+                self.hits += 1
+                return True, self._pending[key]
+            if key in self._deleted:
+                return True, None
+            for batch in reversed(self._writing):
+                if key in batch:
+                    self.hits += 1
+                    return True, batch[key]
+            self.misses += 1
+            return False, None
+
+    def mlookup(self, keys):
+        values, misses = {}, []
+        for key in keys:
+            found, value = self.lookup(key)
+            if found:
+                values[key] = value
+            else:
+                misses.append(key)
+        return values, misses
+
+    def load(self, key, value):
+        with self._lock:
+            self.put(key, value, dirty=False)
+
+    def mload(self, values, keys, fetched):
+        with self._lock:
+            for key, value in zip(keys, fetched):
+                values[key] = value
+                if value is not None:
+                    self.put(key, value, dirty=False)
+
+    def put(self, key, value, dirty):
+        if not dirty and (key in self._cache or key in self._pending or key in self._deleted):
+            return          # A newer value was written while reading the inner storage
+        size = self.sizeof(value)
+        self._pending.pop(key, None)
+        self._deleted.discard(key)
+        if key in self._cache:
+            self.used += size - self._sizes[key]
+            self.policy.resize(key, size)
+            self.policy.touch(key)
+        else:
+            if size > self.limit or (self.full(size) and not self.policy.admit(key, self.policy.victim())):
+                self.rejections += 1
+                if dirty:
+                    self._pending[key] = value
+                return
+            self.used += size
+            self.policy.insert(key, size)
+        self._cache[key] = value
+        self._sizes[key] = size
+        if dirty:
+            self._dirty.add(key)
+        self.shrink()
+
+    def full(self, size):
+        return self.used + size > self.limit or \
+            (self.capacity and len(self._cache) >= self.capacity)
+
+    def shrink(self):
+        while self._cache and (self.used > self.limit or \
+                (self.capacity and len(self._cache) > self.capacity)):
+            out = self.policy.victim()
+            self.policy.evict(out)
+            value = self._cache.pop(out)
+            self.used -= self._sizes.pop(out)
+            self.evictions += 1
+            if out in self._dirty:
+                self._dirty.remove(out)
+                self._pending[out] = value
+
+    def forget(self, keys):
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                if key in self._cache:
+                    self.policy.remove(key)
+                    self._cache.pop(key)
+                    self.used -= self._sizes.pop(key)
+                    self._dirty.discard(key)
+                self._pending.pop(key, None)
+                self._deleted.add(key)
+        return keys
+
+    def spill(self, threshold):
+        # Hands over the pending values to the writer thread if there are enough of them
+        if len(self._pending) >= threshold:
+            batch, self._pending = self._pending, {}
+            return self.submit(self.inner.mset, batch)
+
+    def submit(self, func, arg):
+        """
+        Runs `func(arg)` in the writer thread after all the previously submitted ones.
+        """
+        with self._lock:
+            if func == self.inner.mset:
+                self._writing.append(arg)
+            return self.writer().submit(self.run, func, arg)
+
+    def fetch(self, func, arg):
+        """
+        Reads the inner storage with `func(arg)` in the writer thread after all the
+            previously submitted writes.
+
+        :return: a `concurrent.futures.Future` of the value read.
+        """
+        return self.writer().submit(func, arg)
+
+    def writer(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1)
+            return self._writer
+
+    def run(self, func, arg):
+        try:
+            func(arg)
+        except Exception as e:
+            if hasattr(self, 'logger'):
+                self.logger.error(f"Cache write back failed: {e}")
+        finally:
+            with self._lock:
+                if func == self.inner.mset:
+                    self._writing.remove(arg)
+                    self.writebacks += len(arg)
+                    self.batches += 1
+                elif func == self.inner.mdelete:
+                    self._deleted.difference_update(arg)
+
+    def compact(self):
+        # The inner storage is touched only by the writer thread
+        self.submit(lambda _: self.inner.compact(), None).result()
+
+    async def acompact(self):
+        await asyncio.wrap_future(self.submit(lambda _: self.inner.compact(), None))
 
     def flush(self):
-        self.inner.mset(self._lru)
-        self.inner.flush()
+        self.drain().result()
+
+    async def aflush(self):
+        await asyncio.wrap_future(self.drain())
+
+    def drain(self):
+        # Write back every dirty value, and then flush the inner storage
+        with self._lock:
+            for key in self._dirty:
+                self._pending[key] = self._cache[key]
+            self._dirty.clear()
+            self.spill(1)
+            return self.submit(lambda _: self.inner.flush(), None)
 
     def restore(self):
         self.inner.restore()
 
     def clear(self):
-        self.inner.clear()
-        self._lru.clear()
+        self.wipe().result()
+
+    async def aclear(self):
+        await asyncio.wrap_future(self.wipe())
+
+    def wipe(self):
+        with self._lock:
+            self._cache.clear()
+            self._sizes.clear()
+            self._dirty.clear()
+            self._pending.clear()
+            self.policy.clear()
+            self.used = 0
+            return self.submit(lambda _: self.inner.clear(), None)
 
     def keys(self):
-        return set(list(self._lru.keys()) + list(self.inner.keys()))
+        with self._lock:
+            keys = set(self._cache) | set(self._pending)
+            for batch in self._writing:
+                keys |= set(batch)
+        return (keys | set(self.inner.keys())) - self._deleted
+
+def _sizeof(value):
+    try:
+        return len(value)
+    except TypeError:
+        return sys.getsizeof(value)
@@ -1,5 +1,5 @@
 import os, os.path
-import shutil
+import shutil, mmap
 from io import BytesIO
 from .Storage import Storage
 from psdcnv3.utils import build_path
@@ -12,6 +12,7 @@ class FileStorage(Storage):
 
     def __init__(self):
         self.bufsize = 512*1024     # 512K
+        self.mmap_threshold = 64*1024
 
     def __str__(self):
         return "#{FileStorage with %d elts}"%len(self.keys())
@@ -26,22 +27,31 @@ class FileStorage(Storage):
         self.root = "dump" + build_path(context.id) + ".dir"
 
     def get(self, key):
-        file = BytesIO()
         try:
-            source = self.open(key)
-            try:
-                bufsize = self.bufsize
-                while True:
-                    buf = source.read(bufsize)
-                    file.write(buf)
-                    if len(buf) < bufsize:
-                        break
-                return file.getvalue()
-            finally:
-                source.close()
+            with self.open(key) as source:
+                return source.read()
+        except KeyError:
+            return None
+
+    def view(self, key):
+        try:
+            with self.open(key) as source:
+                # Mapping a small file costs more than reading it
+                if os.fstat(source.fileno()).st_size < self.mmap_threshold:
+                    return source.read()
+                return memoryview(mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ))
         except KeyError:
             return None
 
+    async def aget(self, key):
+        return await self.offload(self.get, key)
+
+    async def aview(self, key):
+        return await self.offload(self.view, key)
+
+    async def amget(self, keys):
+        return await self.offload(self.mget, keys)
+
     def set(self, key, value):
         value = BytesIO(value)
         bufsize = self.bufsize
@@ -54,6 +64,12 @@ class FileStorage(Storage):
                 if len(buf) < bufsize:
                     break
 
+    async def aset(self, key, value):
+        await self.offload(self.set, key, value)
+
+    async def amset(self, kvs):
+        await self.offload(self.mset, kvs)
+
     def delete(self, key):
         try:
             targetname = self.path_name(key)
@@ -63,6 +79,9 @@ class FileStorage(Storage):
             if not e.errno == 2:
                 raise
 
+    async def amdelete(self, keys):
+        await self.offload(self.mdelete, keys)
+
     def keys(self):
         root = os.path.abspath(self.root)
         result = []
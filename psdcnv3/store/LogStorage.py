@@ -0,0 +1,490 @@
+import os, os.path
+import struct, zlib, mmap
+from .Storage import Storage
+from psdcnv3.utils import build_path
+
+_MAGIC = b'PSDCNLOG'
+_RECORD = struct.Struct('>IHI')     # Record header: checksum, key length, value length
+_CHECKSUM = struct.Struct('>I')     # CRC-32 of the rest of the record
+_LENGTHS = struct.Struct('>HI')     # Key length, value length
+_ENTRY = struct.Struct('>QIH')      # Footer index entry: value offset, value length, key length
+_FOOTER = struct.Struct('>QI8s')    # Footer trailer: index offset, number of entries, magic
+_TOMBSTONE = 0xFFFFFFFF             # Value length of a deleted key
+
+class Segment(object):
+    """
+    An append-only log file of records (header, key, value).
+
+    While a segment is active, writes are appended to it and its records are kept
+        in memory. When a segment is sealed, an index of its records is written
+        as a footer, so that the index can be rebuilt without reading the values.
+    """
+    def __init__(self, path, id, shard=None):
+        self.path, self.id, self.shard = path, id, shard
+        self.file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b', buffering=0)
+        self.fd = self.file.fileno()
+        self.size = os.fstat(self.fd).st_size
+        self.records = []           # (key, value offset, value length) of an active segment
+        self.keys = []              # Keys written to a sealed segment
+        self.live = self.dead = 0   # Bytes of live and dead records
+        self.sealed = False
+        self.sealing = False        # Sealing is deferred until no write is in progress
+        self.writing = 0            # Number of writes in progress
+        self.mmap = None            # Memory map of a sealed segment
+
+    def __str__(self):
+        return f"#{{Segment {self.id} of {self.size} bytes, {self.dead} dead}}"
+
+    def reserve(self, key, bkey, value):
+        """
+        Reserves the region of a record at the end of the segment.
+        The record should be written with `write` thereafter.
+
+        :return: (offset of the record, offset of the value, buffers to write)
+        """
+        offset = self.size
+        length = len(value) if value is not None else _TOMBSTONE
+        lengths = _LENGTHS.pack(len(bkey), length)
+        checksum = zlib.crc32(bkey, zlib.crc32(lengths))
+        buffers = [None, lengths, bkey]
+        if value is not None:
+            checksum = zlib.crc32(value, checksum)
+            buffers.append(value)
+        buffers[0] = _CHECKSUM.pack(checksum)
+        header = _RECORD.size + len(bkey)
+        self.size += header + (len(value) if value is not None else 0)
+        self.records.append((key, offset + header, length))
+        return offset, offset + header, buffers
+
+    def write(self, offset, buffers):
+        os.pwritev(self.fd, buffers, offset)
+
+    def read(self, offset, length):
+        return os.pread(self.fd, length, offset)
+
+    def view(self, offset, length):
+        """
+        Returns a memoryview over the mapped region of a sealed segment.
+        Active segments are still growing, so their data are read instead.
+        """
+        if not self.sealed:
+            return self.read(offset, length)
+        if self.mmap is None:
+            self.mmap = memoryview(mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ))
+        return self.mmap[offset:offset+length]
+
+    def seal(self):
+        """
+        Writes the footer index of the segment.
+        """
+        if self.sealed:
+            return
+        if self.writing:
+            self.sealing = True
+            return
+        index = bytearray()
+        for key, offset, length in self.records:
+            bkey = key.encode()
+            index += _ENTRY.pack(offset, length, len(bkey))
+            index += bkey
+        index += _FOOTER.pack(self.size, len(self.records), _MAGIC)
+        os.pwrite(self.fd, index, self.size)
+        os.fsync(self.fd)
+        self.keys = [key for key, _, _ in self.records]
+        self.records = []
+        self.sealed = True
+
+    def written(self):
+        """
+        Notifies that a write reserved before has completed.
+        """
+        self.writing -= 1
+        if self.sealing and not self.writing:
+            self.seal()
+
+    def scan(self):
+        """
+        Reads the records index of the segment file.
+        The footer is used if the segment was sealed. Otherwise (e.g. after a crash),
+            records are read and checked against their checksums, and the segment is
+            truncated at the first incomplete or corrupt one, and sealed. Concurrent
+            writes may leave holes in the middle of an unsealed segment, so the records
+            after a hole are dropped as well.
+
+        :return: list of (key, value offset, value length)
+        """
+        if self.size >= _FOOTER.size:
+            index_offset, count, magic = \
+                _FOOTER.unpack(self.read(self.size - _FOOTER.size, _FOOTER.size))
+            if magic == _MAGIC and index_offset <= self.size - _FOOTER.size:
+                index = self.read(index_offset, self.size - _FOOTER.size - index_offset)
+                records, pos = [], 0
+                for _ in range(count):
+                    offset, length, key_len = _ENTRY.unpack_from(index, pos)
+                    pos += _ENTRY.size
+                    records.append((index[pos:pos+key_len].decode(), offset, length))
+                    pos += key_len
+                self.keys = [key for key, _, _ in records]
+                self.sealed = True
+                return records
+        # Unsealed segment
+        offset = 0
+        while offset + _RECORD.size <= self.size:
+            checksum, key_len, length = _RECORD.unpack(self.read(offset, _RECORD.size))
+            header = _RECORD.size + key_len
+            end = offset + header + (length if length != _TOMBSTONE else 0)
+            if end > self.size:
+                break
+            record = self.read(offset + _CHECKSUM.size, end - offset - _CHECKSUM.size)
+            if zlib.crc32(record) != checksum:
+                break
+            key = record[_LENGTHS.size:_LENGTHS.size + key_len].decode()
+            self.records.append((key, offset + header, length))
+            offset = end
+        if offset < self.size:
+            os.ftruncate(self.fd, offset)
+            self.size = offset
+        records = list(self.records)
+        self.seal()
+        return records
+
+    def close(self):
+        # The memory map is left to the garbage collector since views over it
+        # may still be in use
+        self.mmap = None
+        self.file.close()
+
+
+class Write(object):
+    """
+    A record reserved in a segment to be written.
+    """
+    def __init__(self, key, tombstone, segment, start, offset, length, buffers):
+        self.key, self.tombstone = key, tombstone
+        self.segment, self.start, self.offset, self.length = segment, start, offset, length
+        self.buffers = buffers
+        self.pending = False        # Registered in `LogStorage.pending`
+
+
+class LogStorage(Storage):
+    """
+    An implementation of `Storage` which appends data to log segment files.
+
+    Keys are sharded by their data names, and each shard appends to its own active
+        segment, so that the items of a data name are kept together.
+    An in-memory index maps keys to (segment, offset, length) of their values,
+        and a read is served with a single `pread`, or as a slice of the memory map
+        of a sealed segment by `view`.
+    Deleted keys are logged with tombstones, and sealed segments whose dead records
+        exceed `compact_ratio` are compacted by moving their live records to the active
+        segments.
+    """
+
+    def __init__(self, shards=8, segment_size=64*1024*1024, compact_ratio=0.5):
+        """
+        :param shards: number of shards (active segments).
+        :param segment_size: size (bytes) of a segment at which a new segment is started.
+        :param compact_ratio: ratio of dead bytes in a sealed segment to compact it.
+        """
+        self.shards = shards
+        self.segment_size = segment_size
+        self.compact_ratio = compact_ratio
+        self.index = {}             # Key => (segment, offset, length)
+        self.pending = {}           # Key => Write in progress
+        self.compacting = set()     # Ids of segments being compacted
+        self.segments = {}          # Segment id => segment
+        self.active = {}            # Shard => active segment
+        self.next_id = 1
+        self.root = None
+
+    def __str__(self):
+        return "#{LogStorage with %d elts in %d segments}"%(len(self.index), len(self.segments))
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def media(self):
+        return f"LogStorage of {self.shards} shards"
+
+    def set_context(self, context):
+        self.logger = context.logger
+        self.open("dump" + build_path(context.id) + ".log")
+
+    def open(self, root):
+        """
+        Opens log segments under the directory `root`, and rebuilds the index from them.
+        """
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+        self.index.clear()
+        self.pending.clear()
+        self.segments.clear()
+        self.active.clear()
+        ids = sorted(int(f[:-4]) for f in os.listdir(self.root) if f.endswith(".seg"))
+        for id in ids:
+            segment = Segment(self.segment_path(id), id)
+            self.segments[id] = segment
+            for key, offset, length in segment.scan():
+                size = _RECORD.size + len(key.encode())
+                self.forget(key)
+                if length == _TOMBSTONE:
+                    segment.dead += size
+                else:
+                    self.index[key] = (segment, offset, length)
+                    segment.live += size + length
+        self.next_id = ids[-1] + 1 if ids else 1
+
+    def segment_path(self, id):
+        return os.path.join(self.root, f"{id:010d}.seg")
+
+    def shard(self, key):
+        dataname = key.rsplit('[', 1)[0]
+        return zlib.crc32(dataname.encode()) % self.shards
+
+    def writer(self, shard, extra):
+        segment = self.active.get(shard)
+        if segment is not None and segment.size + extra > self.segment_size \
+                and segment.records:
+            segment.seal()
+            segment = None
+        if segment is None:
+            segment = Segment(self.segment_path(self.next_id), self.next_id, shard)
+            self.segments[segment.id] = segment
+            self.active[shard] = segment
+            self.next_id += 1
+        return segment
+
+    def forget(self, key):
+        """
+        Removes `key` from the index, and accounts its old value as dead.
+        """
+        entry = self.index.pop(key, None)
+        if entry is not None:
+            segment, _, length = entry
+            size = _RECORD.size + len(key.encode()) + length
+            segment.live -= size
+            segment.dead += size
+
+    def reserve(self, key, value):
+        """
+        Reserves a record for `key` in the active segment of its shard.
+        A None `value` makes a tombstone.
+
+        :return: a `Write` to be written and then committed.
+        """
+        bkey = key.encode()
+        length = len(value) if value is not None else 0
+        segment = self.writer(self.shard(key), _RECORD.size + len(bkey) + length)
+        start, offset, buffers = segment.reserve(key, bkey, value)
+        return Write(key, value is None, segment, start, offset, length, buffers)
+
+    def commit(self, write):
+        """
+        Reflects a completed `write` to the index.
+        """
+        size = _RECORD.size + len(write.key.encode()) + write.length
+        if write.tombstone:
+            write.segment.dead += size
+        # A synchronous write is not pending, and is the latest write
+        elif not write.pending or self.pending.get(write.key) is write:
+            self.pending.pop(write.key, None)
+            self.forget(write.key)
+            self.index[write.key] = (write.segment, write.offset, write.length)
+            write.segment.live += size
+        else:
+            write.segment.dead += size      # Superseded by a later write
+
+    def get(self, key):
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        segment, offset, length = entry
+        return segment.read(offset, length)
+
+    def view(self, key):
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        segment, offset, length = entry
+        return segment.view(offset, length)
+
+    def set(self, key, value):
+        value = bytes(value) if not isinstance(value, (bytes, bytearray)) else value
+        self.pending.pop(key, None)
+        write = self.reserve(key, value)
+        write.segment.write(write.start, write.buffers)
+        self.commit(write)
+
+    def delete(self, key):
+        if key not in self.index and key not in self.pending:
+            return
+        self.pending.pop(key, None)
+        self.forget(key)
+        write = self.reserve(key, None)
+        write.segment.write(write.start, write.buffers)
+        self.commit(write)
+
+    # Coroutine versions reserve records in the event loop, and read or write them
+    # in the thread pool. The index is updated after the writes complete.
+
+    async def aget(self, key):
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        segment, offset, length = entry
+        return await self.offload(segment.read, offset, length)
+
+    async def aview(self, key):
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        segment, offset, length = entry
+        if segment.sealed:
+            return segment.view(offset, length)
+        return await self.offload(segment.read, offset, length)
+
+    async def amget(self, keys):
+        entries = [self.index.get(key) for key in keys]
+        def read_all():
+            return [segment.read(offset, length) if segment else None
+                    for segment, offset, length in
+                        (entry or (None, 0, 0) for entry in entries)]
+        return await self.offload(read_all)
+
+    async def aset(self, key, value):
+        await self.amset({key: value})
+
+    async def amset(self, kvs):
+        writes = []
+        for key, value in kvs.items():
+            value = bytes(value) if not isinstance(value, (bytes, bytearray)) else value
+            write = self.reserve(key, value)
+            write.pending = True
+            self.pending[key] = write
+            writes.append(write)
+        await self.write_all(writes)
+
+    async def amdelete(self, keys):
+        writes = []
+        for key in keys:
+            if key not in self.index and key not in self.pending:
+                continue
+            self.pending.pop(key, None)
+            self.forget(key)
+            writes.append(self.reserve(key, None))
+        await self.write_all(writes)
+
+    async def write_all(self, writes):
+        for write in writes:
+            write.segment.writing += 1
+        def write_out():
+            for write in writes:
+                write.segment.write(write.start, write.buffers)
+        try:
+            await self.offload(write_out)
+        finally:
+            for write in writes:
+                write.segment.written()
+        for write in writes:
+            self.commit(write)
+
+    def keys(self):
+        return list(self.index.keys())
+
+    def compactable(self):
+        """
+        Returns sealed segments whose dead records exceed `compact_ratio`.
+        """
+        segments = []
+        for segment in self.segments.values():
+            total = segment.live + segment.dead
+            if segment.sealed and segment.id not in self.compacting and total and \
+                    segment.dead / total >= self.compact_ratio:
+                segments.append(segment)
+        return segments
+
+    def moved(self, segment, key):
+        # Live in `segment`, and not being overwritten by a write in progress
+        entry = self.index.get(key)
+        return entry is not None and entry[0] is segment and key not in self.pending
+
+    def dropped(self, segment, key):
+        # Deleted, and its tombstone must be kept while older segments remain
+        return key not in self.index and key not in self.pending and \
+            any(s.id < segment.id for s in self.segments.values())
+
+    def retire(self, segment):
+        """
+        Removes a compacted `segment`, unless a write in progress kept some of its
+            records from being moved. Such a segment is compacted again later.
+        """
+        if any(self.index.get(key, (None,))[0] is segment for key in segment.keys):
+            return False
+        del self.segments[segment.id]
+        return True
+
+    def unlink(self, segment):
+        segment.close()
+        os.unlink(segment.path)
+        if hasattr(self, 'logger'):
+            self.logger.debug(f"Compacted log segment {segment.id}")
+
+    def compact(self):
+        """
+        Moves live records of sealed segments having many dead records to the active
+            segments, and removes those segments.
+        """
+        for segment in self.compactable():
+            for key in segment.keys:
+                if self.moved(segment, key):
+                    self.set(key, self.get(key))
+                elif self.dropped(segment, key):
+                    write = self.reserve(key, None)
+                    write.segment.write(write.start, write.buffers)
+                    self.commit(write)
+            if self.retire(segment):
+                self.unlink(segment)
+
+    async def acompact(self):
+        """
+        Coroutine version of `compact`, which reads and moves the live records in the
+            thread pool. Records overwritten meanwhile are left to the newer writes.
+        """
+        for segment in self.compactable():
+            self.compacting.add(segment.id)
+            try:
+                keys = [key for key in segment.keys if self.moved(segment, key)]
+                values = await self.amget(keys)
+                # Writes may have been started while the values were read
+                kvs = {key: value for key, value in zip(keys, values)
+                       if self.moved(segment, key)}
+                writes = []
+                for key, value in kvs.items():
+                    write = self.reserve(key, value)
+                    write.pending = True
+                    self.pending[key] = write
+                    writes.append(write)
+                writes += [self.reserve(key, None) for key in segment.keys
+                           if self.dropped(segment, key)]
+                await self.write_all(writes)
+                if self.retire(segment):
+                    await self.offload(self.unlink, segment)
+            finally:
+                self.compacting.discard(segment.id)
+
+    def flush(self):
+        for segment in self.active.values():
+            segment.seal()
+        self.active.clear()
+
+    def restore(self):
+        if self.root is not None and not self.segments:
+            self.open(self.root)
+
+    def clear(self):
+        for segment in self.segments.values():
+            segment.close()
+            os.unlink(segment.path)
+        self.index.clear()
+        self.segments.clear()
+        self.active.clear()
@@ -1,16 +1,28 @@
 from .Storage import Storage
+try:
+    import redis.asyncio as aioredis
+except ImportError:     # redis < 4.2
+    aioredis = None
 
 class RedisStorage(Storage):
     """
     An implementation of `Storage` which uses Redis-server as the actual storage.
+
+    Coroutine methods use an asyncio Redis client with a connection pool.
+        Unless given, the client is made for the server of `redis` on first use.
+        Without redis.asyncio, they run the blocking client in the thread pool.
     """
 
-    def __init__(self, redis):
+    def __init__(self, redis, aredis=None, max_connections=16):
         """
         :param redis: a Redis-server proxy (recommend redis.StrictRedis instance).
+        :param aredis: an asyncio Redis-server proxy (redis.asyncio.Redis instance).
+        :param max_connections: size of the connection pool of the asyncio proxy.
         """
         # assert redis is not None
         self.redis = redis
+        self.aredis = aredis
+        self.max_connections = max_connections
 
     def __str__(self):
         return "#{RedisStorage with %d elts}"%len(self.keys())
@@ -36,6 +48,59 @@ class RedisStorage(Storage):
     def delete(self, key):
         self.redis.delete(key)
 
+    def mdelete(self, keys):
+        if keys:
+            self.redis.delete(*keys)
+
+    def async_redis(self):
+        if self.aredis is None and aioredis is not None:
+            kwargs = self.redis.connection_pool.connection_kwargs
+            if 'path' in kwargs:
+                server = {'unix_socket_path': kwargs['path']}
+            else:
+                server = {'host': kwargs.get('host', 'localhost'),
+                          'port': kwargs.get('port', 6379)}
+            self.aredis = aioredis.Redis(db=kwargs.get('db', 0),
+                password=kwargs.get('password'),
+                max_connections=self.max_connections, **server)
+        return self.aredis
+
+    async def aget(self, key):
+        aredis = self.async_redis()
+        if aredis is None:
+            return await self.offload(self.get, key)
+        return await aredis.get(key)
+
+    async def aview(self, key):
+        return await self.aget(key)
+
+    async def amget(self, keys):
+        aredis = self.async_redis()
+        if aredis is None:
+            return await self.offload(self.mget, keys)
+        return await aredis.mget(keys)
+
+    async def aset(self, key, value):
+        aredis = self.async_redis()
+        if aredis is None:
+            await self.offload(self.set, key, value)
+        else:
+            await aredis.set(key, value)
+
+    async def amset(self, kvs):
+        aredis = self.async_redis()
+        if aredis is None:
+            await self.offload(self.mset, kvs)
+        else:
+            await aredis.mset(kvs)
+
+    async def amdelete(self, keys):
+        aredis = self.async_redis()
+        if aredis is None:
+            await self.offload(self.mdelete, keys)
+        elif keys:
+            await aredis.delete(*keys)
+
     def keys(self):
         return list(map(lambda b: b.decode(), self.redis.keys(pattern='*')))
 
@@ -1,3 +1,5 @@
+import asyncio
+
 class Storage(object):
     """
     Common protocol for the Storage provider which provides actual data management
@@ -5,6 +7,11 @@ class Storage(object):
 
     Storage is not indexed, and thus write to a key with a value completely replaces
         any previous value if any is present.
+
+    Coroutine versions of the data access methods (`aget`, `aview`, `amget`, `aset`,
+        `amset`, `amdelete`, `acompact`, `aflush`, and `aclear`) are used by the broker running in the event loop.
+        They default to the plain methods, which suits in-memory storages. Storages
+        doing blocking I/O should override them not to block the event loop.
     """
     def __init__(self):
         pass
@@ -35,6 +42,14 @@ class Storage(object):
         """
         return None
 
+    def view(self, key):
+        """
+        Returns the value corresponding to the `key` as a buffer which may be
+            a `memoryview` over the storage media (e.g. a memory-mapped file).
+            Defaults to `get`.
+        """
+        return self.get(key)
+
     def mget(self, keys):
         """
         Gathers values corresponding to the `keys`.
@@ -60,6 +75,19 @@ class Storage(object):
         """
         pass
 
+    def compact(self):
+        """
+        Reclaims space occupied by deleted data if the storage needs to.
+        """
+        pass
+
+    def mdelete(self, keys):
+        """
+        Removes the `keys` in bulk mode.
+        """
+        for key in keys:
+            self.delete(key)
+
     def keys(self):
         """
         Returns list of data names maintained in the storage.
@@ -84,3 +112,45 @@ class Storage(object):
         """
         for key in self.keys():
             self.delete(key)
+
+    # Coroutine versions of data access methods
+
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aview(self, key):
+        return self.view(key)
+
+    async def amget(self, keys):
+        return self.mget(keys)
+
+    async def aset(self, key, value):
+        self.set(key, value)
+
+    async def amset(self, kvs):
+        self.mset(kvs)
+
+    async def amdelete(self, keys):
+        self.mdelete(keys)
+
+    async def acompact(self):
+        self.compact()
+
+    async def aflush(self):
+        self.flush()
+
+    async def aclear(self):
+        self.clear()
+
+    async def write_back(self):
+        """
+        Background task writing deferred data out to the actual storage if the
+            storage needs one.
+        """
+        pass
+
+    async def offload(self, func, *args):
+        """
+        Runs a blocking `func` with `args` in the thread pool of the event loop.
+        """
+        return await asyncio.get_event_loop().run_in_executor(None, func, *args)
@@ -71,6 +71,22 @@ class Store(object):
         :param seq: position of the cell for the the given `name`.
         :return: fetched value of the given position `name`[`seq`].
         """
+        key = self.key(name, seq)
+        return self.storage.get(key) if key is not None else None
+
+    def view(self, name, seq=0):
+        """
+        Same as `get`, but the data may be returned as a `memoryview` over the storage
+            media without being copied.
+        """
+        key = self.key(name, seq)
+        return self.storage.view(key) if key is not None else None
+
+    def key(self, name, seq):
+        """
+        Returns the storage key for index `seq` of the cell for the given `name`,
+            or None if the index is out of the range of the cell.
+        """
         end = self.end(name)
         if end == 0:
             return None
@@ -79,7 +95,7 @@ class Store(object):
             return None
         md = self.metadata[name]
         if md.fst <= idx:
-            return self.storage.get(_name(name, idx))
+            return _name(name, idx)
         sseq = str(seq)
         if seq != idx:
             sseq += "("+ str(idx) + ")"
@@ -111,6 +127,98 @@ class Store(object):
         self.storage.set(_name(name, seq), value)
         return seq
 
+    def set_many(self, name, seq_range, values):
+        """
+        Writes `values` to the positions `seq_range` of the cell for the given `name`
+            in a single bulk write to the storage.
+
+        :param name: name of the cell to which published data (`values`) will be stored.
+        :param seq_range: position numbers of the cell (e.g. a range).
+        :param values: data values to be stored.
+        :return: list of indices of the positions where the data values are stored.
+        """
+        seqs, kvs = self.items(name, seq_range, values)
+        if seqs:
+            self.advance(name, seqs[-1])
+            # Actually write the data to the storage
+            self.storage.mset(kvs)
+        return seqs
+
+    def items(self, name, seq_range, values):
+        """
+        Makes storage keys and values for the valid positions of `seq_range`.
+
+        :return: list of valid positions, and dict of storage keys to values.
+        """
+        seqs, kvs = [], {}
+        for seq, value in zip(seq_range, values):
+            seq = int(seq)
+            if seq <= 0:
+                self.logger.warning(f"Bizarre seq# {seq} for {name}")
+                continue
+            seqs.append(seq)
+            kvs[_name(name, seq)] = value
+        return seqs, kvs
+
+    def advance(self, name, seq):
+        """
+        Sets the last position of the cell for the given `name` to `seq`.
+        """
+        # Newly seen name
+        if name not in self.metadata:
+            self.metadata[name] = Metadata(name, fst=1, lst=1)
+        self.metadata[name].lst = seq
+
+    def get_range(self, name, fst, lst):
+        """
+        Retrieves data stored at indices `fst` to `lst` of the cell for the given name
+            `name` in a single bulk read from the storage.
+
+        :return: list of fetched values. None for positions out of the cell.
+        """
+        keys = [self.key(name, seq) for seq in range(int(fst), int(lst) + 1)]
+        valid = [key for key in keys if key is not None]
+        values = iter(self.storage.mget(valid) if valid else [])
+        return [next(values) if key is not None else None for key in keys]
+
+    # Coroutine versions of data access methods which don't block the event loop
+
+    async def aget(self, name, seq=0):
+        key = self.key(name, seq)
+        return await self.storage.aget(key) if key is not None else None
+
+    async def aview(self, name, seq=0):
+        key = self.key(name, seq)
+        return await self.storage.aview(key) if key is not None else None
+
+    async def aset_many(self, name, seq_range, values):
+        """
+        Coroutine version of `set_many`.
+        The cell grows after the values were written, so that readers never see
+            positions whose values are still being written.
+        """
+        seqs, kvs = self.items(name, seq_range, values)
+        if seqs:
+            await self.storage.amset(kvs)
+            self.advance(name, seqs[-1])
+        return seqs
+
+    async def aget_range(self, name, fst, lst):
+        keys = [self.key(name, seq) for seq in range(int(fst), int(lst) + 1)]
+        valid = [key for key in keys if key is not None]
+        values = iter(await self.storage.amget(valid) if valid else [])
+        return [next(values) if key is not None else None for key in keys]
+
+    async def adelete(self, name):
+        """
+        Coroutine version of `delete`.
+        """
+        if name in self.metadata:
+            end = self.metadata[name].lst
+            del self.metadata[name]
+            await self.storage.amdelete([_name(name, idx) for idx in range(end + 1)])
+            await self.storage.acompact()
+
     def delete(self, name):
         """
         Removes the cell for `name` and invalidates all further read/write requests to it.
@@ -119,14 +227,14 @@ class Store(object):
         """
         if name in self.metadata:
             end = self.metadata[name].lst
-            for idx in range(end + 1):
-                self.storage.delete(_name(name, idx))
+            self.storage.mdelete([_name(name, idx) for idx in range(end + 1)])
             del self.metadata[name]
+            self.storage.compact()
 
     def delete_range(self, name, fst, lst):
         if name in self.metadata:
-            for idx in range(fst, lst + 1):
-                self.storage.delete(_name(name, idx))
+            self.storage.mdelete([_name(name, idx) for idx in range(fst, lst + 1)])
+            self.storage.compact()
             self.logger.debug(f"Deleted {name}'s orphaned data range {fst}-{lst}")
 
     def names(self):
@@ -148,12 +256,25 @@ class Store(object):
         self.storage.clear()
         self.metadata.clear()
 
+    async def aclear(self):
+        """
+        Coroutine version of `clear`.
+        """
+        await self.storage.aclear()
+        self.metadata.clear()
+
     def pickle(self):
         """
         Saves cells and indices information of the store to a byte array.
         """
         return pickle.dumps(self.metadata)
 
+    def records(self):
+        """
+        Copies cells information of the store into a list of (name, fst, lst).
+        """
+        return [(md.name, md.fst, md.lst) for md in self.metadata.values()]
+
     def restore(self, pickled):
         """
         Reinitializes the store with the cells and indices information saved
@@ -163,11 +284,24 @@ class Store(object):
         self.metadata = pickle.loads(pickled)
         self.storage.restore()
 
+    def load(self, records):
+        """
+        Reinitializes the store with the cells information `records` made earlier.
+        """
+        self.metadata = {name: Metadata(name, fst, lst) for name, fst, lst in records}
+        self.storage.restore()
+
+    async def write_back(self):
+        """
+        Runs the write-back task of the storage if it has one.
+        """
+        await self.storage.write_back()
+
     async def flush(self, periodic=True):
         if periodic:
             await asyncio.sleep(3600)       # 1 hour
         try:
-            self.storage.flush()
+            await self.storage.aflush()
         except:
             pass
         if periodic:
@@ -2,4 +2,5 @@ from .Store import Store
 from .TableStorage import TableStorage
 from .RedisStorage import RedisStorage
 from .FileStorage import FileStorage
+from .LogStorage import LogStorage
 from .CacheWrapper import CacheWrapper
@@ -1,3 +1,4 @@
 from .config import load_config, config_value, config_default
 from .funcs import arbit, param_value, build_path
 from .fetcher import sequential_fetcher as segment_fetcher
+from .fetcher import pipelined_fetcher
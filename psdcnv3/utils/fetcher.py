@@ -1,3 +1,4 @@
+import asyncio
 from ndn.types import InterestNack, InterestTimeout
 from ndn.utils import gen_nonce
 
@@ -34,3 +35,77 @@ async def sequential_fetcher(app, name, start_block_id, end_block_id, **kwargs):
                 if trial_times > 3:
                     return  # No hope. Quit
     return
+
+async def pipelined_fetcher(app, name, start_block_id, end_block_id,
+        window=8, max_window=64, retries=3, **kwargs):
+    """
+    A generator to fetch data packets between
+    "`name`/`start_block_id`" and "`name`/`end_block_id`" keeping up to
+    `window` Interests in flight.
+
+    The window is adjusted in AIMD style. It grows by 1/window per received block,
+    and it is halved at most once per round trip on timeouts and Nacks.
+    Each block is retried up to `retries` times. If a block couldn't be fetched,
+    only the blocks preceding it are yielded.
+
+    :param app: NDNApp.
+    :param name: NonStrictName. Name prefix of Data.
+    :param start_block_id: int. The start segment number.
+    :param end_block_id: int. The end segment number.
+    :param window: int. The initial number of Interests in flight.
+    :param max_window: int. The maximum number of Interests in flight.
+    :param retries: int. The maximum number of trials per block id.
+    :return: Yield ``(FormalName, MetaInfo, Content, RawPacket)`` tuples in order.
+    """
+    if name is None:
+        return
+    cwnd = float(max(1, min(window, max_window)))
+    pending = {}            # In-flight task => (block id, trial times, send order)
+    fetched = {}            # Block id => fetched data
+    sent = 0                # Number of Interests sent so far
+    recovery = 0            # Window is not decreased for Interests sent before this
+    next_block_id = start_block_id
+    next_yield_id = start_block_id
+    stop_block_id = end_block_id + 1
+
+    def request(seq, trial_times):
+        nonlocal sent
+        int_name = name + "/" + str(seq)
+        task = asyncio.ensure_future(app.express_interest(
+            int_name,
+            need_raw_packet=True,
+            must_be_fresh=True,
+            can_be_prefix=False,
+            nonce=gen_nonce(),
+            **kwargs))
+        pending[task] = (seq, trial_times, sent)
+        sent += 1
+
+    try:
+        while next_yield_id < stop_block_id:
+            # Fill up the window
+            while next_block_id < stop_block_id and len(pending) < int(cwnd):
+                request(next_block_id, 1)
+                next_block_id += 1
+            if not pending:
+                break
+            done, _ = await asyncio.wait(list(pending), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                seq, trial_times, order = pending.pop(task)
+                try:
+                    fetched[seq] = task.result()
+                    cwnd = min(float(max_window), cwnd + 1.0 / cwnd)
+                except (InterestNack, InterestTimeout):
+                    if order >= recovery:
+                        cwnd = max(1.0, cwnd / 2)
+                        recovery = sent
+                    if trial_times < retries:
+                        request(seq, trial_times + 1)
+                    else:
+                        stop_block_id = min(stop_block_id, seq)  # No hope for the rest
+            while next_yield_id in fetched and next_yield_id < stop_block_id:
+                yield fetched.pop(next_yield_id)
+                next_yield_id += 1
+    finally:
+        for task in pending:
+            task.cancel()
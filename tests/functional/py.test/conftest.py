@@ -0,0 +1,78 @@
+"""
+Fixtures shared by the broker tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import asyncio, logging
+import pytest
+from ndn.encoding import Name
+from psdcnv3.broker.psodb import Pso
+from psdcnv3.names import TrieNames
+from psdcnv3.psk.codec import decode
+from psdcnv3.store import Store, TableStorage
+
+class FakeApp(object):
+    """
+    Stands in for the NDN app of a broker.
+
+    Contents put are kept in `contents`. Routes are registered after `delay` seconds,
+        keeping the number of registrations made at a time in `most`, and those of
+        `failing` routes fail. Interests expressed are kept in `sent`, and answered
+        with the content `respond(name, app_param)` returns.
+    """
+    def __init__(self, delay=0, failing=(), respond=None):
+        self.delay, self.failing, self.respond = delay, set(failing), respond
+        self.contents, self.routes, self.sent = [], [], []
+        self.pending = self.most = 0
+
+    def reply(self):
+        """
+        Returns the last content put, decoded.
+        """
+        return decode(self.contents[-1])
+
+    def put_data(self, name, content=None, **kwargs):
+        self.contents.append(content)
+
+    async def register(self, name, func):
+        self.pending += 1
+        self.most = max(self.most, self.pending)
+        await asyncio.sleep(self.delay)
+        self.pending -= 1
+        if name in self.failing:
+            raise ValueError(f"{name} refused")
+        self.routes.append(name)
+
+    async def unregister(self, name):
+        self.routes.remove(name)
+
+    async def express_interest(self, name, interest_param=None, app_param=None, **kwargs):
+        name = Name.to_str(name)
+        self.sent.append((name, interest_param.forwarding_hint, app_param))
+        return None, None, self.respond(name, app_param)
+
+@pytest.fixture
+def app():
+    return FakeApp()
+
+@pytest.fixture
+def make_broker():
+    """
+    Makes brokers /rn-1 on fake apps, keeping their names and data in memory.
+    """
+    def make(app=None):
+        # Imported here not to load configurations before test_config
+        from psdcnv3.broker.broker import Broker
+        broker = Broker("/rn-1", app or FakeApp(), TrieNames(), Store(TableStorage()), Pso())
+        broker.local = TrieNames()
+        broker.logger = logging.getLogger("test")
+        broker.validate = False
+        broker.store.set_context(broker)
+        return broker
+    return make
+
+@pytest.fixture
+def broker(make_broker, app):
+    return make_broker(app)
@@ -0,0 +1,39 @@
+"""
+PSK codec tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import pytest
+from psdcnv3.psk.pskinfo import PubAdvInfo, SubInfo, RNInfo, PSKParameters, StorageType
+from psdcnv3.psk.codec import encode, decode, codec_of, JSON, TLV, MARKER
+
+def parameters():
+    pubadvinfo = PubAdvInfo(dataname="/hello/world", storagetype=StorageType.BROKER)
+    pubadvinfo['data_sseq'], pubadvinfo['data_eseq'] = 1, 100000
+    subinfo = SubInfo(topicscope="global", servicetoken="1234DFAENDNDJEDMM343DD")
+    subinfo['page_size'], subinfo['coords'] = 100, [-1.5, 2.25, None, True]
+    return PSKParameters(pubadvinfo=pubadvinfo, subinfo=subinfo,
+                         rninfo=RNInfo(brokername="/rn-1"), fwded_from="/rn-2")
+
+def test_round_trip():
+    params = parameters()
+    expected = decode(encode(params, JSON))
+    for codec in (JSON, TLV):
+        encoded = encode(params, codec)
+        assert codec_of(encoded) == codec
+        assert decode(encoded) == expected
+    assert decode(encode(params, TLV))['subinfo']['coords'] == [-1.5, 2.25, None, True]
+
+def test_tlv_is_compact():
+    params = parameters()
+    assert len(encode(params, TLV)) < len(encode(params, JSON)) // 2
+
+def test_decode_edges():
+    assert decode(b"") is None and decode(None) is None
+    assert codec_of(b"") == JSON
+    assert decode(bytearray(b'{"status": "OK"}')) == {'status': "OK"}
+    assert decode(encode({'value': "x" * 70000}, TLV))['value'] == "x" * 70000
+    with pytest.raises(ValueError):
+        decode(bytes((MARKER, 99, 0)))
@@ -0,0 +1,48 @@
+"""
+Command context tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+from ndn.encoding import Name, Component
+from psdcnv3.broker.context import CommandParser
+from psdcnv3.psk.pskcmd import PSKCmd
+
+def make_parser(keeper):
+    return CommandParser((keeper.svc_name, keeper.node_name), PSKCmd.cmd_list,
+        sequenced=("PD",), numbered=("Status", "Profile"))
+
+def test_parse():
+    keeper = PSKCmd(None, node_name="/rn-1")
+    parser = make_parser(keeper)
+    svc = keeper.svc_name
+    for name in (svc + "/PA/hello/world", svc + "/PD/hello/world/7",
+                 svc + "/ST/hello/%23", svc + "/SL/%ED%95%9C/a%20b/+",
+                 "/rn-1/Status", "/rn-1/Status/3/2", "/rn-1/Profile/stop",
+                 "/rn-1/Network/discover"):
+        int_name = Name.from_str(name)
+        int_name.append(Component.from_bytes(b"\x00" * 32, Component.TYPE_PARAMETERS_SHA256))
+        ctx = parser.parse(int_name, None, b"")
+        expected = keeper.parse_command(int_name)
+        seq = expected['seq']
+        assert (ctx.prefix, ctx.command, ctx.dataname) == \
+            (expected['prefix'], expected['command'], expected['dataname'])
+        assert ctx.seq == (int(seq) if seq is not None else None)
+        assert ctx.int_name is int_name and ctx.received > 0
+
+def test_not_commands():
+    keeper = PSKCmd(None, node_name="/rn-1")
+    parser = make_parser(keeper)
+    assert parser.parse(Name.from_str(keeper.svc_name + "/XX/hello"), None, None) is None
+    assert parser.parse(Name.from_str("/other/PA/hello"), None, None) is None
+    assert parser.parse(Name.from_str(keeper.svc_name), None, None) is None
+
+def test_unknown_command(broker):
+    """
+    PubSub requests which are not commands are answered with an ERR.
+    """
+    int_name = Name.from_str(broker.keeper.svc_name + "/XX/hello")
+    broker.on_pubsub_request(int_name, None, b"", b"packet")
+    reply = broker.app.reply()
+    assert reply['status'] == "ERR" and "/XX/hello" in reply['reason']
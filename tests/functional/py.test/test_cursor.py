@@ -0,0 +1,51 @@
+"""
+Paginated subscription tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import asyncio
+from psdcnv3.broker.context import CommandContext
+from psdcnv3.broker.cursor import Cursors
+
+def subtopic(broker, topicname, **subinfo):
+    from psdcnv3.broker.handler import handle_ST
+    ctx = CommandContext("/ST" + topicname, None, {'subinfo': subinfo},
+        command="ST", dataname=topicname, codec='json')
+    asyncio.run(handle_ST(broker, ctx))
+    return broker.app.reply()
+
+def test_cursors():
+    cursors = Cursors(ttl=30, capacity=2)
+    items, token = cursors.first(iter(range(5)), 2)
+    assert items == [0, 1] and token in cursors
+    assert cursors.next(token, 2) == ([2, 3], token)
+    assert cursors.next(token, 2) == ([4], None) and token not in cursors
+    assert cursors.first(iter(range(2)), 2) == ([0, 1], None) and len(cursors) == 0
+    tokens = [cursors.first(iter(range(5)), 1)[1] for _ in range(3)]
+    assert tokens[0] not in cursors and len(cursors) == 2
+    expired = Cursors(ttl=-1)
+    _, token = expired.first(iter(range(5)), 1)
+    try:
+        expired.next(token, 1)
+        assert False
+    except KeyError:
+        pass
+
+def test_paginated_subtopic(broker):
+    """
+    Pages of a paginated ST are the legacy reply split, without a count of the matches.
+    """
+    for i in range(25):
+        broker.names.advertise("/rn-1", f"/hello/{i}")
+    legacy = subtopic(broker, "/hello/#")['value']
+    reply = subtopic(broker, "/hello/#", page_size=10)
+    assert 'count' not in reply['value'] and len(reply['value']['matches']) == 10
+    matches = reply['value']['matches']
+    while reply['value']['cursor']:
+        reply = subtopic(broker, "/hello/#", page_size=10, cursor=reply['value']['cursor'])
+        matches += reply['value']['matches']
+    assert matches == legacy and len(broker.cursors) == 0
+    reply = subtopic(broker, "/hello/#", page_size=10, cursor="unknown")
+    assert reply['status'] == "ERR" and reply['reason'] == "Cursor expired"
@@ -0,0 +1,55 @@
+"""
+Fetcher tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import asyncio
+from ndn.types import InterestTimeout
+from psdcnv3.utils import pipelined_fetcher
+
+class FakeApp(object):
+    """
+    Answers Interests for name/<seq> after a short delay,
+        and times out the first trials of the block ids in `flaky`.
+    """
+    def __init__(self, flaky=(), dead=()):
+        self.flaky, self.dead = set(flaky), set(dead)
+        self.in_flight = self.max_in_flight = 0
+
+    async def express_interest(self, name, **kwargs):
+        seq = int(name.split("/")[-1])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01 if seq % 2 else 0.02)
+            if seq in self.dead or seq in self.flaky:
+                self.flaky.discard(seq)
+                raise InterestTimeout()
+            return name, None, str(seq).encode(), b'packet'
+        finally:
+            self.in_flight -= 1
+
+def fetch(app, fst, lst, **kwargs):
+    async def collect():
+        return [content async for _, _, content, _ in
+                pipelined_fetcher(app, "/hello", fst, lst, **kwargs)]
+    return asyncio.run(collect())
+
+def test_in_order():
+    app = FakeApp()
+    fetched = fetch(app, 1, 50, window=4, max_window=8)
+    assert fetched == [str(seq).encode() for seq in range(1, 51)]
+    assert 1 < app.max_in_flight <= 8
+
+def test_retry():
+    fetched = fetch(FakeApp(flaky=[3, 7, 8]), 1, 20, window=4)
+    assert fetched == [str(seq).encode() for seq in range(1, 21)]
+
+def test_lost():
+    """
+    Only the blocks preceding the lost block are delivered.
+    """
+    fetched = fetch(FakeApp(dead=[6]), 1, 20, window=4)
+    assert fetched == [str(seq).encode() for seq in range(1, 6)]
@@ -0,0 +1,87 @@
+"""
+Single-flight subscription tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import asyncio
+import pytest
+from psdcnv3.broker.flights import Flights
+
+def test_coalesce():
+    flights = Flights(ttl=30)
+    walks = []
+    async def walk():
+        walks.append(1)
+        await asyncio.sleep(0.01)
+        return ["/hello/world"]
+    async def herd():
+        key = ('names', "/hello/#", None)
+        results = await asyncio.gather(*[flights.run(key, walk) for _ in range(100)])
+        results.append(await flights.run(key, walk))
+        return results
+    results = asyncio.run(herd())
+    assert len(walks) == 1 and all(result == ["/hello/world"] for result in results)
+    assert (flights.misses, flights.shared, flights.hits) == (1, 99, 1)
+
+def test_invalidate():
+    flights = Flights(ttl=30)
+    async def walk():
+        return []
+    async def run():
+        for topic in ("/hello/#", "/hello/+/x", "/other/#"):
+            await flights.run(('names', topic, None), walk)
+        await flights.run(('local', "/hello/#", None), walk)
+        flights.invalidate('names', "/hello/world/x")
+    asyncio.run(run())
+    assert set(flights._results) == {('names', "/other/#", None), ('local', "/hello/#", None)}
+
+def test_invalidate_wildcards():
+    """
+    Results of topics with `#` in the middle are invalidated by the names they match.
+    """
+    flights = Flights(ttl=30)
+    async def walk():
+        return ["/a/x/b"]
+    async def run():
+        await flights.run(('names', "/a/#/b", None), walk)
+        await flights.run(('names', "/#/+/c", None), walk)
+        flights.invalidate('names', "/a/y/b")
+    asyncio.run(run())
+    assert set(flights._results) == {('names', "/#/+/c", None)}
+
+def test_stale_and_errors():
+    flights = Flights(ttl=30)
+    key = ('names', "/hello/#", None)
+    async def walk():
+        await asyncio.sleep(0.01)
+        return []
+    async def advertised_meanwhile():
+        task = asyncio.ensure_future(flights.run(key, walk))
+        await asyncio.sleep(0)
+        flights.invalidate('names', "/hello")
+        await task
+    asyncio.run(advertised_meanwhile())
+    assert len(flights) == 0
+    async def fail():
+        raise ValueError("walk")
+    with pytest.raises(ValueError):
+        asyncio.run(flights.run(key, fail))
+    assert len(flights) == 0 and not flights._flights
+
+def test_bounded():
+    flights = Flights(ttl=30, capacity=2)
+    async def walk():
+        return [("/hello/world", ["/rn-1"])]
+    async def run(*topics):
+        for topic in topics:
+            await flights.run(('names', topic, None), walk)
+    asyncio.run(run("/a/#", "/b/#", "/a/#", "/c/#"))
+    assert set(key[1] for key in flights._results) == {"/a/#", "/c/#"}
+    assert "/b/#" not in flights._index['names']
+    flights.invalidate('names', "/a/x")
+    stats = flights.stats()
+    assert (stats['items'], stats['hits'], stats['evictions'], stats['invalidations']) == \
+        (1, 1, 1, 1)
+    assert 0 < stats['used'] and stats['hit_ratio'] == 0.25
@@ -0,0 +1,61 @@
+"""
+World journal tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import asyncio, os
+
+def mutate(broker, names):
+    from psdcnv3.broker.handler import advertise, record_metadata
+    for dataname in names:
+        advertise(broker, broker.names, "/rn-1", dataname)
+        broker.psodb.pubadv(dataname, {'dataname': dataname})
+        broker.journal.record('pubadv', dataname, {'dataname': dataname})
+        broker.store.set_many(dataname, range(1, 4), [b"a", b"b", b"c"])
+        record_metadata(broker, dataname)
+
+def test_replay(tmp_path, monkeypatch, make_broker):
+    """
+    A world is restored from the journal alone if no checkpoint was made.
+    """
+    monkeypatch.chdir(tmp_path)
+    broker = make_broker()
+    from psdcnv3.broker.handler import advertise, unadvertise
+    mutate(broker, ["/hello", "/world"])
+    advertise(broker, broker.local, "/rn-1", "/local")
+    unadvertise(broker, broker.names, "/world")
+    asyncio.run(broker.journal.commit())
+    restored = make_broker()
+    restored.restore_world()
+    assert list(restored.names.names()) == ["/hello"]
+    assert list(restored.local.names()) == ["/local"]
+    assert restored.store.end("/hello") == 3 and "/world" in restored.psodb
+    assert restored.journal.lsn == broker.journal.lsn
+
+def test_checkpoint(tmp_path, monkeypatch, make_broker):
+    """
+    A checkpoint removes the journal it covers, and the journal after it is replayed.
+    A torn record at the tail of the journal is ignored.
+    """
+    monkeypatch.chdir(tmp_path)
+    broker = make_broker()
+    mutate(broker, [f"/hello/{i}" for i in range(10)])
+    asyncio.run(broker.journal.checkpoint(broker.snapshot))
+    assert broker.journal.segments() == [] and broker.journal.churn() == 0
+    mutate(broker, ["/world"])
+    asyncio.run(broker.journal.commit())
+    with open(broker.journal.segments()[-1], "ab") as f:
+        f.write(b"\x00\x00\x01\x00torn")
+    restored = make_broker()
+    restored.restore_world()
+    from psdcnv3.broker.handler import advertise
+    assert restored.names.count() == 11 and restored.psodb.count() == 11
+    assert restored.store.end("/world") == 3
+    # Journal continues after the replayed records
+    advertise(restored, restored.names, "/rn-2", "/moved")
+    asyncio.run(restored.journal.checkpoint(restored.snapshot))
+    again = make_broker()
+    again.restore_world()
+    assert again.names.count() == 12 and again.names["/moved"].rn_names == ["/rn-2"]
@@ -0,0 +1,41 @@
+"""
+Logger tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import logging, logging.handlers, queue, threading
+from psdcnv3.broker.logger import DeferredQueueHandler
+
+class Traced(object):
+    """
+    Remembers the threads where it was formatted.
+    """
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.get_ident())
+        return "traced"
+
+def test_deferred_formatting():
+    """
+    Records are formatted by the listener thread, and not at all if the level is disabled.
+    """
+    records, written = queue.SimpleQueue(), []
+    class Collect(logging.Handler):
+        def emit(self, record):
+            written.append(self.format(record))
+    logger = logging.getLogger("test_deferred")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(DeferredQueueHandler(records))
+    listener = logging.handlers.QueueListener(records, Collect())
+    listener.start()
+    traced = Traced()
+    logger.debug("SD %s processed", traced)
+    logger.info("PD published to %s/%d", traced, 1)
+    listener.stop()
+    assert written == ["PD published to traced/1"]
+    assert traced.threads and threading.get_ident() not in traced.threads
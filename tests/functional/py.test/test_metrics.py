@@ -0,0 +1,74 @@
+"""
+Broker metrics tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import asyncio, json
+from bisect import bisect_left
+from psdcnv3.broker.metrics import Metrics, Histogram, LATENCY_BUCKETS
+from psdcnv3.broker.status import Reports
+
+def test_render():
+    metrics = Metrics()
+    metrics.describe('requests_total', "Requests")
+    metrics.inc('requests_total', (('command', 'PD'),))
+    metrics.inc('requests_total', (('command', 'PD'),), 2)
+    metrics.observe('request_seconds', 0.001, (('command', 'PD'),))
+    metrics.observe('request_seconds', 20.0, (('command', 'PD'),))
+    metrics.gauge('pending_interests', lambda: 7)
+    metrics.gauge('nothing', lambda: None)
+    lines = metrics.render().splitlines()
+    assert "# HELP psdcn_requests_total Requests" in lines
+    assert 'psdcn_requests_total{command="PD"} 3' in lines
+    below = LATENCY_BUCKETS[bisect_left(LATENCY_BUCKETS, 0.001) - 1]
+    above = LATENCY_BUCKETS[bisect_left(LATENCY_BUCKETS, 0.001)]
+    assert f'psdcn_request_seconds_bucket{{command="PD",le="{below}"}} 0' in lines
+    assert f'psdcn_request_seconds_bucket{{command="PD",le="{above}"}} 1' in lines
+    assert 'psdcn_request_seconds_bucket{command="PD",le="+Inf"} 2' in lines
+    assert 'psdcn_request_seconds_count{command="PD"} 2' in lines
+    assert "psdcn_pending_interests 7" in lines
+    assert not any("nothing" in line for line in lines)
+
+def test_histogram():
+    """
+    Quantiles of HDR-style buckets are within the relative error of the buckets.
+    """
+    histogram = Histogram()
+    for i in range(1, 1001):
+        histogram.observe(i / 10000)
+    for q in (0.5, 0.9, 0.99):
+        assert q / 10 <= histogram.quantile(q) <= q / 10 * 1.19
+    assert Histogram().quantile(0.5) is None
+    metrics = Metrics()
+    metrics.level('requests_in_flight', (('command', 'ST'),))
+    metrics.level('requests_in_flight', (('command', 'ST'),), -1)
+    metrics.observe('request_seconds', 0.01, (('command', 'ST'), ('path', 'local')))
+    assert metrics.levels['requests_in_flight'] == {(('command', 'ST'),): 0}
+    summary = metrics.summary('request_seconds')[(('command', 'ST'), ('path', 'local'))]
+    assert summary['count'] == 1 and 0.01 <= summary['p99'] <= 0.0119
+
+def test_status_server(broker):
+    """
+    Status server answers the report and the metrics on the event loop.
+    """
+    broker.storage_manager = "TableStorage"
+    broker.reports = Reports()
+    broker.names.advertise("/rn-1", "/hello")
+    async def get(port, path):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return head.split(b"\r\n")[0].decode(), body.decode()
+    async def run():
+        server = await asyncio.start_server(broker.on_status_request, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return [await get(port, path) for path in ("/", "/metrics", "/nowhere")]
+    (status, report), (_, metrics), (missing, _) = asyncio.run(run())
+    assert status.endswith("200 OK") and missing.endswith("404 Not Found")
+    assert json.loads(report)['status']['advertised']['names'] == ["/hello"]
+    assert "psdcn_pending_interests 0" in metrics.splitlines()
@@ -1,100 +1,227 @@
-"""
-Names-related tests
-"""
-
-import sys
-sys.path.append("../../..")
-
-from random import randint
-from datetime import datetime
-from psdcnv3.names import TrieNames, ProcNames, RegexpNames
-
-def test_instances():
-    """
-    Tests if Names implementations can make instances correctly.
-    """
-    names_0 = TrieNames()
-    names_1 = RegexpNames()
-    names_2 = ProcNames()
-    assert True
-
-names = [
-    "/hello/a/b/c",
-    "/hello",
-    "/hello/a/c",
-    "/hello/1/v/2",
-    "/hello/x/v/z",
-    "/world/cup",
-    "/natasha/mangdor",
-    "/worldcup/2018",
-    "/hello/a/b",
-]
-
-def populate(handler):
-    for dataname in names:
-       handler.advertise("/rn-1", dataname)
-
-def advertise_fixture(handler):
-    """
-    Advertise list of names using the given handler, and checks if
-        the first, middle, and the last advertised name is in the advertised names.
-    """
-    populate(handler)
-    keys = [node.dataname for node in handler.advertisements()]
-    print(keys)
-    return names[0] in keys and names[len(names)//2] in keys and names[-1] in keys
-
-def test_advertise():
-    assert advertise_fixture(TrieNames())
-    assert advertise_fixture(RegexpNames())
-    assert advertise_fixture(ProcNames())
-
-def unadvertise_fixture(handler):
-    """
-    Advertise list of names using the given handler, unadvertise a name randomly,
-        and checks if the unadvertised name is not in the advertised names any more.
-    """
-    populate(handler)
-    random = names[randint(0, len(names)-1)]
-    handler.unadvertise(random)
-    return random not in [node.dataname for node in handler.advertisements()]
-
-def test_unadvertise():
-    assert unadvertise_fixture(TrieNames())
-    assert unadvertise_fixture(RegexpNames())
-    assert unadvertise_fixture(ProcNames())
-
-def match_fixture(handler, topic, count):
-    """
-    Advertises list of names using the given handler, matches against a given topic,
-    and compares the number of matches with the expected count.
-    """
-    populate(handler)
-    return handler.count(topic) == count
-
-def test_match():
-    for handler in [TrieNames(), ProcNames(), RegexpNames()]:
-        assert match_fixture(handler, "/hello/a/+/+", 1)
-        assert match_fixture(handler, "/hello/a/#", 3)
-        assert match_fixture(handler, "/hello/+/#", 5)
-        assert match_fixture(handler, "/hello/#", 6)
-        assert match_fixture(handler, "/nowhere/fast/+", 0)
-
-def dump_restore_fixture(handler1, handler2):
-    """
-    Dumps content of a names handler to a byte array, restore it to another handler
-    and check if old advertisements are still valid in the new handler.
-    """
-    populate(handler1)
-    handler2.restore(handler1.pickle())
-    return handler2.count("/hello/a/+/+") == 1 and \
-           handler2.count("/hello/a/#") == 3 and \
-           handler2.count("/hello/+/#") == 5 and \
-           handler2.count("/hello/#") == 6 and \
-           handler2.count("/nowhere/fast/+") == 0
-
-def test_dump_restore():
-    for klass1 in [TrieNames, ProcNames, RegexpNames]:
-        for klass2 in [TrieNames, ProcNames, RegexpNames]:
-            assert dump_restore_fixture(klass1(), klass2())
-
+"""
+Names-related tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+from random import randint
+from datetime import datetime
+from psdcnv3.names import TrieNames, ProcNames, RegexpNames, RadixNames, Subscriptions
+
+def test_instances():
+    """
+    Tests if Names implementations can make instances correctly.
+    """
+    names_0 = TrieNames()
+    names_1 = RegexpNames()
+    names_2 = ProcNames()
+    names_3 = RadixNames()
+    assert True
+
+names = [
+    "/hello/a/b/c",
+    "/hello",
+    "/hello/a/c",
+    "/hello/1/v/2",
+    "/hello/x/v/z",
+    "/world/cup",
+    "/natasha/mangdor",
+    "/worldcup/2018",
+    "/hello/a/b",
+]
+
+def populate(handler):
+    for dataname in names:
+       handler.advertise("/rn-1", dataname)
+
+def advertise_fixture(handler):
+    """
+    Advertise list of names using the given handler, and checks if
+        the first, middle, and the last advertised name is in the advertised names.
+    """
+    populate(handler)
+    keys = [node.dataname for node in handler.advertisements()]
+    print(keys)
+    return names[0] in keys and names[len(names)//2] in keys and names[-1] in keys
+
+def test_advertise():
+    assert advertise_fixture(TrieNames())
+    assert advertise_fixture(RegexpNames())
+    assert advertise_fixture(ProcNames())
+    assert advertise_fixture(RadixNames())
+
+def unadvertise_fixture(handler):
+    """
+    Advertise list of names using the given handler, unadvertise a name randomly,
+        and checks if the unadvertised name is not in the advertised names any more.
+    """
+    populate(handler)
+    random = names[randint(0, len(names)-1)]
+    handler.unadvertise(random)
+    return random not in [node.dataname for node in handler.advertisements()]
+
+def test_unadvertise():
+    assert unadvertise_fixture(TrieNames())
+    assert unadvertise_fixture(RegexpNames())
+    assert unadvertise_fixture(ProcNames())
+    assert unadvertise_fixture(RadixNames())
+
+def match_fixture(handler, topic, count):
+    """
+    Advertises list of names using the given handler, matches against a given topic,
+    and compares the number of matches with the expected count.
+    """
+    populate(handler)
+    return handler.count(topic) == count
+
+def test_match():
+    for handler in [TrieNames(), ProcNames(), RegexpNames(), RadixNames()]:
+        assert match_fixture(handler, "/hello/a/+/+", 1)
+        assert match_fixture(handler, "/hello/a/#", 3)
+        assert match_fixture(handler, "/hello/+/#", 5)
+        assert match_fixture(handler, "/hello/#", 6)
+        assert match_fixture(handler, "/nowhere/fast/+", 0)
+
+def dump_restore_fixture(handler1, handler2):
+    """
+    Dumps content of a names handler to a byte array, restore it to another handler
+    and check if old advertisements are still valid in the new handler.
+    """
+    populate(handler1)
+    handler2.restore(handler1.pickle())
+    return handler2.count("/hello/a/+/+") == 1 and \
+           handler2.count("/hello/a/#") == 3 and \
+           handler2.count("/hello/+/#") == 5 and \
+           handler2.count("/hello/#") == 6 and \
+           handler2.count("/nowhere/fast/+") == 0
+
+def test_dump_restore():
+    for klass1 in [TrieNames, ProcNames, RegexpNames, RadixNames]:
+        for klass2 in [TrieNames, ProcNames, RegexpNames, RadixNames]:
+            assert dump_restore_fixture(klass1(), klass2())
+
+
+def test_filter():
+    """
+    Compiled filters are memoized, and agree with the regexp matcher.
+    """
+    from psdcnv3.names.Filter import compile, compile_regexp
+    assert compile("/hello/+/#") is compile("/hello/+/#")
+    assert compile("/hello/+/#").prefix == "/hello/"
+    assert compile("/hello/#").prefix == "/hello" and compile("/+/a").prefix == "/"
+    assert compile("#").match("/hello/a") and not compile("/hello/+").match("/hello")
+    topics = ["/hello/a/+/+", "/hello/a/#", "/hello/+/#", "/hello/#", "/hello", "/+", "/#"]
+    for topic in topics:
+        for dataname in names + ["/helloworld", "/hello/a/b/c/d"]:
+            assert compile(topic).match(dataname) == compile_regexp(topic).match(dataname), \
+                (topic, dataname)
+        assert list(compile(topic).select(names)) == \
+            [dataname for dataname in names if compile(topic).match(dataname)]
+
+def wildcard_match(parts, components):
+    """
+    Matches name `components` to topic `parts` where every `#` matches zero or more
+        components, by brute force.
+    """
+    if not parts:
+        return not components
+    if parts[0] == '#':
+        return any(wildcard_match(parts[1:], components[i:])
+            for i in range(len(components) + 1))
+    return bool(components) and parts[0] in ('+', components[0]) and \
+        wildcard_match(parts[1:], components[1:])
+
+def test_trie_multiple_wildcards():
+    """
+    Topics with more than one `#` match each name once.
+    """
+    handler = TrieNames()
+    populate(handler)
+    for topic in ["/#/#", "/#/#/#", "/hello/#/#", "/#/+/#", "/#/a/#", "/#/b/#/b"]:
+        found = [node.dataname for node in handler.matches(topic)]
+        assert len(found) == len(set(found)), topic
+        assert sorted(found) == sorted(dataname for dataname in names
+            if wildcard_match(topic.split('/'), dataname.split('/'))), topic
+
+def test_middle_wildcards():
+    """
+    Filters and the subscription index match `#` in the middle of topics as the trie does.
+    """
+    from psdcnv3.names.Filter import compile
+    handler = TrieNames()
+    populate(handler)
+    topics = ["/hello/#/b", "/#/b", "/#/a/#", "/#/+/x/#", "/hello/#/#/b", "/#/hello"]
+    index = Subscriptions()
+    for topic in topics:
+        index.subscribe(topic)
+    for topic in topics:
+        expected = sorted(node.dataname for node in handler.matches(topic))
+        assert sorted(compile(topic).select(names)) == expected, topic
+    for dataname in names:
+        found = list(index.matches(dataname))
+        assert len(found) == len(set(found))
+        assert sorted(found) == sorted(topic for topic in topics
+            if wildcard_match(topic.split('/'), dataname.split('/'))), dataname
+
+def test_radix():
+    """
+    Radix tree splits edges on advertising branching names, and merges them back
+        on unadvertising, keeping the matches of the other names.
+    """
+    handler = RadixNames()
+    handler.advertise("/rn-1", "/etri/bldg7/room318/1")
+    assert handler._root.children[''].tail == ("etri", "bldg7", "room318", "1")
+    handler.advertise("/rn-1", "/etri/bldg7/room318/2")
+    handler.advertise("/rn-1", "/etri/bldg7")
+    handler.advertise("/rn-2", "/etri/bldg7", pub_moved=True)
+    assert handler["/etri/bldg7"].rn_names == ["/rn-1", "/rn-2"]
+    assert handler.count("/etri/bldg7/#") == 3 and handler.count("/etri/+/+/+") == 2
+    assert handler.count("/etri/#") == 3 and handler.count("/etri/bldg7/room318") == 0
+    handler.unadvertise("/etri/bldg7")
+    handler.unadvertise("/etri/bldg7/room318/2")
+    assert handler._root.children[''].tail == ("etri", "bldg7", "room318", "1")
+    assert list(handler.names()) == ["/etri/bldg7/room318/1"] and handler.count() == 1
+
+def test_radix_matches_trie():
+    """
+    Radix tree matches topics as the trie does, with `#` anywhere in the topics.
+    """
+    import itertools, random
+    rng = random.Random(7)
+    datanames = {"/" + "/".join(rng.choice("abc") for _ in range(rng.randint(1, 5)))
+        for _ in range(200)}
+    trie, radix = TrieNames(), RadixNames()
+    for dataname in datanames:
+        trie.advertise("/rn-1", dataname)
+        radix.advertise("/rn-1", dataname)
+    for length in range(1, 5):
+        for parts in itertools.product(["a", "b", "+", "#"], repeat=length):
+            topic = "/" + "/".join(parts)
+            found = [node.dataname for node in radix.matches(topic)]
+            assert len(found) == len(set(found)), topic
+            assert sorted(found) == sorted(node.dataname for node in trie.matches(topic)), topic
+
+def test_subscriptions():
+    """
+    Subscription index returns the filters matching a data name as the filters do,
+        and forgets the least recently subscribed filters over its capacity.
+    """
+    from psdcnv3.names.Filter import compile
+    topics = ["/hello/a/+/+", "/hello/a/#", "/hello/+/#", "/hello/#", "/hello", "/+", "/#",
+        "/+/+/v/+", "/world/cup"]
+    index = Subscriptions()
+    for topic in topics:
+        index.subscribe(topic)
+    for dataname in names + ["/helloworld", "/hello/a/b/c/d"]:
+        assert sorted(index.matches(dataname)) == \
+            sorted(topic for topic in topics if compile(topic).match(dataname)), dataname
+    index.unsubscribe("/hello/#")
+    index.unsubscribe("/#")
+    assert sorted(index.matches("/hello")) == ["/+", "/hello"] and len(index) == 7
+    bounded = Subscriptions(capacity=2)
+    for topic in ["/a/#", "/b/#", "/a/#", "/c/#"]:
+        bounded.subscribe(topic)
+    assert list(bounded.filters()) == ["/a/#", "/c/#"] and "/b/#" not in bounded
+    assert list(bounded.matches("/b/1")) == []
+    assert bounded._root.children[''].children.keys() == {"a", "c"}
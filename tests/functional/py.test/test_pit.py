@@ -0,0 +1,44 @@
+"""
+Pending interest table tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+from psdcnv3.broker.pit import Pit
+
+def test_add_pop():
+    pit = Pit()
+    assert pit.add("/hello/a", 1, 10.0)
+    assert pit.add("/hello/a", 2, 10.0)
+    assert pit.add("/hello/b", 1, 10.0)
+    assert len(pit) == 3
+    assert pit.pop("/hello/a", 1)
+    assert not pit.pop("/hello/a", 1)
+    assert ("/hello/a", 2) in pit and ("/hello/a", 1) not in pit
+    assert len(pit) == 2
+
+def test_subsume():
+    """
+    A new interest is subsumed by a previous one which lives longer,
+        and renews a previous one which expires earlier.
+    """
+    pit = Pit()
+    assert pit.add("/hello", 1, 20.0)
+    assert not pit.add("/hello", 1, 15.0)
+    assert pit["/hello", 1] == 20.0
+    assert pit.add("/hello", 1, 30.0)
+    assert pit["/hello", 1] == 30.0
+    assert len(pit) == 1
+
+def test_expire():
+    pit = Pit()
+    for seq in range(1, 11):
+        pit.add("/hello", seq, float(seq))
+    pit.add("/hello", 3, 100.0)         # Renewed, thus should survive
+    pit.pop("/hello", 4)                # Satisfied, thus should not be reported
+    expired = pit.expire(5.5)
+    assert expired == [("/hello", 1), ("/hello", 2), ("/hello", 5)]
+    assert len(pit) == 6
+    assert ("/hello", 3) in pit
+    assert not pit.pop("/hello", 6, now=7.0)
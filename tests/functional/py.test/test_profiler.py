@@ -0,0 +1,46 @@
+"""
+Sampling profiler tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import asyncio, json, time
+from psdcnv3.broker.context import CommandContext
+from psdcnv3.broker.profiler import Sampler
+from psdcnv3.broker.status import Reports
+
+def busy(seconds):
+    until = time.perf_counter() + seconds
+    while time.perf_counter() < until:
+        pass
+
+def test_sampler():
+    sampler = Sampler(interval=0.001)
+    sampler.start()
+    busy(0.1)
+    stacks = sampler.stop()
+    assert sampler.samples > 0 and not sampler.running()
+    top = stacks.splitlines()[0]
+    assert "test_profiler.py:busy" in top and top.split(" ")[-1].isdecimal()
+
+def test_profile_command(broker):
+    """
+    Profile/stop answers the collapsed stacks in chunks.
+    """
+    from psdcnv3.broker.handler import handle_Profile
+    broker.profiles = Reports(chunk_size=64, ttl=0)
+    def profile(action, seq=None):
+        ctx = CommandContext(None, None, None, command="Profile", dataname=action, seq=seq,
+            codec='json')
+        asyncio.run(handle_Profile(broker, ctx))
+        return broker.app.contents[-1].decode()
+    assert json.loads(profile("/stop"))['status'] == "ERR"
+    assert json.loads(profile("/start"))['status'] == "OK"
+    assert json.loads(profile("/start"))['reason'] == "Already profiling"
+    busy(0.05)
+    reply = json.loads(profile("/stop"))
+    chunks = [reply['chunk']] + \
+        [profile(f"/stop/{reply['version']}", seq) for seq in range(2, reply['count'] + 1)]
+    stacks = json.loads("".join(chunks))['stacks']
+    assert "test_profiler.py:busy" in stacks and broker.profiler is None
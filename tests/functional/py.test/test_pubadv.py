@@ -0,0 +1,51 @@
+"""
+Batch PubAdv tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import asyncio
+from ndn.encoding import Name
+from psdcnv3.psk import PubAdvInfo, TopicScope
+from psdcnv3.psk.codec import decode, encode
+from psdcnv3.utils import arbit
+
+def advertised(name, app_param):
+    # Remote RNs advertise all the names
+    if "/MR/" in name:
+        return b""
+    value = [{'status': "OK", 'dataname': pubadvinfo['dataname']}
+        for pubadvinfo in decode(app_param)['pubadvinfos']]
+    return encode({'status': "OK", 'value': value})
+
+def test_pubadv_batch(broker):
+    broker.app.respond = advertised
+    broker.network = ["/rn-1", "/rn-2", "/rn-3"]
+    broker.ir_prefix = "/marketplace"
+    datanames = [f"/fleet{i}/sensor/{j}" for i in range(8) for j in range(4)]
+    pubadvinfos = [PubAdvInfo(dataname) for dataname in datanames]
+    for pubadvinfo in pubadvinfos:
+        pubadvinfo['topicscope'] = TopicScope.GLOBAL
+    pubadvinfos[0]['topicscope'] = TopicScope.LOCAL
+    command, int_param, app_param = \
+        broker.keeper.make_pubadv_batch_cmd(broker.keeper.svc_name, pubadvinfos)
+    ctx = broker.parser.parse(Name.from_str(command), int_param, app_param, b"packet")
+    ctx.codec = 'json'
+    asyncio.run(broker.dispatch(ctx))
+
+    reply = broker.app.reply()
+    assert reply['status'] == "OK"
+    assert [response['dataname'] for response in reply['value']] == datanames
+    assert all(response['status'] == "OK" for response in reply['value'])
+    assert sorted(broker.app.routes) == sorted(datanames)
+    assert all(dataname in broker.psodb for dataname in datanames)
+    # One request per remote Topic-RN, and one IR registration
+    remotes = {arbit(dataname, broker.network) for dataname in datanames[1:]} - {"/rn-1"}
+    forwarded = [sent for sent in broker.app.sent if "/MR/" not in sent[0]]
+    assert sorted(Name.to_str(hint[0][1]) for _, hint, _ in forwarded) == sorted(remotes)
+    registered = [sent for sent in broker.app.sent if "/MR/" in sent[0]]
+    assert len(registered) == 1
+    assert datanames[0] in broker.local
+    assert all(dataname in broker.names for dataname in datanames[1:]
+        if arbit(dataname, broker.network) == "/rn-1")
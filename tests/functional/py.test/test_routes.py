@@ -0,0 +1,88 @@
+"""
+Route aggregation tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import asyncio
+from ndn.encoding import Name
+from psdcnv3.broker.routes import Routes
+from psdcnv3.psk import PubAdvInfo, TopicScope
+
+def test_routes():
+    routes = Routes()
+    assert routes.add("/a/b/c") == "/a/b/c" and routes.add("/a/b/c") is None
+    assert routes.remove("/a/b/c") == "/a/b/c" and routes.remove("/a/b/c") is None
+    routes = Routes(depth=2, reserved=("/etri/rn", "/etri/rn-1"))
+    assert routes.add("/fleet/1/temp") == "/fleet/1"
+    assert routes.add("/fleet/1/humidity") is None
+    assert routes.add("/fleet") == "/fleet"
+    assert routes.add("/etri/rn/x") == "/etri/rn/x"
+    assert (len(routes), routes.names()) == (3, 4)
+    # /etri would cover the broker prefixes
+    assert Routes(depth=1, reserved=("/etri/rn",)).add("/etri/x/y") == "/etri/x/y"
+    assert routes.remove("/fleet/1/temp") is None
+    assert routes.remove("/fleet/1/humidity") == "/fleet/1"
+    routes.add("/fleet/2/temp")
+    routes.add("/fleet/2/humidity")
+    assert sorted(routes.forget("/fleet/2")) == ["/fleet/2/humidity", "/fleet/2/temp"]
+    assert "/fleet/2/temp" not in routes and routes.add("/fleet/2/temp") == "/fleet/2"
+
+def test_register_routes(broker):
+    broker.routes = Routes(depth=1, reserved=(broker.keeper.svc_name, broker.id))
+    broker.app.delay = 0.001
+    datanames = [f"/fleet{i}/sensor/{j}" for i in range(40) for j in range(100)]
+    broker.app.failing = {"/fleet0"}
+    failed = asyncio.run(broker.register_routes(datanames))
+    assert sorted(failed) == sorted(f"/fleet0/sensor/{j}" for j in range(100))
+    assert sorted(broker.app.routes) == sorted(f"/fleet{i}" for i in range(1, 40))
+    assert 1 < broker.app.most <= 16
+    broker.app.routes, broker.app.failing = [], set()
+    assert asyncio.run(broker.register_routes(datanames)) == [] and broker.app.routes == ["/fleet0"]
+
+def test_register_in_flight(broker):
+    """
+    Names under a prefix being registered wait for it, and fail with it.
+    """
+    broker.routes = Routes(depth=1, reserved=(broker.keeper.svc_name, broker.id))
+    broker.app.delay = 0.01
+    broker.app.failing = {"/fleet"}
+    async def run():
+        return await asyncio.gather(broker.register_routes(["/fleet/1"]),
+            broker.register_routes(["/fleet/2", "/other/1"]))
+    assert asyncio.run(run()) == [["/fleet/1"], ["/fleet/2"]]
+    assert broker.app.routes == ["/other"] and not broker.registering
+    broker.app.failing = set()
+    async def rerun():
+        return await asyncio.gather(broker.register_routes(["/fleet/1"]),
+            broker.register_routes(["/fleet/2"]))
+    assert asyncio.run(rerun()) == [[], []] and sorted(broker.app.routes) == ["/fleet", "/other"]
+
+def test_pubadv_unrouted(broker):
+    """
+    PA of a name whose route is not registered fails, and is not kept in psodb.
+    """
+    broker.ir_register_batch = lambda *args: asyncio.sleep(0)
+    broker.app.failing = {"/fleet/1", "/fleet/3"}
+    def dispatch(command, int_param, app_param):
+        ctx = broker.parser.parse(Name.from_str(command), int_param, app_param, b"packet")
+        ctx.codec = 'json'
+        asyncio.run(broker.dispatch(ctx))
+        return broker.app.reply()
+    reply = dispatch(*broker.keeper.make_pubadv_cmd(broker.keeper.svc_name, "/fleet/1",
+        PubAdvInfo("/fleet/1")))
+    assert reply['status'] == "ERR" and "/fleet/1" not in broker.psodb
+    # Only the names not routed fail in a batch
+    pubadvinfos = [PubAdvInfo(f"/fleet/{i}") for i in range(1, 4)]
+    for pubadvinfo in pubadvinfos:
+        pubadvinfo['topicscope'] = TopicScope.LOCAL
+    reply = dispatch(*broker.keeper.make_pubadv_batch_cmd(broker.keeper.svc_name, pubadvinfos))
+    assert [response['status'] for response in reply['value']] == ["ERR", "OK", "ERR"]
+    assert "/fleet/2" in broker.psodb and "/fleet/3" not in broker.psodb
+    # Routes are registered again with the next PA
+    broker.app.failing = set()
+    reply = dispatch(*broker.keeper.make_pubadv_batch_cmd(broker.keeper.svc_name,
+        pubadvinfos[::2]))
+    assert [response['status'] for response in reply['value']] == ["OK", "OK"]
+    assert sorted(broker.app.routes) == ["/fleet/1", "/fleet/2", "/fleet/3"]
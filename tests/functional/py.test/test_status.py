@@ -0,0 +1,39 @@
+"""
+Status report tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import json
+from psdcnv3.broker.status import Reports
+
+def test_reports():
+    """
+    Reports are reused within ttl, and chunks of a version survive newer reports.
+    """
+    made = []
+    def make(window):
+        made.append(window)
+        return {'window': window, 'names': ["/hello"] * 10}
+    reports = Reports(chunk_size=16, ttl=60, capacity=2)
+    version, text, chunks = reports.get(0, make)
+    assert "".join(chunks) == text and json.loads(text)['window'] == 0
+    assert reports.get(0, make)[0] == version and made == [0]
+    assert reports.get(5, make)[0] == version + 1 and made == [0, 5]
+    assert reports.chunk(2, version) == chunks[1] and reports.chunk(len(chunks) + 1) is None
+    reports.get(6, make)
+    assert reports.chunk(1, version) is None and reports.get(0, make)[0] == version + 3
+    expired = Reports(ttl=-1)
+    assert expired.get(0, make)[0] != expired.get(0, make)[0]
+
+def test_report_window(broker):
+    broker.storage_manager = "TableStorage"
+    for i in range(5):
+        broker.names.advertise("/rn-1", f"/hello/{i}")
+        broker.store.set_many(f"/hello/{i}", [1], [b"a"])
+    status = broker.report(2)['status']
+    assert status['advertised']['total'] == 5
+    assert status['advertised']['names'] == ["/hello/3", "/hello/4"]
+    assert status['published']['total'] == 5 and len(status['published']['manifest']) == 2
+    assert status['match_cache']['items'] == 0
@@ -0,0 +1,332 @@
+"""
+Store and Storage tests
+"""
+
+import sys
+sys.path.append("../../..")
+
+import asyncio, logging, os, threading, time
+from psdcnv3.store import Store, TableStorage, LogStorage, CacheWrapper
+
+class Context(object):
+    def __init__(self, id):
+        self.id = id
+        self.logger = logging.getLogger("test")
+
+class CountingStorage(TableStorage):
+    """
+    A TableStorage counting the calls to the storage.
+    """
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def get(self, key):
+        self.calls.append('get')
+        return super().get(key)
+
+    def mget(self, keys):
+        self.calls.append('mget')
+        return [super(CountingStorage, self).get(key) for key in keys]
+
+    def set(self, key, value):
+        self.calls.append('set')
+        super().set(key, value)
+
+    def mset(self, kvs):
+        self.calls.append('mset')
+        for key, value in kvs.items():
+            super().set(key, value)
+
+def store_over(storage):
+    store = Store(storage)
+    store.logger = logging.getLogger("test")
+    return store
+
+def log_storage(tmp_path, **kwargs):
+    storage = LogStorage(**kwargs)
+    storage.logger = logging.getLogger("test")
+    storage.open(str(tmp_path / "log"))
+    return storage
+
+def test_log_get_set(tmp_path):
+    storage = log_storage(tmp_path, shards=2)
+    for seq in range(1, 101):
+        storage.set(f"/hello/{seq % 3}[{seq}]", f"packet {seq}".encode())
+    storage.set("/hello/1[1]", b"renewed")
+    assert storage.get("/hello/1[1]") == b"renewed"
+    assert storage.get("/hello/2[50]") == b"packet 50"
+    assert storage.get("/hello/2[51]") is None
+    assert len(storage.keys()) == 100
+
+def test_log_restart(tmp_path):
+    """
+    Index is rebuilt from sealed segment footers and unsealed segment headers.
+    """
+    storage = log_storage(tmp_path, shards=2, segment_size=1024)
+    for seq in range(1, 201):
+        storage.set(f"/hello[{seq}]", f"packet {seq}".encode())
+    storage.delete("/hello[7]")
+    storage.flush()
+    storage.set("/world[1]", b"unsealed")
+    storage.delete("/hello[8]")
+    # Simulate a crash leaving a torn record at the tail of a segment
+    segment = storage.active[storage.shard("/world[1]")]
+    with open(segment.path, "ab") as f:
+        f.write(b"\x00\x09/world[2")
+    restarted = log_storage(tmp_path)
+    assert len(restarted.keys()) == 199
+    assert restarted.get("/hello[7]") is None and restarted.get("/hello[8]") is None
+    assert restarted.get("/hello[200]") == b"packet 200"
+    assert restarted.get("/world[1]") == b"unsealed"
+
+def test_log_hole(tmp_path):
+    """
+    An unsealed segment is truncated at a hole left by writes which didn't complete.
+    """
+    storage = log_storage(tmp_path, shards=1)
+    for seq in range(1, 6):
+        storage.set(f"/hello[{seq}]", f"packet {seq}".encode())
+    segment, offset, length = storage.index["/hello[3]"]
+    start = offset - len("/hello[3]") - 10     # Record header of 10 bytes
+    os.pwrite(segment.fd, bytes(offset + length - start), start)
+    restarted = log_storage(tmp_path)
+    assert sorted(restarted.keys()) == ["/hello[1]", "/hello[2]"]
+    assert restarted.get("/hello[2]") == b"packet 2"
+
+def test_log_compact(tmp_path):
+    storage = log_storage(tmp_path, shards=1, segment_size=1024)
+    for seq in range(1, 201):
+        storage.set(f"/hello[{seq}]", f"packet {seq}".encode())
+    segments = len(storage.segments)
+    for seq in range(1, 181):
+        storage.delete(f"/hello[{seq}]")
+    storage.compact()
+    assert len(storage.segments) < segments
+    assert storage.get("/hello[190]") == b"packet 190"
+    storage.flush()
+    restarted = log_storage(tmp_path)
+    assert sorted(restarted.keys()) == sorted(f"/hello[{seq}]" for seq in range(181, 201))
+
+def test_store_over_log(tmp_path):
+    os.chdir(tmp_path)
+    store = Store(LogStorage())
+    store.set_context(Context("/rn-1"))
+    for seq in range(1, 11):
+        store.set("/hello", f"packet {seq}".encode(), seq)
+    assert store.get("/hello", 5) == b"packet 5"
+    store.delete("/hello")
+    assert store.get("/hello", 5) is None
+    assert store.get_storage().keys() == []
+
+def test_log_view(tmp_path):
+    storage = log_storage(tmp_path, shards=1)
+    storage.set("/hello[1]", b"sealed")
+    storage.flush()
+    storage.set("/hello[2]", b"active")
+    sealed = storage.view("/hello[1]")
+    assert isinstance(sealed, memoryview) and sealed == b"sealed"
+    assert storage.view("/hello[2]") == b"active"
+    assert storage.view("/hello[3]") is None
+    # Views survive compaction of their segment
+    storage.delete("/hello[1]")
+    storage.compact()
+    assert bytes(sealed) == b"sealed"
+
+def test_set_many_get_range():
+    storage = CountingStorage()
+    store = store_over(storage)
+    values = [f"packet {seq}".encode() for seq in range(1, 101)]
+    assert store.set_many("/hello", range(1, 101), values) == list(range(1, 101))
+    assert storage.calls == ['mset']
+    assert store.end("/hello") == 100
+    assert store.get_range("/hello", 99, 102) == [b"packet 99", b"packet 100", None, None]
+    assert storage.calls == ['mset', 'mget']
+    assert store.set_many("/hello", [0, 101], [b"bizarre", b"packet 101"]) == [101]
+    assert store.get("/hello", 101) == b"packet 101"
+
+def test_cache_bulk():
+    """
+    Bulk writes and reads through the cache reach the inner storage in bulk too.
+    """
+    storage = CountingStorage()
+    cache = CacheWrapper(storage, 10, batch_size=16)
+    cache.mset({f"/hello[{seq}]": seq for seq in range(1, 31)})
+    cache.flush()
+    assert storage.calls == ['mset', 'mset'] and len(storage.keys()) == 30
+    assert cache.mget([f"/hello[{seq}]" for seq in range(1, 31)]) == list(range(1, 31))
+    assert storage.calls == ['mset', 'mset', 'mget']
+
+def test_log_async(tmp_path):
+    """
+    Concurrent writes to a key leave the last one, and survive a restart.
+    """
+    storage = log_storage(tmp_path, shards=2)
+    async def run():
+        await asyncio.gather(*[storage.aset("/hello[1]", f"write {i}".encode())
+                               for i in range(10)])
+        await storage.amset({f"/hello[{seq}]": b"packet" for seq in range(2, 11)})
+        await storage.amdelete(["/hello[2]", "/hello[11]"])
+        return await storage.aget("/hello[1]"), await storage.amget(["/hello[2]", "/hello[3]"])
+    last, values = asyncio.run(run())
+    assert last == b"write 9"
+    assert values == [None, b"packet"]
+    storage.flush()
+    restarted = log_storage(tmp_path)
+    assert restarted.get("/hello[1]") == b"write 9" and restarted.get("/hello[2]") is None
+    assert len(restarted.keys()) == 9
+
+def test_store_async():
+    storage = CountingStorage()
+    store = store_over(CacheWrapper(storage, 5))
+    async def run():
+        await store.aset_many("/hello", range(1, 11), [bytes([seq]) for seq in range(1, 11)])
+        return await store.aget("/hello", 3), await store.aget_range("/hello", 9, 11)
+    third, values = asyncio.run(run())
+    assert third == bytes([3])
+    assert values == [bytes([9]), bytes([10]), None]
+    # Evicted data are still waiting to be written back
+    assert storage.calls == []
+    store.storage.flush()
+    assert storage.calls == ['mset'] and len(storage.keys()) == 10
+
+def test_cache_budget():
+    """
+    Cache is bounded by the bytes of the cached values, and only dirty values are written back.
+    """
+    storage = CountingStorage()
+    cache = CacheWrapper(storage, budget=1000, batch_size=1)
+    cache.set("/big[1]", bytes(600))
+    cache.set("/big[2]", bytes(600))
+    cache.flush()
+    assert storage.calls == ['mset', 'mset'] and cache.used == 600
+    # A clean value evicted is not written again
+    assert cache.get("/big[1]") == bytes(600)
+    cache.set("/small[1]", bytes(10))
+    cache.flush()
+    assert storage.calls == ['mset', 'mset', 'get', 'mset']
+    assert cache.stats()['evictions'] == 2 and cache.used == 610
+    # Values larger than the budget bypass the cache
+    cache.set("/huge[1]", bytes(2000))
+    assert cache.get("/huge[1]") == bytes(2000) and cache.used == 610
+
+def test_cache_policies():
+    """
+    A scan over cold data doesn't flush hot data out of ARC and TinyLFU caches.
+    """
+    for policy in ['arc', 'tinylfu']:
+        cache = CacheWrapper(TableStorage(), 10, policy=policy)
+        hot = [f"/hot[{seq}]" for seq in range(5)]
+        cache.mset({key: b"hot" for key in hot})
+        for _ in range(3):
+            cache.mget(hot)
+        cache.mset({f"/cold[{seq}]": b"cold" for seq in range(100)})
+        stats = cache.stats()
+        assert cache.mget(hot) == [b"hot"] * 5
+        assert cache.stats()['hits'] == stats['hits'] + 5, policy
+        cache.flush()
+        assert len(cache.inner.keys()) == 105
+
+def test_cache_tinylfu_writes():
+    """
+    Keys written to a full TinyLFU cache are admitted unless they are colder than
+        the keys they would evict.
+    """
+    cache = CacheWrapper(TableStorage(), 10, policy='tinylfu')
+    old = [f"/old[{seq}]" for seq in range(10)]
+    cache.mset({key: b"old" for key in old})
+    cache.set("/new[1]", b"new")
+    assert "/new[1]" in cache._cache and len(cache._cache) == 10
+    cache.mget(old[1:] + ["/new[1]"])
+    cache.set("/new[2]", b"new")
+    assert "/new[2]" not in cache._cache
+    # Reads of the new key make it hot enough to be cached
+    cache.flush()
+    for _ in range(2):
+        assert cache.get("/new[2]") == b"new"
+    assert "/new[2]" in cache._cache
+
+def test_cache_write_back():
+    """
+    Write-back task writes out evicted data, and deletes are ordered after pending writes.
+    """
+    storage = CountingStorage()
+    cache = CacheWrapper(storage, 2, interval=0.01)
+    async def run():
+        task = asyncio.get_event_loop().create_task(cache.write_back())
+        await cache.amset({f"/hello[{seq}]": seq for seq in range(1, 11)})
+        await cache.amdelete(["/hello[1]"])
+        assert await cache.aget("/hello[1]") is None
+        await asyncio.sleep(0.1)
+        task.cancel()
+    asyncio.run(run())
+    assert storage.calls == ['get', 'mset'] and len(storage.keys()) == 7
+    assert "/hello[1]" not in cache and cache.get("/hello[2]") == 2
+
+def test_cache_compact():
+    """
+    Compaction of the inner storage is ordered after the writes in the writer thread.
+    """
+    class CompactingStorage(CountingStorage):
+        def compact(self):
+            self.calls.append(('compact', threading.current_thread() is threading.main_thread()))
+    storage = CompactingStorage()
+    cache = CacheWrapper(storage, 2, batch_size=1)
+    cache.mset({f"/hello[{seq}]": seq for seq in range(1, 5)})
+    cache.compact()
+    asyncio.run(cache.acompact())
+    assert storage.calls[-2:] == [('compact', False), ('compact', False)]
+    assert 'mset' in storage.calls[:-2]
+
+def test_cache_writer_thread():
+    """
+    Cache misses are read in the writer thread, and the store awaits flushes of the
+        cache without blocking the event loop.
+    """
+    class SlowStorage(CountingStorage):
+        def get(self, key):
+            self.calls.append(('get', threading.current_thread() is threading.main_thread()))
+            return TableStorage.get(self, key)
+        def flush(self):
+            time.sleep(0.05)
+            self.calls.append('flush')
+    storage = SlowStorage()
+    storage.set("/hello[1]", b"hello")
+    store = store_over(CacheWrapper(storage, 2))
+    done = []
+    async def tick():
+        await asyncio.sleep(0)
+        done.append('tick')
+    async def flush():
+        await store.flush(periodic=False)
+        done.append('flush')
+    async def run():
+        value = await store.storage.aget("/hello[1]")
+        await asyncio.gather(flush(), tick())
+        return value
+    assert asyncio.run(run()) == b"hello" and done == ['tick', 'flush']
+    assert storage.calls[-2:] == [('get', False), 'flush']
+
+def test_log_acompact(tmp_path):
+    """
+    Compaction leaves keys overwritten meanwhile to the newer writes, also after a restart.
+    """
+    storage = log_storage(tmp_path, shards=1, segment_size=1024)
+    for seq in range(1, 201):
+        storage.set(f"/hello[{seq}]", f"packet {seq}".encode())
+    for seq in range(1, 181):
+        storage.delete(f"/hello[{seq}]")
+    segments = len(storage.segments)
+    async def run():
+        # A live key of the compacted segment is being overwritten
+        write = asyncio.get_running_loop().create_task(storage.aset("/hello[181]", b"newer"))
+        await asyncio.sleep(0)
+        await storage.acompact()
+        await write
+    asyncio.run(run())
+    assert len(storage.segments) < segments
+    assert storage.get("/hello[181]") == b"newer" and storage.get("/hello[190]") == b"packet 190"
+    storage.flush()
+    restarted = log_storage(tmp_path)
+    assert restarted.get("/hello[181]") == b"newer"
+    assert sorted(restarted.keys()) == sorted(f"/hello[{seq}]" for seq in range(181, 201))
@@ -0,0 +1,48 @@
+import sys
+sys.path.append("../../..")
+from time import time
+from psdcnv3.broker.pit import Pit
+
+def populate(pit, names, seqs):
+    for i in range(names):
+        dataname = "/etri/bldg7/room318/" + str(i)
+        for seq in range(1, seqs + 1):
+            if type(pit) is dict:
+                pit[(dataname, seq)] = 1000.0 + seq
+            else:
+                pit.add(dataname, seq, 1000.0 + seq)
+
+def scan_pd(pit, dataname, pos):
+    # PIT processing of PD before the indexed table: a full scan for every item
+    for data_name, seq_no in list(pit):
+        if dataname == data_name and pos == seq_no:
+            del pit[(data_name, seq_no)]
+
+def indexed_pd(pit, dataname, pos):
+    pit.pop(dataname, pos)
+
+def test_pd(provider, pit, handle_pd, names, seqs, count):
+    populate(pit, names, seqs)
+    start = time()
+    for run in range(count):
+        handle_pd(pit, "/etri/bldg7/room318/" + str(run % names), run // names % seqs + 1)
+    end = time()
+    print(provider, "PD latency", format("%.3f" % ((end - start) * 1000 / count)), "ms")
+
+def test_expire(pit, names, seqs):
+    populate(pit, names, seqs)
+    start = time()
+    expired = len(pit.expire(1000.0 + seqs // 10 + 0.5))
+    end = time()
+    print("Pit expired", expired, "of", expired + len(pit), "in",
+        format("%.3f" % ((end - start) * 1000)), "ms")
+
+def main():
+    names, seqs = 1000, 100        # 100k pending interests
+    print("Pending interests:", names * seqs)
+    test_pd("dict", {}, scan_pd, names, seqs, 100)
+    test_pd("Pit", Pit(), indexed_pd, names, seqs, 100000)
+    test_expire(Pit(), names, seqs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import sys
+sys.path.append("../../../psdcnv3")
+from time import time
+import tracemalloc
+from names import TrieNames, ProcNames, RegexpNames
+
+# Memory used by the names tree for hierarchical names like /etri/bldg<b>/room<r>/<n>
+def init(handler, count):
+    for i in range(count):
+        handler.advertise("rn1", f"/etri/bldg{i % 10}/room{i // 1000 % 100}/{i}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        algorithm = "trie"
+    else:
+        algorithm = sys.argv[1]
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    algorithm = algorithm.capitalize() + "Names"
+    print("Using", algorithm)
+    exec("from names import " + algorithm, globals())
+    tracemalloc.start()
+    start = time()
+    publisher = eval(algorithm + "()")
+    init(publisher, count)
+    end = time()
+    used, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("Done advertising. # of datanames is", publisher.count())
+    print("Elapsed time:", (end-start), "seconds")
+    print("Memory used:", used // (1024 * 1024), "MB", "(%d bytes per name)" % (used // count))
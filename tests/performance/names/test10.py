@@ -0,0 +1,36 @@
+import sys
+sys.path.append("../../../psdcnv3")
+from time import time
+from names import TrieNames, ProcNames, RegexpNames
+
+# Deep tree: 1000 names 12 levels deep sharing a long literal prefix
+def init(handler):
+    for i in range(1000):
+        handler.advertise("rn1",
+            f"/etri/campus/bldg7/floor3/room318/rack/{i // 100}/shelf/{i % 10}/node/{i}")
+
+def test_matches(handler, verbose=True):
+    for node in handler.matches("/etri/campus/bldg7/floor3/room318/rack/#"):
+        pass
+    for node in handler.matches("/etri/campus/bldg7/floor3/room318/rack/+/shelf/+/node/+"):
+        pass
+    for node in handler.matches("/etri/campus/bldg7/floor3/room318/rack/5/shelf/5/node/555"):
+        pass
+
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        algorithm = "trie"
+    else:
+        algorithm = sys.argv[1]
+    algorithm = algorithm.capitalize() + "Names"
+    print("Using", algorithm)
+    exec("from names import " + algorithm, globals())
+    publisher = eval(algorithm + "()")
+    init(publisher)
+    print("Done advertising. # of datanames is", publisher.count())
+    start = time()
+    algorithm += "()"
+    for i in range(1000):
+        test_matches(publisher, verbose=False)
+    end = time()
+    print("Elapsed time:", (end-start), "seconds")
@@ -0,0 +1,37 @@
+import sys
+sys.path.append("../../../psdcnv3")
+from time import time
+from names import TrieNames, ProcNames, RegexpNames
+
+# Wide tree: 20000 siblings under a node
+def init(handler):
+    for i in range(20000):
+        handler.advertise("rn1", "/etri/sensors/" + str(i))
+    for i in range(100):
+        handler.advertise("rn1", "/etri/actuators/" + str(i) + "/state")
+
+def test_matches(handler, verbose=True):
+    for node in handler.matches("/etri/sensors/+"):
+        pass
+    for node in handler.matches("/etri/+/+/state"):
+        pass
+    for node in handler.matches("/etri/sensors/19999"):
+        pass
+
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        algorithm = "trie"
+    else:
+        algorithm = sys.argv[1]
+    algorithm = algorithm.capitalize() + "Names"
+    print("Using", algorithm)
+    exec("from names import " + algorithm, globals())
+    publisher = eval(algorithm + "()")
+    init(publisher)
+    print("Done advertising. # of datanames is", publisher.count())
+    start = time()
+    algorithm += "()"
+    for i in range(100):
+        test_matches(publisher, verbose=False)
+    end = time()
+    print("Elapsed time:", (end-start), "seconds")
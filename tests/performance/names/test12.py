@@ -0,0 +1,36 @@
+import sys
+sys.path.append("../../../psdcnv3")
+from time import time
+from names import TrieNames, ProcNames, RegexpNames
+
+# Sparse tree: 2000 sites with deep chains of components and a few sensors each
+def init(handler):
+    for i in range(2000):
+        for j in range(2):
+            handler.advertise("rn1", f"/etri/site{i}/campus/bldg/floor/room/rack/sensor{j}")
+
+def test_matches(handler, verbose=True):
+    for node in handler.matches("/etri/site1000/#"):
+        pass
+    for node in handler.matches("/etri/+/campus/bldg/floor/room/rack/sensor0"):
+        pass
+    for i in range(100):
+        node = handler[f"/etri/site{i}/campus/bldg/floor/room/rack/sensor1"]
+
+if __name__ == "__main__":
+    if len(sys.argv) == 1:
+        algorithm = "trie"
+    else:
+        algorithm = sys.argv[1]
+    algorithm = algorithm.capitalize() + "Names"
+    print("Using", algorithm)
+    exec("from names import " + algorithm, globals())
+    publisher = eval(algorithm + "()")
+    init(publisher)
+    print("Done advertising. # of datanames is", publisher.count())
+    start = time()
+    algorithm += "()"
+    for i in range(100):
+        test_matches(publisher, verbose=False)
+    end = time()
+    print("Elapsed time:", (end-start), "seconds")
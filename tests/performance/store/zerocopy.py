@@ -0,0 +1,56 @@
+import sys
+sys.path.append("../../..")
+from time import time
+import os, shutil, psutil
+from psdcnv3.store import Store, FileStorage, LogStorage
+
+class Context(object):
+    id = "/zerocopy"
+    logger = None
+
+def populate(storage, size, count):
+    store = Store(storage)
+    store.set_context(Context())
+    packet = os.urandom(size)
+    for seq in range(1, count + 1):
+        store.set("/etri/bldg7/room318/temp", packet, seq)
+    storage.flush()
+    return store
+
+def serve(store, read, count, fanin, sink):
+    """
+    Serves `fanin` subscribers requesting every item, and keeps the replies of each round
+        in flight (as transport buffers would do under backpressure) to see the RSS.
+    """
+    rss = psutil.Process().memory_info().rss
+    peak = 0
+    start = time()
+    for seq in range(1, count + 1):
+        replies = [read("/etri/bldg7/room318/temp", seq) for _ in range(fanin)]
+        for packet in replies:
+            os.write(sink, packet)
+        if seq % 100 == 1:
+            peak = max(peak, psutil.Process().memory_info().rss - rss)
+        del replies
+    end = time()
+    return fanin * count / (end - start), peak
+
+def main(count=1000, fanin=1000):
+    sink = os.open(os.devnull, os.O_WRONLY)
+    print("Serving", count, "packets to", fanin, "subscribers each")
+    for size in [1024, 8192]:
+        for provider in [LogStorage, FileStorage]:
+            shutil.rmtree("dump.zerocopy.log", ignore_errors=True)
+            shutil.rmtree("dump.zerocopy.dir", ignore_errors=True)
+            store = populate(provider(), size, count)
+            for mode, read in [("get", store.get), ("view", store.view)]:
+                rate, peak = serve(store, read, count, fanin, sink)
+                print(f"{size // 1024}K {provider.__name__} {mode}:",
+                      f"{rate:.0f} packets/s, RSS +{peak // 1024}K")
+            store.clear()
+    shutil.rmtree("dump.zerocopy.log", ignore_errors=True)
+    shutil.rmtree("dump.zerocopy.dir", ignore_errors=True)
+    os.close(sink)
+
+if __name__ == "__main__":
+    main()